@@ -2,10 +2,55 @@
 # AWS Cloudformation App Construct
 
 This construct creates Cloudformation Stack(s) inside your CloudFormation App using CDK.
+
+Set the `startupReport` context (`cdk synth -c startupReport=true`) or `CDK_STARTUP_REPORT=1` to print how long each
+startup phase took and which AWS service modules were imported. The report is always written to
+`cdk.out/startup-report.json`.
+
+Set the `profileSynth` context (`cdk synth -c profileSynth=true`) to profile the construct factories during synth,
+see `stack_blueprints.synth_profiler`.
 """
+import contextlib
+import json
+import os
+import sys
+import time
 from configparser import ConfigParser, ExtendedInterpolation
-from stack_blueprints.stack import MainProjectStack
-import aws_cdk as cdk
+
+STARTUP = {"start": time.perf_counter(), "phases": []}
+
+
+def record_phase(name: str) -> None:
+    """Record the time since the previous phase under `name`."""
+    now = time.perf_counter()
+    previous = STARTUP["phases"][-1]["end"] if STARTUP["phases"] else STARTUP["start"]
+    STARTUP["phases"].append({"phase": name, "end": now, "seconds": round(now - previous, 4)})
+
+
+import aws_cdk as cdk  # noqa: E402 pylint: disable=wrong-import-position
+record_phase("import aws_cdk")
+from stack_blueprints.stack import MainProjectStack  # noqa: E402 pylint: disable=wrong-import-position
+record_phase("import stack")
+
+
+def write_startup_report(app: cdk.App) -> None:
+    """Write the startup timings and the imported service modules to cdk.out, and print them when requested."""
+    service_modules = sorted(
+        name for name in sys.modules
+        if name.startswith("aws_cdk.") and name.count(".") == 1 and not name.startswith("aws_cdk._")
+    )
+    report = {
+        "totalSeconds": round(time.perf_counter() - STARTUP["start"], 4),
+        "phases": [{"phase": phase["phase"], "seconds": phase["seconds"]} for phase in STARTUP["phases"]],
+        "serviceModules": service_modules
+    }
+    os.makedirs(app.outdir, exist_ok=True)
+    with open(os.path.join(app.outdir, "startup-report.json"), "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
+    if str(app.node.try_get_context("startupReport")).lower() == "true" or os.environ.get("CDK_STARTUP_REPORT") == "1":
+        lines = [f"  {phase['phase']:<20} {phase['seconds']:>8.3f}s" for phase in report["phases"]]
+        print("cdk app startup:", *lines, f"  {'total':<20} {report['totalSeconds']:>8.3f}s",
+              f"  {len(service_modules)} service modules: {', '.join(service_modules)}", sep="\n", file=sys.stderr)
 
 
 def main():
@@ -14,8 +59,12 @@ def main():
     config.read("../../.configrc/config.ini")
     _app = cdk.App()
     env = _app.node.try_get_context("env")
+    profiler = None
+    if str(_app.node.try_get_context("profileSynth")).lower() == "true":
+        from stack_blueprints.synth_profiler import SynthProfiler  # pylint: disable=import-outside-toplevel
+        profiler = SynthProfiler.enable()
 
-    MainProjectStack(
+    primary_stack = MainProjectStack(
         env_var=env,
         app_id=config["global"]["appId"],
         scope=_app,
@@ -25,7 +74,30 @@ def main():
             "account": config[env]['awsAccount']
         }
     )
-    _app.synth()
+
+    # With multiRegion the replica region of the tier (e.g. stag-dr for stag) is synthesized in the same app.
+    # It depends on the primary stack, which creates the global tables the replica region reads from.
+    dr_env = f"{env}-dr"
+    if config[env].getboolean('multiRegion', fallback=False) and config.has_section(dr_env):
+        dr_stack = MainProjectStack(
+            env_var=dr_env,
+            app_id=f"{config['global']['appId']}-dr",
+            scope=_app,
+            config=config,
+            primary_env=env,
+            env={
+                "region": config[dr_env]['awsRegion'],
+                "account": config[dr_env]['awsAccount']
+            }
+        )
+        dr_stack.add_dependency(primary_stack)
+    record_phase("build stacks")
+    with profiler.frame("App.synth") if profiler is not None else contextlib.nullcontext():
+        _app.synth()
+    record_phase("synth")
+    write_startup_report(_app)
+    if profiler is not None:
+        profiler.write(_app.outdir, top_n=_app.node.try_get_context("profileTopN"))
 
 
 main()
@@ -0,0 +1,163 @@
+"""
+# AWS API Gateway Construct Library
+
+This construct library allows you to create AWS API Gateway HTTP APIs in front of AWS Lambda Functions.
+"""
+from typing import Dict, List, Tuple
+from aws_cdk import (
+    Duration,
+    Fn,
+    Stack,
+    aws_apigatewayv2 as apigwv2,
+    aws_apigatewayv2_integrations as integrations,
+    aws_cloudfront as cloudfront,
+    aws_cloudfront_origins as origins,
+    aws_lambda as _lambda
+)
+from .cdn_construct import CdnConstruct
+
+
+class ApiConstruct():
+    """
+    # AWS API Gateway Construct Class
+    ### This class holds all methods to create AWS API Gateway HTTP APIs and related Resources.
+    * `create_http_api`
+    * `add_response_cache`
+    """
+
+    @staticmethod
+    def create_http_api(
+        stack: Stack,
+        config: dict,
+        env: str,
+        api_name: str,
+        routes: Dict[str, _lambda.IFunction],
+        route_throttling: Dict[str, Tuple[int, int]] = None,
+        throttle_rate_limit: int = None,
+        throttle_burst_limit: int = None,
+        cors_allow_origins: List[str] = None
+    ) -> apigwv2.HttpApi:
+        """
+        ## Create an HTTP API
+        Use this method to create an HTTP API that routes requests to lambda functions of your stack.
+        Functions receive the version 2.0 payload format, which is smaller and cheaper to parse than the REST API format.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `api_name`: The name of the API.
+        * param `routes`: A dictionary with route keys as keys, e.g. "GET /items/{id}", and the aws_lambda.IFunction that handles the route as value.
+        * param `route_throttling`: A dictionary with route keys as keys and a `(rate_limit, burst_limit)` tuple as value. Default: - the API throttling applies.
+        * param `throttle_rate_limit`: Steady-state requests per second allowed on every route without its own throttling. Default: - the account limit.
+        * param `throttle_burst_limit`: Burst of requests allowed on every route without its own throttling. Default: - the account limit.
+        * param `cors_allow_origins`: Origins allowed to call the API from a browser. Default: - CORS is not configured.
+        * returns `aws_apigatewayv2.HttpApi`
+        """
+        dict_props = {
+            "api_name": f"{config[env]['appName']}-{api_name}"
+        }
+        if cors_allow_origins is not None:
+            dict_props['cors_preflight'] = apigwv2.CorsPreflightOptions(
+                allow_origins=cors_allow_origins,
+                allow_methods=[apigwv2.CorsHttpMethod.ANY],
+                allow_headers=["*"]
+            )
+        api = apigwv2.HttpApi(
+            scope=stack,
+            id=f"{config[env]['appName']}-api-{api_name}",
+            **dict_props
+        )
+
+        integrations_by_function = {}
+        created_routes = []
+        for route_key, function in routes.items():
+            method, path = route_key.split(" ", 1)
+            if function.node.path not in integrations_by_function:
+                integrations_by_function[function.node.path] = integrations.HttpLambdaIntegration(
+                    f"{config[env]['appName']}-api-{api_name}-{function.node.id}",
+                    handler=function,
+                    payload_format_version=apigwv2.PayloadFormatVersion.VERSION_2_0
+                )
+            created_routes += api.add_routes(
+                path=path,
+                methods=[apigwv2.HttpMethod[method.upper()]],
+                integration=integrations_by_function[function.node.path]
+            )
+
+        stage: apigwv2.CfnStage = api.default_stage.node.default_child
+        if throttle_rate_limit is not None or throttle_burst_limit is not None:
+            stage.default_route_settings = apigwv2.CfnStage.RouteSettingsProperty(
+                throttling_rate_limit=throttle_rate_limit,
+                throttling_burst_limit=throttle_burst_limit
+            )
+        if route_throttling:
+            stage.route_settings = {
+                route_key: {"ThrottlingRateLimit": rate_limit, "ThrottlingBurstLimit": burst_limit}
+                for route_key, (rate_limit, burst_limit) in route_throttling.items()
+            }
+            # Route settings can only reference routes that already exist.
+            for route in created_routes:
+                stage.node.add_dependency(route)
+        return api
+
+    @staticmethod
+    def add_response_cache(
+        stack: Stack,
+        config: dict,
+        env: str,
+        api: apigwv2.HttpApi,
+        api_name: str,
+        cache_ttl: Duration,
+        cache_key_headers: List[str] = None,
+        cache_key_query_strings: List[str] = None,
+        cache_key_cookies: List[str] = None,
+        price_class: cloudfront.PriceClass = None
+    ) -> cloudfront.Distribution:
+        """
+        ## Add a Response Cache to an HTTP API
+        Use this method to serve an HTTP API through a CloudFront distribution. Repeated GET and HEAD requests are answered from the
+        edge cache without invoking the function, and responses are compressed with gzip or brotli. Other methods are passed through to the API.
+        Functions can opt out of caching for a response with a `Cache-Control: no-store` header.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `api`: The aws_apigatewayv2.HttpApi created with `create_http_api`.
+        * param `api_name`: The name of the API, used to name the distribution.
+        * param `cache_ttl`: How long responses are cached when the function does not send Cache-Control headers.
+        * param `cache_key_headers`: Request headers that are part of the cache key. Default: - no headers.
+        * param `cache_key_query_strings`: Query strings that are part of the cache key. Use ["*"] for every query string. Default: - no query strings.
+        * param `cache_key_cookies`: Cookies that are part of the cache key. Default: - no cookies.
+        * param `price_class`: The edge locations the distribution is served from. Default: PriceClass.PRICE_CLASS_100
+        * returns `aws_cloudfront.Distribution`
+        """
+        cache_policy = CdnConstruct.create_cache_policy(
+            stack=stack,
+            config=config,
+            env=env,
+            policy_name=f"api-{api_name}",
+            default_ttl=cache_ttl,
+            cache_key_headers=cache_key_headers,
+            cache_key_query_strings=cache_key_query_strings,
+            cache_key_cookies=cache_key_cookies
+        )
+        # api_endpoint is https://<api-id>.execute-api.<region>.amazonaws.com, the origin needs the domain name only.
+        api_domain_name = Fn.select(2, Fn.split("/", api.api_endpoint))
+        return cloudfront.Distribution(
+            scope=stack,
+            id=f"{config[env]['appName']}-api-{api_name}-distribution",
+            comment=f"{config[env]['appName']}-{api_name}",
+            default_behavior=cloudfront.BehaviorOptions(
+                origin=origins.HttpOrigin(
+                    api_domain_name,
+                    protocol_policy=cloudfront.OriginProtocolPolicy.HTTPS_ONLY
+                ),
+                cache_policy=cache_policy,
+                origin_request_policy=cloudfront.OriginRequestPolicy.ALL_VIEWER_EXCEPT_HOST_HEADER,
+                allowed_methods=cloudfront.AllowedMethods.ALLOW_ALL,
+                cached_methods=cloudfront.CachedMethods.CACHE_GET_HEAD,
+                viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+                compress=True
+            ),
+            price_class=cloudfront.PriceClass.PRICE_CLASS_100 if price_class is None else price_class
+        )
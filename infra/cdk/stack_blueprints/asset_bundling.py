@@ -0,0 +1,201 @@
+"""
+# Lambda Asset Bundling
+
+Builds minimal lambda function assets in `.build/lambda/<lambda_name>`.
+Only the files that the function needs at runtime are shipped, the function `requirements.txt` is vendored into the asset
+and the code can be precompiled to bytecode. The asset hash is computed from the shipped source files and the requirements,
+so changes to tests or sample events do not trigger a redeploy, and an unchanged function is not rebuilt on the next synth.
+
+The hash also records how the build went: a bundle shipped without bytecode gets a different hash than a compiled one.
+Requirements are installed with wheels for the lambda platform only, installing wheels for the local platform instead
+must be allowed with `allow_local_platform`, as they can be built for the wrong architecture.
+
+Patterns follow gitignore conventions: a pattern without a `/` matches any file or folder name, a pattern with a `/`
+matches the path relative to the function folder.
+"""
+import fnmatch
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+from typing import List, Tuple
+
+BUILD_DIR = os.path.join(".build", "lambda")
+# Written next to the bundle folder, `.build/lambda/<lambda_name>.asset-hash`, so it is not shipped.
+HASH_MARKER = ".asset-hash"
+DEFAULT_INCLUDES = ["*"]
+DEFAULT_EXCLUDES = [
+    "tests",
+    "test_*.py",
+    "sample_events",
+    "__pycache__",
+    "*.pyc",
+    ".pytest_cache",
+    ".mypy_cache",
+    ".DS_Store",
+    "*.md",
+    "requirements.txt"
+]
+PIP_PLATFORMS = {
+    "x86_64": "manylinux2014_x86_64",
+    "arm64": "manylinux2014_aarch64"
+}
+
+
+def _matches(relative_path: str, patterns: List[str]) -> bool:
+    """Return True if a path, or any folder it is in, matches one of the patterns."""
+    parts = relative_path.split("/")
+    for pattern in patterns:
+        if "/" in pattern:
+            prefixes = ["/".join(parts[:index]) for index in range(1, len(parts) + 1)]
+            if any(fnmatch.fnmatch(prefix, pattern.strip("/")) for prefix in prefixes):
+                return True
+        elif any(fnmatch.fnmatch(part, pattern) for part in parts):
+            return True
+    return False
+
+
+def collect_files(source_dir: str, include: List[str] = None, exclude: List[str] = None) -> List[str]:
+    """Return the sorted relative paths of the files that will be shipped."""
+    include = DEFAULT_INCLUDES if include is None else include
+    exclude = DEFAULT_EXCLUDES if exclude is None else exclude
+    files = []
+    for dirname, dirnames, filenames in os.walk(source_dir):
+        relative_dir = os.path.relpath(dirname, source_dir).replace(os.sep, "/")
+        relative_dir = "" if relative_dir == "." else f"{relative_dir}/"
+        dirnames[:] = sorted(name for name in dirnames if not _matches(f"{relative_dir}{name}", exclude))
+        for filename in filenames:
+            relative_path = f"{relative_dir}{filename}"
+            if _matches(relative_path, include) and not _matches(relative_path, exclude):
+                files.append(relative_path)
+    return sorted(files)
+
+
+def compute_asset_hash(source_dir: str, files: List[str], requirements_file: str = None, build_options: str = "") -> str:
+    """Hash the shipped files, the vendored requirements and the build options."""
+    digest = hashlib.sha256(build_options.encode("utf-8"))
+    for relative_path in files:
+        digest.update(relative_path.encode("utf-8") + b"\0")
+        with open(os.path.join(source_dir, relative_path), "rb") as shipped_file:
+            digest.update(hashlib.sha256(shipped_file.read()).digest())
+    if requirements_file is not None:
+        with open(requirements_file, "rb") as requirements:
+            digest.update(b"requirements\0" + requirements.read())
+    return digest.hexdigest()
+
+
+def _install_requirements(
+    requirements_file: str,
+    target_dir: str,
+    python_version: str,
+    architecture: str,
+    allow_local_platform: bool
+) -> str:
+    """Vendor the requirements with wheels built for the lambda platform. Returns the platform that was installed."""
+    command = [sys.executable, "-m", "pip", "install", "--quiet", "-r", requirements_file, "-t", target_dir]
+    platform_flags = [
+        "--platform", PIP_PLATFORMS[architecture],
+        "--implementation", "cp",
+        "--python-version", python_version,
+        "--only-binary=:all:"
+    ]
+    if subprocess.run(command + platform_flags, check=False).returncode == 0:
+        return PIP_PLATFORMS[architecture]
+    if not allow_local_platform:
+        raise RuntimeError(
+            f"bundling: no {PIP_PLATFORMS[architecture]} wheels for {requirements_file}. Pin versions that publish "
+            "these wheels, or allow wheels of the local platform with `bundlingAllowLocalPlatform : true` in config.ini."
+        )
+    print(f"bundling: no {PIP_PLATFORMS[architecture]} wheels for {requirements_file}, installing for the local platform")
+    subprocess.run(command, check=True)
+    return "local"
+
+
+def _compile_bytecode(bundle_dir: str, python_version: str) -> bool:
+    """Precompile the asset with an interpreter matching the runtime, so the cached bytecode is used on lambda."""
+    interpreter = sys.executable if sys.version.startswith(f"{python_version}.") else shutil.which(f"python{python_version}")
+    if interpreter is None:
+        print(f"bundling: python{python_version} not found, shipping {bundle_dir} without bytecode")
+        return False
+    # A version manager shim, e.g. pyenv, is found on the path for versions that are not installed and exits with an error.
+    result = subprocess.run(
+        [interpreter, "-m", "compileall", "-q", "--invalidation-mode", "unchecked-hash", bundle_dir],
+        check=False, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        print(f"bundling: {interpreter} failed with exit code {result.returncode}, shipping {bundle_dir} without bytecode")
+        for dirname, dirnames, _filenames in os.walk(bundle_dir):
+            if "__pycache__" in dirnames:
+                dirnames.remove("__pycache__")
+                shutil.rmtree(os.path.join(dirname, "__pycache__"))
+        return False
+    return True
+
+
+def bundle_function(
+    source_dir: str,
+    lambda_name: str,
+    runtime_name: str,
+    include: List[str] = None,
+    exclude: List[str] = None,
+    compile_bytecode: bool = True,
+    architecture: str = "x86_64",
+    allow_local_platform: bool = False,
+    build_dir: str = BUILD_DIR
+) -> Tuple[str, str]:
+    """
+    ## Bundle a Lambda Function
+    Build the asset folder of a function, or reuse it when nothing that is shipped has changed.
+
+    * param `source_dir`: The source folder of the function, e.g. `../../src/lambda/<lambda_name>`.
+    * param `lambda_name`: Name of the function, used for the build folder.
+    * param `runtime_name`: Name of the lambda runtime, e.g. `python3.8`. Requirements and bytecode are only handled for python runtimes.
+    * param `include`: Patterns of files to ship. Default: every file.
+    * param `exclude`: Patterns of files to leave out. Default: `DEFAULT_EXCLUDES`.
+    * param `compile_bytecode`: Precompile python files. Default: True
+    * param `architecture`: Instruction set of the function, `x86_64` or `arm64`, used to pick wheels. Default: x86_64
+    * param `allow_local_platform`: Install requirements for the local platform when the lambda platform has no wheels for them. Default: False, the build fails.
+    * param `build_dir`: Folder of the bundles. Default: `.build/lambda`, relative to the cdk app.
+    * returns `(bundle_dir, asset_hash)`
+    """
+    files = collect_files(source_dir, include, exclude)
+    is_python = runtime_name.startswith("python")
+    requirements_file = os.path.join(source_dir, "requirements.txt")
+    if not is_python or not os.path.exists(requirements_file):
+        requirements_file = None
+    build_options = f"{runtime_name}|{architecture}|{compile_bytecode}"
+    source_hash = compute_asset_hash(source_dir, files, requirements_file, build_options)
+
+    bundle_dir = os.path.join(build_dir, lambda_name)
+    marker = f"{bundle_dir}{HASH_MARKER}"
+    if os.path.isdir(bundle_dir) and os.path.exists(marker):
+        with open(marker, encoding="utf-8") as marker_file:
+            built_from, _separator, asset_hash = marker_file.read().partition(" ")
+        if built_from == source_hash and asset_hash:
+            return bundle_dir, asset_hash
+
+    if os.path.exists(marker):
+        os.remove(marker)
+    shutil.rmtree(bundle_dir, ignore_errors=True)
+    os.makedirs(bundle_dir)
+    for relative_path in files:
+        destination = os.path.join(bundle_dir, relative_path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copy2(os.path.join(source_dir, relative_path), destination)
+    outcome = {"platform": None, "compiled": False}
+    if is_python:
+        python_version = runtime_name[len("python"):]
+        if requirements_file is not None:
+            outcome["platform"] = _install_requirements(
+                requirements_file, bundle_dir, python_version, architecture, allow_local_platform
+            )
+        if compile_bytecode:
+            outcome["compiled"] = _compile_bytecode(bundle_dir, python_version)
+    asset_hash = hashlib.sha256(f"{source_hash}|{outcome['platform']}|{outcome['compiled']}".encode("utf-8")).hexdigest()
+    # The marker is written last, an interrupted build is rebuilt on the next synth. A build that could not do what
+    # was asked is rebuilt as well, in case the missing interpreter has been installed since.
+    if outcome["platform"] != "local" and outcome["compiled"] == (is_python and compile_bytecode):
+        with open(marker, "w", encoding="utf-8") as marker_file:
+            marker_file.write(f"{source_hash} {asset_hash}")
+    return bundle_dir, asset_hash
@@ -0,0 +1,342 @@
+"""
+# Capacity Planner Aspect
+
+This aspect checks at synth time that the lambda functions of a stack cannot push more concurrent load onto a downstream
+resource than the resource can absorb. Reserved concurrency, event source concurrency, connection limits and table
+throughput are set in different places, this aspect puts them side by side.
+"""
+import json
+import os
+from configparser import ConfigParser
+from typing import Dict, List, Optional, Set
+
+import jsii
+from aws_cdk import (
+    Annotations,
+    CfnResource,
+    IAspect,
+    Stack,
+    Stage
+)
+from constructs import IConstruct
+
+DEFAULT_LAMBDA_CONCURRENCY = 1000
+KINESIS_RECORDS_PER_SHARD = 1000
+SQS_FIFO_REQUESTS_PER_SECOND = 300
+DOWNSTREAM_PREFIX = "downstream:"
+
+
+def struct_value(struct, attribute: str):
+    """An attribute of an L1 property struct, which is a struct object or already a dictionary."""
+    if struct is None:
+        return None
+    if isinstance(struct, dict):
+        return struct.get(attribute, struct.get("".join(word.capitalize() if index else word
+                                                         for index, word in enumerate(attribute.split("_")))))
+    return getattr(struct, attribute, None)
+
+
+# The properties the planner reads, by resource type, from the attributes of the L1 resources.
+PROPERTY_READERS = {
+    "AWS::Lambda::Function": lambda resource: {
+        "FunctionName": resource.function_name,
+        "Role": resource.role,
+        "ReservedConcurrentExecutions": resource.reserved_concurrent_executions
+    },
+    "AWS::Lambda::EventSourceMapping": lambda resource: {
+        "FunctionName": resource.function_name,
+        "EventSourceArn": resource.event_source_arn,
+        "ParallelizationFactor": resource.parallelization_factor,
+        "MaximumConcurrency": struct_value(resource.scaling_config, "maximum_concurrency")
+    },
+    "AWS::Lambda::Permission": lambda resource: {"FunctionName": resource.function_name},
+    "AWS::Kinesis::Stream": lambda resource: {"Name": resource.name, "ShardCount": resource.shard_count},
+    "AWS::Kinesis::StreamConsumer": lambda resource: {"StreamARN": resource.stream_arn},
+    "AWS::DynamoDB::Table": lambda resource: {
+        "TableName": resource.table_name,
+        "ReadCapacityUnits": struct_value(resource.provisioned_throughput, "read_capacity_units"),
+        "WriteCapacityUnits": struct_value(resource.provisioned_throughput, "write_capacity_units")
+    },
+    "AWS::DynamoDB::GlobalTable": lambda resource: {"TableName": resource.table_name},
+    "AWS::SQS::Queue": lambda resource: {"QueueName": resource.queue_name, "FifoQueue": resource.fifo_queue},
+    "AWS::SNS::Topic": lambda resource: {"TopicName": resource.topic_name},
+    "AWS::S3::Bucket": lambda resource: {"BucketName": resource.bucket_name},
+    "AWS::IAM::Policy": lambda resource: {"PolicyDocument": resource.policy_document, "Roles": resource.roles},
+    "AWS::IAM::ManagedPolicy": lambda resource: {"PolicyDocument": resource.policy_document, "Roles": resource.roles}
+}
+
+
+def referenced_ids(value) -> Set[str]:
+    """Every logical id a template value points to with `Ref` or `Fn::GetAtt`, also inside `Fn::Join` or `Fn::Sub`."""
+    found = set()
+    if isinstance(value, dict):
+        if "Ref" in value and isinstance(value["Ref"], str):
+            found.add(value["Ref"])
+        elif "Fn::GetAtt" in value:
+            attribute = value["Fn::GetAtt"]
+            found.add(attribute[0] if isinstance(attribute, list) else attribute.split(".", 1)[0])
+        else:
+            for item in value.values():
+                found |= referenced_ids(item)
+    elif isinstance(value, list):
+        for item in value:
+            found |= referenced_ids(item)
+    return found
+
+
+class Downstream():
+    """A downstream resource and the limits it is checked against."""
+
+    def __init__(self, name: str, max_concurrency: int = None, max_requests_per_second: float = None,
+                 calls_per_invocation: float = 1.0, invocation_seconds: float = 1.0, severity: str = None,
+                 source: str = "template") -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_requests_per_second = max_requests_per_second
+        self.calls_per_invocation = calls_per_invocation
+        self.invocation_seconds = invocation_seconds
+        self.severity = severity
+        self.source = source
+
+
+@jsii.implements(IAspect)
+class CapacityPlanner():
+    """
+    # Capacity Planner
+    ### Add this aspect to a stack to compare the concurrency of its functions with the limits of what they call.
+    * the maximum concurrency of a function is its reserved concurrency, or the sum of the `MaximumConcurrency` of its SQS
+      event sources and the shards times the parallelization factor of its Kinesis event sources when nothing else invokes
+      it, or the account concurrency limit (`lambdaConcurrencyLimit` of the environment, default 1000).
+    * a function calls a resource when the policies of its role grant actions on it, or when a `[downstream:<name>]`
+      section of config.ini lists it in `functions`.
+    * limits come from the template (provisioned table throughput, provisioned stream shards, FIFO queues, the reserved
+      concurrency of an invoked function) and from the `[downstream:<name>]` sections of config.ini.
+    * an edge over its limit is an error or a warning, set with `capacityCheck` of the environment (error | warn).
+      Every edge is written to `<stack>.capacity-report.json` in `cdk.out`.
+
+    ```ini
+    [downstream:orders-db]
+    # a resource of the template named <appName>-<resource>, or an external resource with callers listed in `functions`
+    functions : sample_lambda
+    maxConcurrency : 90
+    maxConcurrency.prod : 400
+    maxRequestsPerSecond : 500
+    callsPerInvocation : 2
+    invocationSeconds : 0.2
+    ```
+    """
+
+    def __init__(
+        self,
+        config: ConfigParser,
+        env: str
+    ) -> None:
+        """
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        """
+        self.config = config
+        self.env = env
+        self.prefix = f"{config[env]['appName']}-"
+        self.account_concurrency = int(config[env].get('lambdaConcurrencyLimit', str(DEFAULT_LAMBDA_CONCURRENCY)))
+        self.severity = config[env].get('capacityCheck', 'warn').lower()
+        self.report: List[dict] = []
+
+    def visit(self, node: IConstruct) -> None:
+        if isinstance(node, Stack):
+            self.plan(node)
+
+    def option(self, section: str, key: str, fallback: str = None) -> Optional[str]:
+        """A `[downstream:*]` option, `<key>.<env>` taking precedence over `<key>`."""
+        return self.config[section].get(f"{key}.{self.env}", self.config[section].get(key, fallback))
+
+    def plan(self, stack: Stack) -> None:
+        resources: Dict[str, CfnResource] = {}
+        for child in stack.node.find_all():
+            if isinstance(child, CfnResource) and Stack.of(child) is stack:
+                resources[stack.resolve(child.logical_id)] = child
+        properties = {logical_id: self.read_properties(stack, resource) for logical_id, resource in resources.items()}
+        types = {logical_id: resource.cfn_resource_type for logical_id, resource in resources.items()}
+        functions = [logical_id for logical_id, resource_type in types.items() if resource_type == "AWS::Lambda::Function"]
+        names = {logical_id: self.physical_name(properties[logical_id]) for logical_id in resources}
+
+        edges = self.find_edges(types, properties, functions)
+        # A function reads its own event sources at the pace of its event source mapping, they are not downstream of it.
+        for logical_id, props in properties.items():
+            if types[logical_id] == "AWS::Lambda::EventSourceMapping":
+                sources = referenced_ids(props.get("EventSourceArn"))
+                sources |= {stream for source in sources for stream in referenced_ids(properties.get(source, {}).get("StreamARN"))}
+                for function in referenced_ids(props.get("FunctionName")):
+                    for source in sources:
+                        edges.pop((function, source), None)
+        invoked = {target for (_source, target), actions in edges.items()
+                   if types.get(target) == "AWS::Lambda::Function"
+                   and any(action in ("*", "lambda:*") or action.startswith("lambda:Invoke") for action in actions)}
+        invoked |= {next(iter(referenced_ids(props.get("FunctionName"))), None)
+                    for logical_id, props in properties.items() if types[logical_id] == "AWS::Lambda::Permission"}
+        concurrency = {function: self.function_concurrency(function, types, properties, function in invoked)
+                       for function in functions}
+        downstreams = self.template_downstreams(types, properties, names)
+        self.add_config_downstreams(downstreams, edges, names, functions)
+
+        for (function, target), _actions in sorted(edges.items()):
+            if target not in downstreams:
+                continue
+            self.check_edge(stack, resources.get(target) or resources[function], names[function] or function,
+                            concurrency[function], downstreams[target])
+        self.write_report(stack)
+
+    @staticmethod
+    def read_properties(stack: Stack, resource: CfnResource) -> dict:
+        """The properties the planner reads from a resource, resolved and named as in the template."""
+        reader = PROPERTY_READERS.get(resource.cfn_resource_type)
+        if reader is None:
+            return {}
+        return {key: value for key, value in stack.resolve(reader(resource)).items() if value is not None}
+
+    @staticmethod
+    def physical_name(properties: dict) -> Optional[str]:
+        for key in ("FunctionName", "TableName", "QueueName", "TopicName", "Name", "BucketName"):
+            if isinstance(properties.get(key), str):
+                return properties[key]
+        return None
+
+    @staticmethod
+    def find_edges(types: Dict[str, str], properties: Dict[str, dict], functions: List[str]) -> Dict[tuple, Set[str]]:
+        """The resources each function's role grants actions on, with the actions, from the policies of the stack."""
+        role_functions: Dict[str, List[str]] = {}
+        for function in functions:
+            for role in referenced_ids(properties[function].get("Role")):
+                role_functions.setdefault(role, []).append(function)
+        edges: Dict[tuple, Set[str]] = {}
+        for logical_id, resource_type in types.items():
+            if resource_type not in ("AWS::IAM::Policy", "AWS::IAM::ManagedPolicy"):
+                continue
+            policy = properties[logical_id]
+            callers = [function for role in referenced_ids(policy.get("Roles", [])) for function in role_functions.get(role, [])]
+            for statement in policy.get("PolicyDocument", {}).get("Statement", []):
+                if statement.get("Effect") != "Allow":
+                    continue
+                actions = statement.get("Action", [])
+                actions = set(actions if isinstance(actions, list) else [actions])
+                for target in referenced_ids(statement.get("Resource", [])):
+                    if target in types:
+                        for function in callers:
+                            edges.setdefault((function, target), set()).update(actions)
+        return edges
+
+    def function_concurrency(self, function: str, types: Dict[str, str], properties: Dict[str, dict], invoked: bool) -> dict:
+        """The maximum concurrency of a function and where it comes from."""
+        reserved = properties[function].get("ReservedConcurrentExecutions")
+        bounds = []
+        for logical_id, props in properties.items():
+            if types[logical_id] != "AWS::Lambda::EventSourceMapping" or function not in referenced_ids(props.get("FunctionName")):
+                continue
+            source = next(iter(referenced_ids(props.get("EventSourceArn"))), None)
+            source_type = types.get(source)
+            if source_type == "AWS::SQS::Queue" and props.get("MaximumConcurrency"):
+                bounds.append(int(props["MaximumConcurrency"]))
+            elif source_type == "AWS::Kinesis::Stream" and properties[source].get("ShardCount"):
+                bounds.append(int(properties[source]["ShardCount"]) * int(props.get("ParallelizationFactor", 1)))
+            elif source_type == "AWS::Kinesis::StreamConsumer":
+                stream = next(iter(referenced_ids(properties[source].get("StreamARN"))), None)
+                shards = properties.get(stream, {}).get("ShardCount")
+                bounds.append(int(shards) * int(props.get("ParallelizationFactor", 1)) if shards else None)
+            else:
+                bounds.append(None)
+        candidates = [(self.account_concurrency, "account concurrency limit")]
+        if isinstance(reserved, int):
+            candidates.append((reserved, "reserved concurrency"))
+        if bounds and None not in bounds and not invoked:
+            candidates.append((sum(bounds), "event source concurrency"))
+        value, origin = min(candidates, key=lambda candidate: candidate[0])
+        return {"value": value, "origin": origin}
+
+    def template_downstreams(self, types: Dict[str, str], properties: Dict[str, dict], names: Dict[str, str]) -> Dict[str, Downstream]:
+        """Limits the template declares: provisioned throughput, provisioned shards, FIFO queues and reserved concurrency."""
+        downstreams = {}
+        for logical_id, resource_type in types.items():
+            props = properties[logical_id]
+            name = names[logical_id] or logical_id
+            if resource_type == "AWS::DynamoDB::Table" and props.get("ReadCapacityUnits"):
+                downstreams[logical_id] = Downstream(name, max_requests_per_second=int(props["ReadCapacityUnits"])
+                                                     + int(props["WriteCapacityUnits"]), source="provisioned throughput")
+            elif resource_type == "AWS::Kinesis::Stream" and props.get("ShardCount"):
+                downstreams[logical_id] = Downstream(name, max_requests_per_second=int(props["ShardCount"]) * KINESIS_RECORDS_PER_SHARD,
+                                                     source="provisioned shards")
+            elif resource_type == "AWS::SQS::Queue" and props.get("FifoQueue"):
+                downstreams[logical_id] = Downstream(name, max_requests_per_second=SQS_FIFO_REQUESTS_PER_SECOND, source="FIFO queue")
+            elif resource_type == "AWS::Lambda::Function" and isinstance(props.get("ReservedConcurrentExecutions"), int):
+                downstreams[logical_id] = Downstream(name, max_concurrency=props["ReservedConcurrentExecutions"],
+                                                     source="reserved concurrency")
+        return downstreams
+
+    def add_config_downstreams(self, downstreams: Dict[str, Downstream], edges: Dict[tuple, Set[str]],
+                               names: Dict[str, str], functions: List[str]) -> None:
+        """Add the `[downstream:<name>]` sections of config.ini. They override the limits of the template."""
+        for section in self.config.sections():
+            if not section.startswith(DOWNSTREAM_PREFIX):
+                continue
+            name = section[len(DOWNSTREAM_PREFIX):]
+            resource = self.option(section, "resource", name)
+            target = next((logical_id for logical_id, physical in names.items()
+                           if physical in (resource, f"{self.prefix}{resource}") or logical_id == resource), None)
+            if target is None:
+                target = section
+            max_concurrency = self.option(section, "maxConcurrency")
+            max_requests = self.option(section, "maxRequestsPerSecond")
+            template_limit = downstreams.get(target)
+            downstreams[target] = Downstream(
+                name=names.get(target) or name,
+                max_concurrency=int(max_concurrency) if max_concurrency else getattr(template_limit, "max_concurrency", None),
+                max_requests_per_second=float(max_requests) if max_requests else getattr(template_limit, "max_requests_per_second", None),
+                calls_per_invocation=float(self.option(section, "callsPerInvocation", "1")),
+                invocation_seconds=float(self.option(section, "invocationSeconds", "1")),
+                severity=self.option(section, "severity"),
+                source=f"config.ini [{section}]"
+            )
+            callers = [caller.strip() for caller in self.option(section, "functions", "").split(",") if caller.strip()]
+            for caller in callers:
+                function = next((logical_id for logical_id in functions
+                                 if names[logical_id] in (caller, f"{self.prefix}{caller}")), None)
+                if function is not None:
+                    edges.setdefault((function, target), set())
+
+    def check_edge(self, stack: Stack, scope: CfnResource, function_name: str, concurrency: dict, downstream: Downstream) -> None:
+        """Compare the load of one function on one downstream resource with its limits, and record the edge."""
+        concurrent_calls = concurrency["value"] * downstream.calls_per_invocation
+        requests_per_second = concurrent_calls / downstream.invocation_seconds
+        problems = []
+        if downstream.max_concurrency is not None and concurrent_calls > downstream.max_concurrency:
+            problems.append(f"{concurrent_calls:.0f} concurrent calls > {downstream.max_concurrency} allowed")
+        if downstream.max_requests_per_second is not None and requests_per_second > downstream.max_requests_per_second:
+            problems.append(f"{requests_per_second:.0f} requests/s > {downstream.max_requests_per_second:.0f} allowed")
+        self.report.append({
+            "stack": stack.artifact_id,
+            "function": function_name,
+            "function_concurrency": concurrency["value"],
+            "concurrency_origin": concurrency["origin"],
+            "downstream": downstream.name,
+            "limit_origin": downstream.source,
+            "concurrent_calls": concurrent_calls,
+            "max_concurrency": downstream.max_concurrency,
+            "requests_per_second": requests_per_second,
+            "max_requests_per_second": downstream.max_requests_per_second,
+            "ok": not problems
+        })
+        if not problems:
+            return
+        message = (f"capacity planner: {function_name} ({concurrency['value']} from {concurrency['origin']}) can overload "
+                   f"{downstream.name} ({downstream.source}): {'; '.join(problems)}. Lower the reserved concurrency or the "
+                   f"event source maximum concurrency of the function, or raise the limit of the resource.")
+        if (downstream.severity or self.severity) == "error":
+            Annotations.of(scope).add_error(message)
+        else:
+            Annotations.of(scope).add_warning(message)
+
+    def write_report(self, stack: Stack) -> None:
+        """Write every edge of the stack to `<outdir>/<stack>.capacity-report.json`."""
+        outdir = Stage.of(stack).outdir
+        os.makedirs(outdir, exist_ok=True)
+        with open(os.path.join(outdir, f"{stack.artifact_id}.capacity-report.json"), "w", encoding="utf-8") as report_file:
+            json.dump([edge for edge in self.report if edge["stack"] == stack.artifact_id], report_file, indent=2)
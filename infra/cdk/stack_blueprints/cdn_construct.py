@@ -0,0 +1,155 @@
+"""
+# AWS CloudFront Construct Library
+
+This construct library allows you to create AWS CloudFront Distributions and related Resources.
+"""
+from typing import Dict, List
+from aws_cdk import (
+    Duration,
+    Stack,
+    aws_cloudfront as cloudfront,
+    aws_cloudfront_origins as origins,
+    aws_iam as iam,
+    aws_kms as kms,
+    aws_s3 as s3
+)
+
+
+class CdnConstruct():
+    """
+    # AWS CloudFront Construct Class
+    ### This class holds all methods to create AWS CloudFront Distributions and related Resources.
+    * `create_cache_policy`
+    * `create_bucket_distribution`
+    """
+
+    @staticmethod
+    def create_cache_policy(
+        stack: Stack,
+        config: dict,
+        env: str,
+        policy_name: str,
+        default_ttl: Duration,
+        max_ttl: Duration = None,
+        cache_key_headers: List[str] = None,
+        cache_key_query_strings: List[str] = None,
+        cache_key_cookies: List[str] = None
+    ) -> cloudfront.CachePolicy:
+        """
+        ## Create a CloudFront Cache Policy
+        Use this method to create a cache policy that also enables gzip and brotli compression.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `policy_name`: The name of the cache policy.
+        * param `default_ttl`: How long responses without Cache-Control headers are cached. Must be more than 0.
+        * param `max_ttl`: The longest a response is cached, whatever its Cache-Control headers say. Default: - `default_ttl`.
+        * param `cache_key_headers`: Request headers that are part of the cache key. Default: - no headers.
+        * param `cache_key_query_strings`: Query strings that are part of the cache key. Use ["*"] for every query string. Default: - no query strings.
+        * param `cache_key_cookies`: Cookies that are part of the cache key. Default: - no cookies.
+        * returns `aws_cloudfront.CachePolicy`
+        """
+        if cache_key_query_strings == ["*"]:
+            query_string_behavior = cloudfront.CacheQueryStringBehavior.all()
+        elif cache_key_query_strings:
+            query_string_behavior = cloudfront.CacheQueryStringBehavior.allow_list(*cache_key_query_strings)
+        else:
+            query_string_behavior = cloudfront.CacheQueryStringBehavior.none()
+        return cloudfront.CachePolicy(
+            scope=stack,
+            id=f"{config[env]['appName']}-cache-policy-{policy_name}",
+            cache_policy_name=f"{config[env]['appName']}-{policy_name}",
+            default_ttl=default_ttl,
+            min_ttl=Duration.seconds(0),
+            max_ttl=default_ttl if max_ttl is None else max_ttl,
+            header_behavior=(
+                cloudfront.CacheHeaderBehavior.allow_list(*cache_key_headers)
+                if cache_key_headers else cloudfront.CacheHeaderBehavior.none()
+            ),
+            query_string_behavior=query_string_behavior,
+            cookie_behavior=(
+                cloudfront.CacheCookieBehavior.allow_list(*cache_key_cookies)
+                if cache_key_cookies else cloudfront.CacheCookieBehavior.none()
+            ),
+            enable_accept_encoding_gzip=True,
+            enable_accept_encoding_brotli=True
+        )
+
+    @staticmethod
+    def create_bucket_distribution(
+        stack: Stack,
+        config: dict,
+        env: str,
+        bucket: s3.IBucket,
+        distribution_name: str,
+        cache_policy: cloudfront.ICachePolicy = None,
+        path_cache_policies: Dict[str, cloudfront.ICachePolicy] = None,
+        origin_shield_region: str = None,
+        kms_key: kms.IKey = None,
+        default_root_object: str = None,
+        price_class: cloudfront.PriceClass = None
+    ) -> cloudfront.Distribution:
+        """
+        ## Create a CloudFront Distribution for an S3 Bucket
+        Use this method to serve the objects of a bucket from CloudFront edge caches. The bucket stays private, CloudFront reads it
+        with an origin access control, and objects are compressed with gzip or brotli.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `bucket`: The bucket to serve, e.g. from `S3Construct.create_bucket` or `S3Construct.create_bucket_with_kms_encryption`.
+        * param `distribution_name`: The name of the distribution.
+        * param `cache_policy`: Cache policy of the distribution, see `create_cache_policy`. Default: CachePolicy.CACHING_OPTIMIZED
+        * param `path_cache_policies`: A dictionary with path patterns as keys, e.g. "processed/*", and the cache policy of those paths as value. Default: - every path uses `cache_policy`.
+        * param `origin_shield_region`: Region of the origin shield, an extra cache layer in front of the bucket. Use the region of the bucket. Default: - no origin shield.
+        * param `kms_key`: The KMS key of the bucket. Only needed when the bucket was imported, the key of a bucket created in the stack is granted automatically. Default: - the bucket is not KMS encrypted or its key is known.
+        * param `default_root_object`: The object returned for requests to the root URL, e.g. "index.html". Default: - no default root object.
+        * param `price_class`: The edge locations the distribution is served from. Default: PriceClass.PRICE_CLASS_100
+        * returns `aws_cloudfront.Distribution`
+        """
+        origin_props = {}
+        if origin_shield_region is not None:
+            origin_props['origin_shield_region'] = origin_shield_region
+        origin = origins.S3BucketOrigin.with_origin_access_control(bucket, **origin_props)
+
+        def behavior(policy: cloudfront.ICachePolicy) -> cloudfront.BehaviorOptions:
+            return cloudfront.BehaviorOptions(
+                origin=origin,
+                cache_policy=policy,
+                allowed_methods=cloudfront.AllowedMethods.ALLOW_GET_HEAD_OPTIONS,
+                cached_methods=cloudfront.CachedMethods.CACHE_GET_HEAD_OPTIONS,
+                viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+                compress=True
+            )
+
+        dict_props = {
+            "comment": f"{config[env]['appName']}-{distribution_name}",
+            "default_behavior": behavior(cloudfront.CachePolicy.CACHING_OPTIMIZED if cache_policy is None else cache_policy),
+            "price_class": cloudfront.PriceClass.PRICE_CLASS_100 if price_class is None else price_class
+        }
+        if path_cache_policies:
+            dict_props['additional_behaviors'] = {
+                path_pattern: behavior(policy) for path_pattern, policy in path_cache_policies.items()
+            }
+        if default_root_object is not None:
+            dict_props['default_root_object'] = default_root_object
+        distribution = cloudfront.Distribution(
+            scope=stack,
+            id=f"{config[env]['appName']}-distribution-{distribution_name}",
+            **dict_props
+        )
+        if kms_key is not None:
+            # A wildcard distribution keeps the key policy free of a reference to the distribution, which would be circular
+            # when the distribution serves a bucket encrypted with this key.
+            kms_key.add_to_resource_policy(iam.PolicyStatement(
+                principals=[iam.ServicePrincipal("cloudfront.amazonaws.com")],
+                actions=["kms:Decrypt"],
+                resources=["*"],
+                conditions={
+                    "StringLike": {
+                        "AWS:SourceArn": f"arn:{stack.partition}:cloudfront::{stack.account}:distribution/*"
+                    }
+                }
+            ))
+        return distribution
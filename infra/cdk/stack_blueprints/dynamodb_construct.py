@@ -3,6 +3,7 @@
 
 This construct library allows you to create AWS DynamoDB and related Resources.
 """
+from typing import Dict
 from aws_cdk import (
     Stack,
     aws_dynamodb as dynamodb,
@@ -19,6 +20,8 @@ class DynamodbConstruct():
     * `create_encrypted_dynamodb_table`
     * `create_dynamodb_table_with_sort_key`
     * `create_encrypted_dynamodb_table_with_sort_key`
+    * `create_global_dynamodb_table`
+    * `get_regional_dynamodb_table`
     * `dynamodb_full_access_managed_policy`
     * `get_dynamodb_read_write_policy`
     """
@@ -81,6 +84,81 @@ class DynamodbConstruct():
             partition_key=partition_key
         )
 
+    @staticmethod
+    def create_global_dynamodb_table(
+        stack: Stack,
+        config: dict,
+        env: str,
+        table_name: str,
+        partition_key: dynamodb.Attribute,
+        sort_key: dynamodb.Attribute = None,
+        replica_regions: list = None,
+        kms_key: kms.Key = None,
+        replica_key_arns: Dict[str, str] = None
+    ) -> dynamodb.TableV2:
+        """
+        ## Create a DynamoDB Global Table
+        Use this method to create a DynamoDB Table that is replicated to other regions. Every replica accepts reads and writes,
+        so functions in each region read and write the table through their region-local endpoint.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `table_name`: The name of the DynamoDB Table that will get created.
+        * param `partition_key`: A aws_dynamodb.Attribute object which defines your table's primary key.
+        * param `sort_key`: A aws_dynamodb.Attribute object which defines your table's sort key. Default: - No sort key.
+        * param `replica_regions`: Regions the table is replicated to. Must not contain the region of the stack. Default: - the `drRegion` of the environment in config.
+        * param `kms_key`: A aws_kms.Key object which will be used to encrypt/decrypt the table in the region of the stack. Default: - AWS owned key.
+        * param `replica_key_arns`: ARNs of the KMS keys used by the replicas, by region. Required if 'kms_key' is supplied.
+        * returns `dynamodb.TableV2`
+        """
+        regions = [config[env]['drRegion']] if replica_regions is None else replica_regions
+        dict_props = {
+            "table_name": f"{config[env]['appName']}-{table_name}",
+            "partition_key": partition_key,
+            "billing": dynamodb.Billing.on_demand(),
+            "point_in_time_recovery": True,
+            "replicas": [dynamodb.ReplicaTableProps(region=region) for region in regions]
+        }
+        if sort_key is not None:
+            dict_props['sort_key'] = sort_key
+        if kms_key is not None:
+            dict_props['encryption'] = dynamodb.TableEncryptionV2.customer_managed_key(
+                table_key=kms_key,
+                replica_key_arns=replica_key_arns
+            )
+        return dynamodb.TableV2(
+            scope=stack,
+            id=f"{config[env]['appName']}-dynamodb-{table_name}",
+            **dict_props
+        )
+
+    @staticmethod
+    def get_regional_dynamodb_table(
+        stack: Stack,
+        config: dict,
+        env: str,
+        primary_env: str,
+        table_name: str
+    ) -> dynamodb.ITableV2:
+        """
+        ## Get the Replica of a DynamoDB Global Table
+        Use this method in the stack of a replica region to reference the local replica of a table created with
+        `create_global_dynamodb_table` in the primary environment. Grants on the returned table apply to the replica in the region of the stack.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment of the replica region, e.g. stag-dr.
+        * param `primary_env`: The deployment environment that created the global table, e.g. stag.
+        * param `table_name`: The name of the DynamoDB Table that was passed to `create_global_dynamodb_table`.
+        * returns `dynamodb.ITableV2`
+        """
+        return dynamodb.TableV2.from_table_name(
+            scope=stack,
+            id=f"{config[env]['appName']}-dynamodb-{table_name}",
+            table_name=f"{config[primary_env]['appName']}-{table_name}"
+        )
+
     @staticmethod
     def grant_dynamodb_full_access(
         dynamodb_table: dynamodb.Table,
@@ -0,0 +1,107 @@
+"""
+# AWS EFS Construct Library
+
+This construct library allows you to create AWS EFS File Systems and Access Points that AWS Lambda Functions can mount.
+"""
+from typing import List
+from aws_cdk import (
+    RemovalPolicy,
+    Stack,
+    aws_ec2 as ec2,
+    aws_efs as efs,
+    aws_kms as kms
+)
+
+
+class EfsConstruct():
+    """
+    # AWS EFS Construct Class
+    ### This class holds all methods to create AWS EFS File Systems and related Resources.
+    * `create_file_system`
+    * `create_access_point`
+    """
+
+    @staticmethod
+    def create_file_system(
+        stack: Stack,
+        config: dict,
+        env: str,
+        file_system_name: str,
+        vpc: ec2.IVpc,
+        subnets: List[ec2.ISubnet] = None,
+        security_group: ec2.ISecurityGroup = None,
+        throughput_mode: efs.ThroughputMode = None,
+        kms_key: kms.Key = None
+    ) -> efs.FileSystem:
+        """
+        ## Create an EFS File System
+        Use this method to create an encrypted EFS File System in the VPC of your lambda functions, e.g. for models and native
+        libraries that do not fit in the lambda deployment package and layers.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `file_system_name`: The name of the file system.
+        * param `vpc`: The VPC the mount targets are created in. Use the VPC passed to `LambdaConstruct.create_lambda_function`.
+        * param `subnets`: Subnets of the mount targets. Use the subnets of the functions so reads do not cross availability zones. Default: - the private subnets of the VPC.
+        * param `security_group`: Security group of the mount targets. Default: - a new security group, functions that mount the file system are allowed in automatically.
+        * param `throughput_mode`: Throughput mode of the file system. Default: ThroughputMode.ELASTIC, which bursts for many concurrent cold starts.
+        * param `kms_key`: A aws_kms.Key object which will be used to encrypt/decrypt the file system. Default: - the AWS managed key for EFS.
+        * returns `aws_efs.FileSystem`
+        """
+        dict_props = {
+            "vpc": vpc,
+            "file_system_name": f"{config[env]['appName']}-{file_system_name}",
+            "encrypted": True,
+            "throughput_mode": efs.ThroughputMode.ELASTIC if throughput_mode is None else throughput_mode,
+            "performance_mode": efs.PerformanceMode.GENERAL_PURPOSE,
+            "removal_policy": RemovalPolicy.RETAIN
+        }
+        if subnets is not None:
+            dict_props['vpc_subnets'] = ec2.SubnetSelection(subnets=subnets)
+        if security_group is not None:
+            dict_props['security_group'] = security_group
+        if kms_key is not None:
+            dict_props['kms_key'] = kms_key
+        return efs.FileSystem(
+            scope=stack,
+            id=f"{config[env]['appName']}-efs-{file_system_name}",
+            **dict_props
+        )
+
+    @staticmethod
+    def create_access_point(
+        stack: Stack,
+        config: dict,
+        env: str,
+        file_system: efs.IFileSystem,
+        access_point_name: str,
+        path: str = None,
+        posix_uid: str = None,
+        posix_gid: str = None
+    ) -> efs.AccessPoint:
+        """
+        ## Create an EFS Access Point
+        Use this method to create the access point a lambda function mounts, see the `efs_access_point` param of
+        `LambdaConstruct.create_lambda_function`. The function sees the `path` folder of the file system at its mount path.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `file_system`: The file system, e.g. from `create_file_system`.
+        * param `access_point_name`: The name of the access point.
+        * param `path`: The folder of the file system exposed by the access point, created on first use. Default: /lambda
+        * param `posix_uid`: The user id functions access the files as. Default: 1001
+        * param `posix_gid`: The group id functions access the files as. Default: 1001
+        * returns `aws_efs.AccessPoint`
+        """
+        uid = "1001" if posix_uid is None else posix_uid
+        gid = "1001" if posix_gid is None else posix_gid
+        return efs.AccessPoint(
+            scope=stack,
+            id=f"{config[env]['appName']}-efs-access-point-{access_point_name}",
+            file_system=file_system,
+            path="/lambda" if path is None else path,
+            create_acl=efs.Acl(owner_uid=uid, owner_gid=gid, permissions="750"),
+            posix_user=efs.PosixUser(uid=uid, gid=gid)
+        )
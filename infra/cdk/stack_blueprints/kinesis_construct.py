@@ -0,0 +1,157 @@
+"""
+# AWS Kinesis Construct Library
+
+This construct library allows you to create AWS Kinesis Data Streams and wire them to AWS Lambda Functions.
+"""
+from aws_cdk import (
+    Duration,
+    Stack,
+    aws_iam as iam,
+    aws_kinesis as kinesis,
+    aws_kms as kms,
+    aws_lambda as _lambda,
+    aws_lambda_event_sources as event_sources,
+    aws_sns as sns,
+    aws_sqs as sqs
+)
+
+
+class KinesisConstruct():
+    """
+    # AWS Kinesis Construct Class
+    ### This class holds all methods to create AWS Kinesis Data Streams and related Resources.
+    * `create_stream`
+    * `add_stream_consumer`
+    """
+
+    @staticmethod
+    def create_stream(
+        stack: Stack,
+        config: dict,
+        env: str,
+        stream_name: str,
+        shard_count: int = None,
+        retention_period: Duration = None,
+        kms_key: kms.Key = None
+    ) -> kinesis.Stream:
+        """
+        ## Create a Kinesis Data Stream
+        Use this method to create a Kinesis Data Stream. Records with the same partition key are kept in order within a shard.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `stream_name`: The name of the stream.
+        * param `shard_count`: Number of shards of a provisioned stream. Default: - the stream is on-demand and scales its shards with the traffic.
+        * param `retention_period`: How long records are kept in the stream. Default: 24 hours
+        * param `kms_key`: A aws_kms.Key object which will be used to encrypt/decrypt the records. Default: - the AWS managed key for Kinesis.
+        * returns `aws_kinesis.Stream`
+        """
+        dict_props = {
+            "stream_name": f"{config[env]['appName']}-{stream_name}",
+            "encryption": kinesis.StreamEncryption.MANAGED
+        }
+        if shard_count is None:
+            dict_props['stream_mode'] = kinesis.StreamMode.ON_DEMAND
+        else:
+            dict_props['stream_mode'] = kinesis.StreamMode.PROVISIONED
+            dict_props['shard_count'] = shard_count
+        if retention_period is not None:
+            dict_props['retention_period'] = retention_period
+        if kms_key is not None:
+            dict_props['encryption'] = kinesis.StreamEncryption.KMS
+            dict_props['encryption_key'] = kms_key
+        return kinesis.Stream(
+            scope=stack,
+            id=f"{config[env]['appName']}-kinesis-{stream_name}",
+            **dict_props
+        )
+
+    @staticmethod
+    def add_stream_consumer(
+        stack: Stack,
+        config: dict,
+        env: str,
+        stream: kinesis.IStream,
+        lambda_function: _lambda.IFunction,
+        enhanced_fan_out: bool = None,
+        starting_position: _lambda.StartingPosition = None,
+        batch_size: int = None,
+        max_batching_window: Duration = None,
+        parallelization_factor: int = None,
+        bisect_batch_on_error: bool = None,
+        retry_attempts: int = None,
+        max_record_age: Duration = None,
+        report_batch_item_failures: bool = None,
+        on_failure_sns: sns.ITopic = None,
+        on_failure_sqs: sqs.IQueue = None
+    ) -> _lambda.EventSourceMapping:
+        """
+        ## Add a Lambda Consumer to a Kinesis Data Stream
+        Use this method to process the records of a stream with a lambda function. Call this method once per consuming function.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `stream`: The stream to consume, e.g. from `create_stream`.
+        * param `lambda_function`: The lambda function that processes the records.
+        * param `enhanced_fan_out`: Register a dedicated consumer with its own 2 MB/s read throughput per shard and push delivery, instead of sharing the read throughput of the stream with other consumers. Default: False
+        * param `starting_position`: Where to start reading a new consumer. Default: StartingPosition.LATEST
+        * param `batch_size`: The largest number of records read in a batch. Minimum: 1 Maximum: 10000 Default: 100
+        * param `max_batching_window`: How long to gather records before invoking the function. Maximum: 5 minutes Default: - the function is invoked as soon as records are available.
+        * param `parallelization_factor`: Number of batches processed concurrently from each shard, records with the same partition key stay in order. Minimum: 1 Maximum: 10 Default: 1
+        * param `bisect_batch_on_error`: Split a failed batch in two and retry the halves, so a bad record does not block the shard. Default: False
+        * param `retry_attempts`: The maximum number of times a failed batch is retried. Default: - retried until the record expires.
+        * param `max_record_age`: Records older than this are sent to the failure destination instead of the function. Minimum: 60 seconds Maximum: 7 days Default: - the retention period of the stream.
+        * param `report_batch_item_failures`: Let the function return the records that failed, so only those are retried. Default: False
+        * param `on_failure_sns`: SNS Topic which receives the details of discarded batches, e.g. from `SnsConstruct`.
+        * param `on_failure_sqs`: SQS Queue which receives the details of discarded batches, e.g. from `SqsConstruct.create_sqs_queue`.
+        * returns `aws_lambda.EventSourceMapping`
+        """
+        dict_props = {
+            "target": lambda_function,
+            "event_source_arn": stream.stream_arn,
+            "starting_position": _lambda.StartingPosition.LATEST if starting_position is None else starting_position,
+            "batch_size": 100 if batch_size is None else batch_size
+        }
+        if max_batching_window is not None:
+            dict_props['max_batching_window'] = max_batching_window
+        if parallelization_factor is not None:
+            dict_props['parallelization_factor'] = parallelization_factor
+        if bisect_batch_on_error is not None:
+            dict_props['bisect_batch_on_error'] = bisect_batch_on_error
+        if retry_attempts is not None:
+            dict_props['retry_attempts'] = retry_attempts
+        if max_record_age is not None:
+            dict_props['max_record_age'] = max_record_age
+        if report_batch_item_failures is not None:
+            dict_props['report_batch_item_failures'] = report_batch_item_failures
+        if on_failure_sns is not None:
+            dict_props['on_failure'] = event_sources.SnsDlq(on_failure_sns)
+        if on_failure_sqs is not None:
+            dict_props['on_failure'] = event_sources.SqsDlq(on_failure_sqs)
+
+        grants = [stream.grant_read(lambda_function)]
+        if enhanced_fan_out:
+            consumer = kinesis.CfnStreamConsumer(
+                scope=stack,
+                id=f"{config[env]['appName']}-kinesis-consumer-{stream.node.id}-{lambda_function.node.id}",
+                consumer_name=f"{lambda_function.node.id}-consumer",
+                stream_arn=stream.stream_arn
+            )
+            dict_props['event_source_arn'] = consumer.attr_consumer_arn
+            grants.append(iam.Grant.add_to_principal(
+                grantee=lambda_function,
+                actions=["kinesis:SubscribeToShard", "kinesis:DescribeStreamConsumer"],
+                resource_arns=[consumer.attr_consumer_arn]
+            ))
+
+        mapping = _lambda.EventSourceMapping(
+            scope=stack,
+            id=f"{config[env]['appName']}-kinesis-mapping-{stream.node.id}-{lambda_function.node.id}",
+            **dict_props
+        )
+        # The mapping is validated on creation, the function must already be allowed to read the stream.
+        for grant in grants:
+            grant.apply_before(mapping)
+        return mapping
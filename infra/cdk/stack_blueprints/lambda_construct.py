@@ -5,6 +5,8 @@ This construct library allows you to create AWS Lambda Functions.
 """
 from typing import List
 from aws_cdk import (
+    AssetHashType,
+    Size,
     Stack,
     Tags,
     Duration,
@@ -13,8 +15,11 @@ from aws_cdk import (
     aws_s3 as s3,
     aws_sns as sns,
     aws_lambda_destinations as destinations,
-    aws_ec2 as ec2
+    aws_ec2 as ec2,
+    aws_efs as efs,
+    aws_logs as logs
 )
+from .asset_bundling import bundle_function
 
 
 class LambdaConstruct():
@@ -48,7 +53,18 @@ class LambdaConstruct():
         vpc: ec2.Vpc = None,
         subnets: List[ec2.Subnet] = None,
         security_groups: List[ec2.SecurityGroup] = None,
-        allow_public_subnet: bool = None
+        allow_public_subnet: bool = None,
+        tracing: _lambda.Tracing = None,
+        bundling_include: List[str] = None,
+        bundling_exclude: List[str] = None,
+        compile_bytecode: bool = None,
+        efs_access_point: efs.IAccessPoint = None,
+        efs_mount_path: str = None,
+        log_retention: logs.RetentionDays = None,
+        logging_format: _lambda.LoggingFormat = None,
+        application_log_level: _lambda.ApplicationLogLevel = None,
+        system_log_level: _lambda.SystemLogLevel = None,
+        ephemeral_storage_size: Size = None
     ) -> _lambda.Function:
         """
         ## Create a Lambda Function
@@ -68,24 +84,57 @@ class LambdaConstruct():
         * param `reserved_concurrent_executions`: The maximum of concurrent executions you want to reserve for the function. Default: - No specific limit.
         * param `on_failure_lambda`: Lambda function that will be triggered on failed invocations.
         * param `on_failure_sns`: SNS Topic which will be triggered on failed invocations.
-        * param `code_location`: The source code of your Lambda function. Default: src/lambda/<lambda_name>
+        * param `code_location`: The source code of your Lambda function. Default: a minimal bundle of src/lambda/<lambda_name>, see `bundling_include`.
         * param `retries`: The maximum number of times to retry when the function returns an error. Minimum: 0 Maximum: 2 Default: 2
         * param `vpc`: VPC network to place Lambda network interfaces. Specify this if the Lambda function needs to access resources in a VPC. Default: - Function is not placed within a VPC.
         * param `subnets`: List of subnets to place the network interfaces within the VPC. Only used if 'vpc' is supplied. Note: internet access for Lambdas requires a NAT gateway, so picking Public subnets is not allowed. Default: - the Vpc default strategy if not specified
         * param `security_groups`: The list of security groups to associate with the Lambda's network interfaces. Only used if 'vpc' is supplied. Default: - If the function is placed within a VPC and a security group is not specified, either by this or securityGroup prop, a dedicated security group will be created for this function.
         * param `allow_public_subnet`: Lambda Functions in a public subnet can NOT access the internet. Use this property to acknowledge this limitation and still place the function in a public subnet. Default: false
+        * param `tracing`: X-Ray tracing mode of the function. Default: - the `lambdaTracing` value of the environment in config (ACTIVE | PASS_THROUGH | DISABLED), otherwise no tracing.
+        * param `bundling_include`: Patterns of the files in src/lambda/<lambda_name> that are shipped. Only used if 'code_location' is not supplied. A src/lambda/<lambda_name>/requirements.txt is installed into the asset, with wheels for the lambda platform unless `bundlingAllowLocalPlatform` is true for the environment in config. Default: - every file.
+        * param `bundling_exclude`: Patterns of the files in src/lambda/<lambda_name> that are not shipped. Only used if 'code_location' is not supplied. Default: - tests, sample events, caches and requirements.txt, see `asset_bundling.DEFAULT_EXCLUDES`.
+        * param `compile_bytecode`: Ship precompiled bytecode so the first import skips compilation. Only used if 'code_location' is not supplied. Default: True
+        * param `efs_access_point`: An EFS access point to mount, see `EfsConstruct.create_access_point`, for models and libraries larger than the deployment package limit. Requires 'vpc'. The mount path is passed to the function as EFS_MOUNT_PATH, see `layer_utils.efs_loader`. Default: - no file system is mounted.
+        * param `efs_mount_path`: Where the access point is mounted, must start with /mnt/. Only used if 'efs_access_point' is supplied. Default: /mnt/efs
+        * param `log_retention`: How long the logs of the function are kept. The function logs to a log group created with it. Default: - the `logRetention` value of the environment in config (e.g. TWO_WEEKS), otherwise the logs are kept forever in /aws/lambda/<function name>.
+        * param `logging_format`: Format of the logs of the function, JSON or TEXT. Default: - the `logFormat` value of the environment in config, otherwise TEXT.
+        * param `application_log_level`: Lowest level of the logs written by the function code that are kept. Only used with the JSON format, see `layer_utils.logger`. Default: - the `applicationLogLevel` value of the environment in config, otherwise INFO.
+        * param `system_log_level`: Lowest level of the logs written by the lambda runtime (START, END, REPORT lines) that are kept. Only used with the JSON format. Default: - the `systemLogLevel` value of the environment in config, otherwise INFO.
+        * param `ephemeral_storage_size`: Size of /tmp, between 512 MiB and 10 GiB, e.g. `Size.gibibytes(2)`. Size it for the reference data cached with `layer_utils.disk_cache`, which uses 80% of /tmp by default. Default: 512 MiB
         * returns `aws_lambda.Function`
         """
+        runtime = _lambda.Runtime.PYTHON_3_8 if language is None else language
+        if code_location is None:
+            bundle_dir, asset_hash = bundle_function(
+                source_dir=f"../../src/lambda/{lambda_name}",
+                lambda_name=lambda_name,
+                runtime_name=runtime.name,
+                include=bundling_include,
+                exclude=bundling_exclude,
+                compile_bytecode=True if compile_bytecode is None else compile_bytecode,
+                allow_local_platform=config[env].getboolean('bundlingAllowLocalPlatform', fallback=False)
+            )
+            code_location = _lambda.Code.from_asset(
+                bundle_dir,
+                asset_hash=asset_hash,
+                asset_hash_type=AssetHashType.CUSTOM
+            )
         dict_props = {
-            "code": _lambda.Code.from_asset(f"../../src/lambda/{lambda_name}") if code_location is None else code_location,
+            "code": code_location,
             "handler": "lambda_function.lambda_handler" if handler is None else handler,
-            "runtime": _lambda.Runtime.PYTHON_3_8 if language is None else language,
+            "runtime": runtime,
             "function_name": f"{config[env]['appName']}-{lambda_name}",
             "memory_size": 256 if memory_size is None else memory_size,
             "timeout": Duration.minutes(1) if time_out is None else time_out
         }
         if env_variables is not None:
             dict_props['environment'] = env_variables
+        if efs_access_point is not None:
+            mount_path = "/mnt/efs" if efs_mount_path is None else efs_mount_path
+            dict_props['filesystem'] = _lambda.FileSystem.from_efs_access_point(efs_access_point, mount_path)
+            dict_props['environment'] = dict(dict_props.get('environment', {}), EFS_MOUNT_PATH=mount_path)
+        if ephemeral_storage_size is not None:
+            dict_props['ephemeral_storage_size'] = ephemeral_storage_size
         if role is not None:
             dict_props['role'] = role
         if layers is not None:
@@ -108,6 +157,31 @@ class LambdaConstruct():
             dict_props['security_groups'] = security_groups
         if allow_public_subnet is not None:
             dict_props['allow_public_subnet'] = allow_public_subnet
+        if tracing is not None:
+            dict_props['tracing'] = tracing
+        elif config[env].get('lambdaTracing') is not None:
+            dict_props['tracing'] = _lambda.Tracing[config[env]['lambdaTracing'].upper()]
+        if log_retention is None and config[env].get('logRetention') is not None:
+            log_retention = logs.RetentionDays[config[env]['logRetention'].upper()]
+        if log_retention is not None:
+            dict_props['log_group'] = logs.LogGroup(
+                scope=stack,
+                id=f"{lambda_name}-{env}-logs",
+                retention=log_retention
+            )
+        if logging_format is None and config[env].get('logFormat') is not None:
+            logging_format = _lambda.LoggingFormat[config[env]['logFormat'].upper()]
+        if logging_format is not None:
+            dict_props['logging_format'] = logging_format
+        if logging_format == _lambda.LoggingFormat.JSON:
+            if application_log_level is None and config[env].get('applicationLogLevel') is not None:
+                application_log_level = _lambda.ApplicationLogLevel[config[env]['applicationLogLevel'].upper()]
+            if system_log_level is None and config[env].get('systemLogLevel') is not None:
+                system_log_level = _lambda.SystemLogLevel[config[env]['systemLogLevel'].upper()]
+            if application_log_level is not None:
+                dict_props['application_log_level_v2'] = application_log_level
+            if system_log_level is not None:
+                dict_props['system_log_level_v2'] = system_log_level
 
         return _lambda.Function(
             scope=stack,
@@ -0,0 +1,387 @@
+"""
+# IAM Policy Minimizer Aspect
+
+This aspect rewrites the IAM policies of a stack at synth time so they stay under the IAM size limits and take less
+room in the template. The construct libraries create a statement per resource (e.g. `SqsConstruct.get_sqs_read_permission`,
+`LambdaConstruct.get_lambda_basic_permissions` and every `grant_*`), which add up in large stacks.
+"""
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import jsii
+from aws_cdk import (
+    Annotations,
+    CfnResource,
+    IAspect,
+    Stack,
+    Stage,
+    aws_iam as iam
+)
+from constructs import IConstruct
+
+INLINE_POLICY_LIMIT = 10240
+MANAGED_POLICY_LIMIT = 6144
+# IAM counts the deployed document, where a Ref or GetAtt is replaced by an ARN.
+TOKEN_SIZE_ESTIMATE = 128
+PSEUDO_PARAMETER_SIZES = {"AWS::Partition": 10, "AWS::Region": 14, "AWS::AccountId": 12, "AWS::URLSuffix": 16}
+DOCUMENT_OVERHEAD = len('{"Version":"2012-10-17","Statement":[]}')
+ARN_HEAD = "arn:${AWS::Partition}:%s:${AWS::Region}:${AWS::AccountId}:"
+
+# Resource types whose ARN can be written from their name: the name property, how the template references the ARN,
+# and the ARN with `{name}` in place of the name.
+ARN_FORMATS = {
+    "AWS::SQS::Queue": ("queue_name", "Arn", ARN_HEAD % "sqs" + "{name}"),
+    "AWS::SNS::Topic": ("topic_name", "Ref", ARN_HEAD % "sns" + "{name}"),
+    "AWS::DynamoDB::Table": ("table_name", "Arn", ARN_HEAD % "dynamodb" + "table/{name}"),
+    "AWS::DynamoDB::GlobalTable": ("table_name", "Arn", ARN_HEAD % "dynamodb" + "table/{name}"),
+    "AWS::Lambda::Function": ("function_name", "Arn", ARN_HEAD % "lambda" + "function:{name}"),
+    "AWS::Kinesis::Stream": ("name", "Arn", ARN_HEAD % "kinesis" + "stream/{name}"),
+    "AWS::StepFunctions::StateMachine": ("state_machine_name", "Arn", ARN_HEAD % "states" + "stateMachine:{name}"),
+    "AWS::S3::Bucket": ("bucket_name", "Arn", "arn:${AWS::Partition}:s3:::{name}")
+}
+
+
+def to_list(value) -> list:
+    return value if isinstance(value, list) else [value]
+
+
+def from_list(values: list):
+    """A single action or resource is written without a list, as CDK does."""
+    return values[0] if len(values) == 1 else values
+
+
+def key_of(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def unique(values: list) -> list:
+    seen = {}
+    for value in values:
+        seen.setdefault(key_of(value), value)
+    return list(seen.values())
+
+
+def estimate_size(value) -> int:
+    """The size IAM counts for a document once deployed, without whitespace."""
+    if isinstance(value, dict):
+        if "Fn::Sub" in value and isinstance(value["Fn::Sub"], str):
+            literal = re.sub(r"\$\{([^}]+)\}", lambda match: "x" * PSEUDO_PARAMETER_SIZES.get(match.group(1), TOKEN_SIZE_ESTIMATE),
+                             value["Fn::Sub"])
+            return len(json.dumps(literal))
+        if "Fn::Join" in value:
+            return sum(estimate_size(part) for part in value["Fn::Join"][1])
+        if "Ref" in value or "Fn::GetAtt" in value:
+            return TOKEN_SIZE_ESTIMATE
+        return sum(len(json.dumps(key)) + 1 + estimate_size(item) for key, item in value.items()) + len(value) + 1
+    if isinstance(value, list):
+        return sum(estimate_size(item) for item in value) + len(value) + 1
+    return len(json.dumps(value))
+
+
+def template_size(value) -> int:
+    """The size a value takes in the template, without whitespace."""
+    return len(key_of(value))
+
+
+def normalize_actions(actions: list) -> list:
+    """Drop duplicate actions and actions covered by a `service:*` or `*` action of the same list."""
+    actions = unique(actions)
+    if "*" in actions:
+        return ["*"]
+    services = {action.split(":", 1)[0] for action in actions if isinstance(action, str) and action.endswith(":*")}
+    return sorted(
+        (action for action in actions
+         if not isinstance(action, str) or action.endswith(":*") or action.split(":", 1)[0] not in services),
+        key=key_of
+    )
+
+
+def normalize_resources(resources: list) -> list:
+    resources = unique(resources)
+    return ["*"] if "*" in resources else resources
+
+
+def is_mergeable(statement: dict) -> bool:
+    """Statements with principals or negated elements are kept as they are."""
+    return ("Action" in statement and "Resource" in statement
+            and not {"Principal", "NotPrincipal", "NotAction", "NotResource"} & set(statement))
+
+
+def merge_statements(statements: List[dict], by: str) -> List[dict]:
+    """
+    Merge mergeable statements with the same effect, condition and `by` element ("Action" or "Resource") into one
+    statement with the union of their other element. Statements keep their first position.
+    """
+    other = "Resource" if by == "Action" else "Action"
+    merged: Dict[str, dict] = {}
+    result = []
+    for statement in statements:
+        if not is_mergeable(statement):
+            result.append(statement)
+            continue
+        group = key_of([statement["Effect"], statement.get("Condition"), sorted(key_of(v) for v in to_list(statement[by]))])
+        if group in merged:
+            target = merged[group]
+            target[other] = to_list(target[other]) + to_list(statement[other])
+            target.pop("Sid", None)
+        else:
+            merged[group] = dict(statement)
+            result.append(merged[group])
+    for statement in merged.values():
+        statement["Action"] = from_list(normalize_actions(to_list(statement["Action"])))
+        statement["Resource"] = from_list(normalize_resources(to_list(statement["Resource"])))
+    return result
+
+
+class ResourceIndex():
+    """The physical names of the resources of a stack by logical id, for the resource types of `ARN_FORMATS`."""
+
+    def __init__(self, stack: Stack) -> None:
+        self.stack = stack
+        self.resources: Dict[str, Tuple[str, str]] = {}
+        self.names_by_head: Dict[str, set] = {}
+        for child in stack.node.find_all():
+            if not isinstance(child, CfnResource) or Stack.of(child) is not stack:
+                continue
+            arn_format = ARN_FORMATS.get(child.cfn_resource_type)
+            if arn_format is None:
+                continue
+            name = stack.resolve(getattr(child, arn_format[0], None))
+            if isinstance(name, str):
+                self.resources[stack.resolve(child.logical_id)] = (child.cfn_resource_type, name)
+                self.names_by_head.setdefault(arn_format[2].split("{name}", 1)[0], set()).add(name)
+
+    def parse(self, resource) -> Optional[Tuple[str, str, str]]:
+        """
+        Split a resource of a statement into the ARN up to the name of the resource, the name and the rest of the ARN.
+        Works for literal ARNs and for references to the resources of the stack, e.g. `{"Fn::GetAtt": [id, "Arn"]}`
+        or `{"Fn::Join": ["", [{"Fn::GetAtt": [id, "Arn"]}, "/index/*"]]}`.
+        """
+        suffix = ""
+        if isinstance(resource, dict) and "Fn::Join" in resource and resource["Fn::Join"][0] == "":
+            parts = resource["Fn::Join"][1]
+            if not all(isinstance(part, str) for part in parts[1:]):
+                return None
+            resource, suffix = parts[0], "".join(parts[1:])
+        if isinstance(resource, dict):
+            if "Ref" in resource:
+                logical_id, attribute = resource["Ref"], "Ref"
+            elif "Fn::GetAtt" in resource:
+                logical_id, attribute = resource["Fn::GetAtt"]
+            else:
+                return None
+            if logical_id not in self.resources:
+                return None
+            resource_type, name = self.resources[logical_id]
+            if ARN_FORMATS[resource_type][1] != attribute:
+                return None
+            head = ARN_FORMATS[resource_type][2].split("{name}", 1)[0]
+            return head, name, suffix
+        if isinstance(resource, str) and resource.startswith("arn:") and resource.count(":") >= 5:
+            fields = resource.split(":", 5)
+            match = re.match(r"^([a-zA-Z]+[/:])?([^/:]+)(.*)$", fields[5])
+            if match is None:
+                return None
+            head = ":".join(fields[:5]) + ":" + (match.group(1) or "")
+            return head, match.group(2), match.group(3) + suffix
+        return None
+
+
+def collapse_resources(resources: list, index: ResourceIndex, prefix: str, min_group: int) -> list:
+    """
+    Replace resources of the same type whose names start with `prefix` by a wildcard ARN on their common name prefix,
+    e.g. the ARNs of `<appName>-orders-a` and `<appName>-orders-b` by `arn:...:<appName>-orders-*`.
+    A wildcard is only used when it matches exactly the listed resources among those of the stack: every listed resource
+    is a resource of the stack, and no other resource of the stack of the same type matches it. Resources created outside
+    of the stack are not known, the prefix holds the environment and region of the app so that they are unlikely to match.
+    """
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for position, resource in enumerate(resources):
+        parsed = index.parse(resource)
+        if parsed is not None and parsed[1].startswith(prefix) and "*" not in parsed[1]:
+            groups.setdefault((parsed[0], parsed[2]), []).append(position)
+    replaced: Dict[int, object] = {}
+    for (head, suffix), positions in groups.items():
+        if len(positions) < min_group:
+            continue
+        names = {index.parse(resources[position])[1] for position in positions}
+        known = index.names_by_head.get(head, set())
+        if not names <= known:
+            continue
+        common = os.path.commonprefix(sorted(names))
+        if any(name.startswith(common) for name in known - names):
+            continue
+        pattern = f"{head}{common}*{suffix}"
+        replaced[positions[0]] = {"Fn::Sub": pattern} if "${" in pattern else pattern
+        for position in positions[1:]:
+            replaced[position] = None
+    return [replaced.get(position, resource) for position, resource in enumerate(resources)
+            if replaced.get(position, resource) is not None]
+
+
+def split_statements(statements: List[dict], first_limit: int, limit: int) -> List[List[dict]]:
+    """Pack statements in order into documents, the first one up to `first_limit` and the others up to `limit`."""
+    documents: List[List[dict]] = [[]]
+    size = DOCUMENT_OVERHEAD
+    for statement in statements:
+        statement_size = estimate_size(statement) + 1
+        current_limit = first_limit if len(documents) == 1 else limit
+        if documents[-1] and size + statement_size > current_limit:
+            documents.append([])
+            size = DOCUMENT_OVERHEAD
+        documents[-1].append(statement)
+        size += statement_size
+    return documents
+
+
+@jsii.implements(IAspect)
+class PolicyMinimizer():
+    """
+    # IAM Policy Minimizer
+    ### Add this aspect to a stack to minimize its `AWS::IAM::Policy` and `AWS::IAM::ManagedPolicy` resources at synth time.
+    * merges statements with the same effect, condition and actions, then with the same resources.
+    * optionally replaces the resources of the app in a statement by a wildcard on their common name, e.g.
+      `<appName>-orders-*` for its order queues, when the wildcard matches no other resource of the stack.
+    * moves the statements over the IAM size limit into managed policies attached to the same roles, users and groups.
+      The `OverflowPolicyN` policies CDK already split from a role policy are left as they are.
+    * reports the template bytes saved per policy as an info annotation and in `<stack>.policy-minimizer.json` in `cdk.out`.
+
+    ```python
+    Aspects.of(stack).add(PolicyMinimizer(config=config, env=env))
+    ```
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        env: str,
+        collapse_wildcards: bool = False,
+        min_wildcard_group: int = 2,
+        inline_policy_limit: int = INLINE_POLICY_LIMIT,
+        managed_policy_limit: int = MANAGED_POLICY_LIMIT
+    ) -> None:
+        """
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `collapse_wildcards`: Replace resources of the app by wildcard ARNs that match exactly the same resources of the stack. Only Allow statements are changed. Default: False
+        * param `min_wildcard_group`: Number of resources of the same type a statement needs before they are replaced by a wildcard. Default: 2
+        * param `inline_policy_limit`: Size of an inline policy before statements are moved to managed policies. Lower it for roles with several inline policies, IAM limits their total. Default: 10240
+        * param `managed_policy_limit`: Size of a managed policy before its statements are split across managed policies. Default: 6144
+        """
+        self.prefix = f"{config[env]['appName']}-"
+        self.collapse_wildcards = collapse_wildcards
+        self.min_wildcard_group = min_wildcard_group
+        self.inline_policy_limit = inline_policy_limit
+        self.managed_policy_limit = managed_policy_limit
+        self.indexes: Dict[str, ResourceIndex] = {}
+        self.report: Dict[str, Dict[str, dict]] = {}
+        self.overflow_paths = set()
+
+    def visit(self, node: IConstruct) -> None:
+        if isinstance(node, iam.CfnPolicy):
+            self.minimize(node, self.inline_policy_limit)
+        elif isinstance(node, iam.CfnManagedPolicy) and not self.is_overflow(node):
+            self.minimize(node, self.managed_policy_limit)
+
+    def is_overflow(self, policy: iam.CfnManagedPolicy) -> bool:
+        """
+        Whether a managed policy holds statements split from another policy, by this aspect or by CDK, which moves the
+        statements of a role policy over the size limit into `OverflowPolicyN` managed policies of the role.
+        Minimizing those again would only chain more policies onto them.
+        """
+        parent = policy.node.scope
+        return (policy.node.path in self.overflow_paths
+                or (parent is not None and parent.node.id.startswith("OverflowPolicy")
+                    and isinstance(parent.node.scope, iam.Role)))
+
+    def minimize_document(self, stack: Stack, document: dict) -> List[dict]:
+        """Return the minimized statements of a resolved policy document."""
+        statements = [dict(statement) for statement in to_list(document.get("Statement", []))]
+        statements = merge_statements(statements, by="Action")
+        if self.collapse_wildcards:
+            if stack.node.path not in self.indexes:
+                self.indexes[stack.node.path] = ResourceIndex(stack)
+            index = self.indexes[stack.node.path]
+            for statement in statements:
+                if is_mergeable(statement) and statement["Effect"] == "Allow":
+                    statement["Resource"] = from_list(collapse_resources(
+                        to_list(statement["Resource"]), index, self.prefix, self.min_wildcard_group))
+        previous = None
+        while previous != len(statements):
+            previous = len(statements)
+            statements = merge_statements(merge_statements(statements, by="Resource"), by="Action")
+        return statements
+
+    def minimize(self, policy, limit: int) -> None:
+        stack = Stack.of(policy)
+        document = stack.resolve(policy.policy_document)
+        if not isinstance(document, dict) or "Statement" not in document:
+            return
+        statements = self.minimize_document(stack, document)
+        chunks = split_statements(statements, limit, self.managed_policy_limit)
+        version = document.get("Version", "2012-10-17")
+        policy.policy_document = {"Version": version, "Statement": chunks[0]}
+
+        overflow_size = 0
+        for position, chunk in enumerate(chunks[1:], start=1):
+            overflow_document = {"Version": version, "Statement": chunk}
+            if estimate_size(overflow_document) > self.managed_policy_limit:
+                Annotations.of(policy).add_warning(
+                    "policy minimizer: a statement is over the managed policy size limit on its own, split it by resource"
+                )
+            overflow = self.add_overflow_policy(stack, policy, position, overflow_document)
+            overflow_size += template_size({"Type": "AWS::IAM::ManagedPolicy", "Properties": {
+                "PolicyDocument": overflow_document, "Roles": stack.resolve(overflow.roles)
+            }})
+
+        saved = template_size(document) - template_size(policy.policy_document) - overflow_size
+        entry = {
+            "statements_before": len(to_list(document["Statement"])),
+            "statements_after": len(statements),
+            "overflow_policies": len(chunks) - 1,
+            "bytes_saved": saved
+        }
+        self.report.setdefault(stack.artifact_id, {})[policy.node.path] = entry
+        Annotations.of(policy).add_info(
+            f"policy minimizer: {entry['statements_before']} statement(s) to {entry['statements_after']}, "
+            f"{entry['overflow_policies']} overflow policy(ies), {saved} template bytes saved"
+        )
+        self.write_report(stack)
+
+    def add_overflow_policy(self, stack: Stack, policy, position: int, document: dict) -> iam.CfnManagedPolicy:
+        """Create a managed policy for statements over the limit, attached where `policy` is attached."""
+        overflow = iam.CfnManagedPolicy(
+            scope=policy.node.scope,
+            id=f"{policy.node.id}Overflow{position}",
+            policy_document=document,
+            roles=policy.roles,
+            users=policy.users,
+            groups=policy.groups
+        )
+        self.overflow_paths.add(overflow.node.path)
+        policy_ref = {"Ref": stack.resolve(policy.logical_id)}
+        for child in stack.node.find_all():
+            if not isinstance(child, CfnResource) or child is overflow or Stack.of(child) is not stack:
+                continue
+            # Resources that wait for the policy, e.g. a function waiting for the permissions of its role, wait for the overflow too.
+            if policy in child.obtain_dependencies():
+                child.add_dependency(overflow)
+            # A managed policy can be attached through the ManagedPolicyArns of a role instead of its own Roles.
+            if isinstance(child, iam.CfnRole) and isinstance(policy, iam.CfnManagedPolicy):
+                managed_policy_arns = stack.resolve(child.managed_policy_arns) or []
+                if policy_ref in managed_policy_arns:
+                    child.managed_policy_arns = managed_policy_arns + [overflow.ref]
+        return overflow
+
+    def write_report(self, stack: Stack) -> None:
+        """Write the results of a stack to `<outdir>/<stack>.policy-minimizer.json`."""
+        stacks = self.report[stack.artifact_id]
+        outdir = Stage.of(stack).outdir
+        os.makedirs(outdir, exist_ok=True)
+        with open(os.path.join(outdir, f"{stack.artifact_id}.policy-minimizer.json"), "w", encoding="utf-8") as report_file:
+            json.dump({
+                "bytes_saved": sum(entry["bytes_saved"] for entry in stacks.values()),
+                "policies": stacks
+            }, report_file, indent=2)
@@ -27,7 +27,8 @@ class SqsConstruct():
         config: dict,
         env: str,
         queue_name: str,
-        dlq_name: sqs.Queue = None
+        dlq_name: sqs.Queue = None,
+        retention_period: Duration = None
     ) -> sqs.Queue:
         """
         ## Create an SNS Topic.
@@ -38,11 +39,12 @@ class SqsConstruct():
         * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
         * param `queue_name`: The name of the Queue.
         * param `dlq_name`: (Optional) Name of another queue which will be used as a Dead-Letter Queue
+        * param `retention_period`: (Optional) How long messages are kept, between 60 seconds and 14 days. Default: 14 days, the SQS maximum
         * returns `sqs.Queue`: Returns an object of type aws_sqs.Queue
         """
         dict_props = {
             "queue_name": queue_name,
-            "retention_period": Duration.days(90)
+            "retention_period": Duration.days(14) if retention_period is None else retention_period
         }
         if dlq_name is not None:
             dict_props['dead_letter_queue'] = sqs.DeadLetterQueue(max_receive_count=100,queue=dlq_name)
@@ -0,0 +1,122 @@
+"""
+# AWS SSM Construct Library
+
+This construct library allows you to grant access to AWS SSM Parameters and AWS Secrets Manager Secrets.
+"""
+import weakref
+from typing import List
+from aws_cdk import (
+    aws_iam as iam,
+    aws_kms as kms,
+    aws_lambda as _lambda
+)
+
+PARAMETER_PATHS_ENV = "CONFIG_PARAMETER_PATHS"
+SECRET_NAMES_ENV = "CONFIG_SECRET_NAMES"
+# Paths and names declared so far, by function and environment variable. A second grant adds to the first.
+_DECLARED = weakref.WeakKeyDictionary()
+
+
+class SsmConstruct():
+    """
+    # AWS SSM Construct Class
+    ### This class holds all methods to grant access to AWS SSM Parameters and AWS Secrets Manager Secrets.
+    * `grant_parameter_read_access`
+    * `grant_secret_read_access`
+    """
+
+    @staticmethod
+    def _declare(lambda_function: _lambda.Function, variable: str, values: List[str]) -> None:
+        """Add `values` to the comma separated list in the environment variable `variable` of the function."""
+        declared = _DECLARED.setdefault(lambda_function, {}).setdefault(variable, [])
+        declared.extend(value for value in values if value not in declared)
+        lambda_function.add_environment(variable, ",".join(declared))
+
+    @staticmethod
+    def grant_parameter_read_access(
+        config: dict,
+        env: str,
+        lambda_function: _lambda.Function,
+        parameter_paths: List[str],
+        kms_key: kms.Key = None
+    ) -> None:
+        """
+        ## Grant SSM Parameter Read Access to a Lambda Function
+        Use this method to declare the SSM parameters a lambda function reads. Only the declared parameters are granted.
+        The paths are also passed to the function in the `CONFIG_PARAMETER_PATHS` environment variable, together with those of earlier grants, so `layer_utils.config_cache.prefetch_declared` can load them in bulk at init time.
+
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `lambda_function`: An object of type aws_lambda.Function.
+        * param `parameter_paths`: Full parameter names, e.g. `/my-app/stag/db-url`. A name ending in `/` grants every parameter below that path.
+        * param `kms_key`: (Optional) The customer managed key that encrypts SecureString parameters. Default: - the AWS managed `aws/ssm` key, which needs no grant.
+        * returns `None`
+        """
+        parameter_arn = f"arn:aws:ssm:{config[env]['awsRegion']}:{config[env]['awsAccount']}:parameter"
+        parameter_resources = []
+        path_resources = []
+        for path in parameter_paths:
+            name = path.strip("/")
+            if path.endswith("/"):
+                path_resources.append(f"{parameter_arn}/{name}")
+                parameter_resources.append(f"{parameter_arn}/{name}/*")
+            else:
+                parameter_resources.append(f"{parameter_arn}/{name}")
+
+        if parameter_resources:
+            lambda_function.add_to_role_policy(iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "ssm:GetParameter",
+                    "ssm:GetParameters"
+                ],
+                resources=parameter_resources
+            ))
+        if path_resources:
+            lambda_function.add_to_role_policy(iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=["ssm:GetParametersByPath"],
+                resources=path_resources
+            ))
+        if kms_key is not None:
+            kms_key.grant_decrypt(lambda_function)
+        SsmConstruct._declare(lambda_function, PARAMETER_PATHS_ENV, parameter_paths)
+
+    @staticmethod
+    def grant_secret_read_access(
+        config: dict,
+        env: str,
+        lambda_function: _lambda.Function,
+        secret_names: List[str],
+        kms_key: kms.Key = None
+    ) -> None:
+        """
+        ## Grant Secrets Manager Read Access to a Lambda Function
+        Use this method to declare the secrets a lambda function reads. Only the declared secrets are granted.
+        The names are also passed to the function in the `CONFIG_SECRET_NAMES` environment variable, together with those of earlier grants, so `layer_utils.config_cache.prefetch_declared` can load them in bulk at init time.
+
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `lambda_function`: An object of type aws_lambda.Function.
+        * param `secret_names`: Friendly names of the secrets, e.g. `my-app/stag/api-key`.
+        * param `kms_key`: (Optional) The customer managed key that encrypts the secrets. Default: - the AWS managed key, which needs no grant.
+        * returns `None`
+        """
+        secret_arn = f"arn:aws:secretsmanager:{config[env]['awsRegion']}:{config[env]['awsAccount']}:secret"
+        lambda_function.add_to_role_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=[
+                "secretsmanager:GetSecretValue",
+                "secretsmanager:DescribeSecret"
+            ],
+            # Secrets Manager appends a six character suffix to the name of every secret ARN.
+            resources=[f"{secret_arn}:{name}-??????" for name in secret_names]
+        ))
+        lambda_function.add_to_role_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=["secretsmanager:BatchGetSecretValue"],
+            resources=["*"]
+        ))
+        if kms_key is not None:
+            kms_key.grant_decrypt(lambda_function)
+        SsmConstruct._declare(lambda_function, SECRET_NAMES_ENV, secret_names)
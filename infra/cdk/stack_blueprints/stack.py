@@ -5,16 +5,31 @@ This construct library creates Cloudformation Stack for your CDK App.
 """
 from typing import List, Dict
 from aws_cdk import (
+    Aspects,
     Duration,
     Stack,
     Tags,
+    aws_apigatewayv2 as apigwv2,
+    aws_cloudfront as cloudfront,
+    aws_dynamodb as dynamodb,
+    aws_kinesis as kinesis,
     aws_lambda as _lambda,
+    aws_s3 as s3,
+    aws_stepfunctions as sfn,
 )
 from constructs import Construct
+from .api_construct import ApiConstruct
+from .capacity_planner import CapacityPlanner
+from .cdn_construct import CdnConstruct
+from .dynamodb_construct import DynamodbConstruct
 from .iam_construct import IamConstruct
 from .lambda_construct import LambdaConstruct
+from .kinesis_construct import KinesisConstruct
 from .layer_construct import LayerConstruct
+from .policy_minimizer import PolicyMinimizer
 from .s3_construct import S3Construct
+from .sqs_construct import SqsConstruct
+from .stepfunctions_construct import StepFunctionsConstruct
 
 
 class MainProjectStack(Stack):
@@ -25,6 +40,13 @@ class MainProjectStack(Stack):
     * `create_all_lambda_functions`
     * `create_all_layers`
     * `create_all_buckets`
+    * `create_all_tables`
+    * `create_all_apis`
+    * `create_all_distributions`
+    * `create_all_state_machines`
+    * `create_all_streams`
+    * `add_tags`
+    * `add_aspects`
     """
 
     def __init__(
@@ -33,6 +55,7 @@ class MainProjectStack(Stack):
         scope: Construct,
         app_id: str,
         config: dict,
+        primary_env: str = None,
         **kwargs
     ) -> None:
         """
@@ -43,17 +66,20 @@ class MainProjectStack(Stack):
         * param `scope`: A root construct which represents a single CDK App.
         * param `app_id`: Name of your CDK App.
         * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `primary_env`: Set for the stack of a replica region. The deployment environment whose stack owns the global resources, e.g. stag for stag-dr. Default: - this stack is the primary stack.
         * returns `None`
         """
         super().__init__(scope, app_id, **kwargs)
         self.env_var = env_var
         self.config = config
-        MainProjectStack.create_stack(self, self.config, self.env_var)
+        self.primary_env = primary_env
+        MainProjectStack.create_stack(self, self.config, self.env_var, self.primary_env)
 
     def create_stack(
         stack: Stack,
         config: dict,
-        env: str
+        env: str,
+        primary_env: str = None
     ) -> None:
         """
         ## Create resources inside a CloudFormation Stack
@@ -62,27 +88,49 @@ class MainProjectStack(Stack):
         * param `stack`: A root construct which represents a CloudFormation Stack.
         * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
         * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `primary_env`: The deployment environment of the primary stack when this stack is a replica region. Default: - this stack is the primary stack.
         * returns `None`
         """
         # buckets = MainProjectStack.create_all_buckets(stack=stack, config=config, env=env)
 
+        # distributions = MainProjectStack.create_all_distributions(stack=stack, config=config, env=env, buckets=buckets)
+
+        tables = MainProjectStack.create_all_tables(stack=stack, config=config, env=env, primary_env=primary_env)
+
         layers = MainProjectStack.create_all_layers(
             stack=stack, config=config, env=env)
 
         MainProjectStack.create_all_lambda_functions(
-            stack=stack, config=config, env=env, layers=[layers['sample_layer']])
+            stack=stack, config=config, env=env, layers=[layers['sample_layer']], tables=tables)
+
+        # lambdas = MainProjectStack.create_all_lambda_functions(
+        #     stack=stack, config=config, env=env, layers=[layers['sample_layer']], tables=tables)
+
+        # apis = MainProjectStack.create_all_apis(stack=stack, config=config, env=env, lambdas=lambdas)
+
+        # state_machines = MainProjectStack.create_all_state_machines(
+        #     stack=stack, config=config, env=env, lambdas=lambdas, buckets=buckets)
+
+        # streams = MainProjectStack.create_all_streams(stack=stack, config=config, env=env, lambdas=lambdas)
 
         MainProjectStack.add_tags(
             stack=stack,
             config=config
         )
 
+        MainProjectStack.add_aspects(
+            stack=stack,
+            config=config,
+            env=env
+        )
+
     @staticmethod
     def create_all_lambda_functions(
         stack: Stack,
         config: dict,
         env: str,
-        layers: List[_lambda.LayerVersion] = None
+        layers: List[_lambda.LayerVersion] = None,
+        tables: Dict[str, dynamodb.ITableV2] = None
     ) -> Dict[str, _lambda.Function]:
         """
         ## Create Lambda Functions
@@ -92,14 +140,18 @@ class MainProjectStack(Stack):
         * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
         * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
         * param `layers`: A list of layers to add to the function's execution environment. Layers are packages of libraries or other dependencies that can be used by multiple functions. Default: - No layers.
+        * param `tables`: A dictionary with names of tables as keys and aws_dynamodb.ITableV2 object as its value, see `create_all_tables`. A global table has the same name in every region, so a function reads the replica of its own region with the default boto3 client. Default: - No tables.
         * returns `dictionary`: Returns a dictionary with names of lambda functions as keys and aws_lambda.Function object as its value.
         """
+        tables = tables or {}
         lambdas = {}
         # sample lambda ----------------------------------------------------------------------------------------------
         env_variable = {
-            "REGION": "us-east-1",
+            "REGION": config[env]['awsRegion'],
             "APP_NAME": "mcc-rta-twitter-cdk-app"
         }
+        if 'request_table' in tables:
+            env_variable["REQUEST_TABLE_NAME"] = tables['request_table'].table_name
         lambdas["sample_lambda"] = LambdaConstruct.create_lambda_function(
             stack=stack,
             config=config,
@@ -109,6 +161,12 @@ class MainProjectStack(Stack):
             layers=layers,
             env_variables=env_variable
         )
+        if 'request_table' in tables:
+            DynamodbConstruct.grant_dynamodb_read_write_data_access(
+                dynamodb_table=tables['request_table'],
+                iam_grantee=lambdas["sample_lambda"],
+                read_only=True
+            )
         return lambdas
 
     @staticmethod
@@ -167,6 +225,212 @@ class MainProjectStack(Stack):
         )
         return buckets
 
+    @staticmethod
+    def create_all_tables(
+        stack: Stack,
+        config: dict,
+        env: str,
+        primary_env: str = None
+    ) -> Dict[str, dynamodb.ITableV2]:
+        """
+        ## Create Tables
+        Use this method to create all DynamoDB tables required in your CFN Stack. Tables are global tables created by the
+        primary stack with a replica in the `drRegion` of the environment. The stack of the replica region references its local replica,
+        so functions in both regions read the table in their own region.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `primary_env`: The deployment environment of the primary stack when this stack is a replica region. Default: - this stack is the primary stack.
+        * returns `dictionary`: Returns a dictionary with names of tables as keys and aws_dynamodb.ITableV2 object as its value.
+        """
+        tables = {}
+        if primary_env is not None:
+            tables['request_table'] = DynamodbConstruct.get_regional_dynamodb_table(
+                stack=stack,
+                config=config,
+                env=env,
+                primary_env=primary_env,
+                table_name="rta-twitter-request"
+            )
+            return tables
+        tables['request_table'] = DynamodbConstruct.create_global_dynamodb_table(
+            stack=stack,
+            config=config,
+            env=env,
+            table_name="rta-twitter-request",
+            partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING)
+        )
+        return tables
+
+    @staticmethod
+    def create_all_apis(
+        stack: Stack,
+        config: dict,
+        env: str,
+        lambdas: Dict[str, _lambda.Function]
+    ) -> Dict[str, apigwv2.HttpApi]:
+        """
+        ## Create APIs
+        Use this method to create all HTTP APIs required in your CFN Stack, with routes to the lambda functions of the stack.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `lambdas`: A dictionary with names of lambda functions as keys and aws_lambda.Function object as its value, see `create_all_lambda_functions`.
+        * returns `dictionary`: Returns a dictionary with names of APIs as keys and aws_apigatewayv2.HttpApi object as its value.
+        """
+        apis = {}
+        # sample api -------------------------------------------------------------------------------------------------
+        apis['sample_api'] = ApiConstruct.create_http_api(
+            stack=stack,
+            config=config,
+            env=env,
+            api_name="sample-api",
+            routes={
+                "GET /items": lambdas['sample_lambda'],
+                "POST /items": lambdas['sample_lambda']
+            },
+            route_throttling={"POST /items": (10, 20)},
+            throttle_rate_limit=100,
+            throttle_burst_limit=200
+        )
+        ApiConstruct.add_response_cache(
+            stack=stack,
+            config=config,
+            env=env,
+            api=apis['sample_api'],
+            api_name="sample-api",
+            cache_ttl=Duration.seconds(60),
+            cache_key_query_strings=["*"]
+        )
+        return apis
+
+    @staticmethod
+    def create_all_distributions(
+        stack: Stack,
+        config: dict,
+        env: str,
+        buckets: Dict[str, s3.Bucket]
+    ) -> Dict[str, cloudfront.Distribution]:
+        """
+        ## Create Distributions
+        Use this method to serve buckets of your CFN Stack from CloudFront edge caches.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `buckets`: A dictionary with names of buckets as keys and aws_s3.Bucket object as its value, see `create_all_buckets`.
+        * returns `dictionary`: Returns a dictionary with names of distributions as keys and aws_cloudfront.Distribution object as its value.
+        """
+        distributions = {}
+        # processed outputs ------------------------------------------------------------------------------------------
+        distributions['process_distribution'] = CdnConstruct.create_bucket_distribution(
+            stack=stack,
+            config=config,
+            env=env,
+            bucket=buckets['process_bucket'],
+            distribution_name="rta-twitter-process",
+            cache_policy=CdnConstruct.create_cache_policy(
+                stack=stack,
+                config=config,
+                env=env,
+                policy_name="rta-twitter-process",
+                default_ttl=Duration.hours(1),
+                max_ttl=Duration.days(1)
+            ),
+            origin_shield_region=config[env]['awsRegion']
+        )
+        return distributions
+
+    @staticmethod
+    def create_all_state_machines(
+        stack: Stack,
+        config: dict,
+        env: str,
+        lambdas: Dict[str, _lambda.Function],
+        buckets: Dict[str, s3.Bucket]
+    ) -> Dict[str, sfn.StateMachine]:
+        """
+        ## Create State Machines
+        Use this method to create all state machines required in your CFN Stack.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `lambdas`: A dictionary with names of lambda functions as keys and aws_lambda.Function object as its value, see `create_all_lambda_functions`.
+        * param `buckets`: A dictionary with names of buckets as keys and aws_s3.Bucket object as its value, see `create_all_buckets`.
+        * returns `dictionary`: Returns a dictionary with names of state machines as keys and aws_stepfunctions.StateMachine object as its value.
+        """
+        state_machines = {}
+        # process every request object -------------------------------------------------------------------------------
+        state_machines['process_requests'] = StepFunctionsConstruct.create_distributed_map_state_machine(
+            stack=stack,
+            config=config,
+            env=env,
+            state_machine_name="process-requests",
+            processor_lambda=lambdas['sample_lambda'],
+            item_reader=StepFunctionsConstruct.create_item_reader(
+                bucket=buckets['request_bucket'],
+                prefix="incoming/"
+            ),
+            max_concurrency=500,
+            max_items_per_batch=50,
+            tolerated_failure_percentage=1,
+            result_bucket=buckets['process_bucket'],
+            result_prefix="distributed-map-results"
+        )
+        return state_machines
+
+    @staticmethod
+    def create_all_streams(
+        stack: Stack,
+        config: dict,
+        env: str,
+        lambdas: Dict[str, _lambda.Function]
+    ) -> Dict[str, kinesis.Stream]:
+        """
+        ## Create Streams
+        Use this method to create all Kinesis Data Streams required in your CFN Stack and the lambda functions that consume them.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `lambdas`: A dictionary with names of lambda functions as keys and aws_lambda.Function object as its value, see `create_all_lambda_functions`.
+        * returns `dictionary`: Returns a dictionary with names of streams as keys and aws_kinesis.Stream object as its value.
+        """
+        streams = {}
+        # sample stream ----------------------------------------------------------------------------------------------
+        streams['sample_stream'] = KinesisConstruct.create_stream(
+            stack=stack,
+            config=config,
+            env=env,
+            stream_name="sample-stream"
+        )
+        KinesisConstruct.add_stream_consumer(
+            stack=stack,
+            config=config,
+            env=env,
+            stream=streams['sample_stream'],
+            lambda_function=lambdas['sample_lambda'],
+            enhanced_fan_out=True,
+            batch_size=500,
+            max_batching_window=Duration.seconds(1),
+            parallelization_factor=4,
+            bisect_batch_on_error=True,
+            retry_attempts=3,
+            max_record_age=Duration.hours(1),
+            report_batch_item_failures=True,
+            on_failure_sqs=SqsConstruct.create_sqs_queue(
+                stack=stack,
+                config=config,
+                env=env,
+                queue_name=f"{config[env]['appName']}-sample-stream-failures",
+                retention_period=Duration.days(14)
+            )
+        )
+        return streams
+
     @staticmethod
     def add_tags(
         stack: Stack,
@@ -182,3 +446,25 @@ class MainProjectStack(Stack):
         """
         Tags.of(stack).add('Owned by', config["global"]["sourceIdentifier"])
         Tags.of(stack).add('App Name', config["global"]["appName"])
+
+    @staticmethod
+    def add_aspects(
+        stack: Stack,
+        config: dict,
+        env: str
+    ) -> None:
+        """
+        ## Add Aspects
+        Use this method to add the aspects that check or rewrite the resources of your CloudFormation Stack at synth time.
+        * `minimizePolicies` in config.ini: merge and split the IAM policies of the stack with `PolicyMinimizer`.
+        * `capacityCheck` in config.ini: check the concurrency of the functions against the limits of what they call with `CapacityPlanner` (error | warn | off).
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * returns `None`
+        """
+        if config[env].getboolean('minimizePolicies', fallback=False):
+            Aspects.of(stack).add(PolicyMinimizer(config=config, env=env))
+        if config[env].get('capacityCheck', 'off').lower() != 'off':
+            Aspects.of(stack).add(CapacityPlanner(config=config, env=env))
@@ -0,0 +1,139 @@
+"""
+# AWS Step Functions Construct Library
+
+This construct library allows you to create AWS Step Functions State Machines and related Resources.
+"""
+from aws_cdk import (
+    Duration,
+    Stack,
+    aws_lambda as _lambda,
+    aws_s3 as s3,
+    aws_stepfunctions as sfn,
+    aws_stepfunctions_tasks as tasks
+)
+
+
+class StepFunctionsConstruct():
+    """
+    # AWS Step Functions Construct Class
+    ### This class holds all methods to create AWS Step Functions State Machines and related Resources.
+    * `create_item_reader`
+    * `create_distributed_map_state_machine`
+    """
+
+    @staticmethod
+    def create_item_reader(
+        bucket: s3.IBucket,
+        prefix: str = None,
+        manifest_key: str = None,
+        manifest_format: str = None,
+        max_items: int = None
+    ) -> sfn.IItemReader:
+        """
+        ## Create an Item Reader
+        Use this method to pick the items a distributed map iterates over: the objects of a bucket or the entries of a manifest file.
+
+        * param `bucket`: The bucket that is listed, or that holds the manifest.
+        * param `prefix`: Only objects with this key prefix are listed. Only used if 'manifest_key' is not supplied. Default: - every object of the bucket.
+        * param `manifest_key`: The key of a manifest file. Each entry of the manifest is one item. Default: - the objects of the bucket are listed.
+        * param `manifest_format`: The format of the manifest, `json` (an array), `csv` (with a header row) or `inventory` (an S3 Inventory manifest.json). Default: json
+        * param `max_items`: Only the first items are processed, useful to try a job on a sample. Default: - every item.
+        * returns `aws_stepfunctions.IItemReader`
+        """
+        dict_props = {"bucket": bucket}
+        if max_items is not None:
+            dict_props['max_items'] = max_items
+        if manifest_key is None:
+            if prefix is not None:
+                dict_props['prefix'] = prefix
+            return sfn.S3ObjectsItemReader(**dict_props)
+        dict_props['key'] = manifest_key
+        if manifest_format == "csv":
+            return sfn.S3CsvItemReader(csv_headers=sfn.CsvHeaders.use_first_row(), **dict_props)
+        if manifest_format == "inventory":
+            return sfn.S3ManifestItemReader(**dict_props)
+        return sfn.S3JsonItemReader(**dict_props)
+
+    @staticmethod
+    def create_distributed_map_state_machine(
+        stack: Stack,
+        config: dict,
+        env: str,
+        state_machine_name: str,
+        processor_lambda: _lambda.IFunction,
+        item_reader: sfn.IItemReader,
+        max_concurrency: int = None,
+        max_items_per_batch: int = None,
+        max_input_bytes_per_batch: int = None,
+        tolerated_failure_percentage: int = None,
+        result_bucket: s3.IBucket = None,
+        result_prefix: str = None,
+        express_children: bool = None,
+        time_out: Duration = None
+    ) -> sfn.StateMachine:
+        """
+        ## Create a Distributed Map State Machine
+        Use this method to process a large number of S3 objects or manifest entries in parallel. Every batch of items is processed by
+        its own invocation of the processor lambda, in a child workflow, so a job that runs for minutes in a single function is spread
+        over up to `max_concurrency` concurrent invocations.
+
+        The processor lambda receives `{"Items": [...]}` when batching is used, otherwise a single item. For listed objects an item is
+        `{"Key": ..., "Size": ..., "Etag": ..., "LastModified": ...}`.
+
+        * param `stack`: A root construct which represents a CloudFormation Stack.
+        * param `config`: A dictionary that contains key value pairs for variable substitution based on deployment environments.
+        * param `env`: The deployment environment. No need to specify dev, stg, or prd as it is dynamically selected by the CI/CD Pipeline.
+        * param `state_machine_name`: The name of the state machine.
+        * param `processor_lambda`: The lambda function of the stack that processes the items.
+        * param `item_reader`: The items to process, see `create_item_reader`.
+        * param `max_concurrency`: The maximum number of child workflows running at once. Keep it below the reserved concurrency of the processor lambda. Default: 1000
+        * param `max_items_per_batch`: Items sent to one invocation of the processor lambda. Default: - items are not batched.
+        * param `max_input_bytes_per_batch`: Maximum size of the items sent to one invocation, in bytes, up to 256 KB. Default: - no limit besides the payload limit.
+        * param `tolerated_failure_percentage`: Percentage of failed items that does not fail the job. Default: 0
+        * param `result_bucket`: Bucket the results of the child workflows are written to, instead of the state output which is limited to 256 KB. Default: - results are returned in the state output.
+        * param `result_prefix`: Key prefix of the results in 'result_bucket'. Default: - the root of the bucket.
+        * param `express_children`: Run child workflows as express workflows, faster and cheaper for batches that finish within 5 minutes. Default: True
+        * param `time_out`: Maximum duration of the whole job. Default: - no timeout.
+        * returns `aws_stepfunctions.StateMachine`
+        """
+        process_items = tasks.LambdaInvoke(
+            scope=stack,
+            id=f"{config[env]['appName']}-{state_machine_name}-process-items",
+            lambda_function=processor_lambda,
+            payload_response_only=True,
+            retry_on_service_exceptions=True
+        )
+        dict_props = {
+            "item_reader": item_reader,
+            "max_concurrency": 1000 if max_concurrency is None else max_concurrency,
+            "map_execution_type": (
+                sfn.StateMachineType.EXPRESS if express_children is None or express_children else sfn.StateMachineType.STANDARD
+            )
+        }
+        if max_items_per_batch is not None or max_input_bytes_per_batch is not None:
+            dict_props['item_batcher'] = sfn.ItemBatcher(
+                max_items_per_batch=max_items_per_batch,
+                max_input_bytes_per_batch=max_input_bytes_per_batch
+            )
+        if tolerated_failure_percentage is not None:
+            dict_props['tolerated_failure_percentage'] = tolerated_failure_percentage
+        if result_bucket is not None:
+            dict_props['result_writer'] = sfn.ResultWriter(bucket=result_bucket, prefix=result_prefix)
+        distributed_map = sfn.DistributedMap(
+            scope=stack,
+            id=f"{config[env]['appName']}-{state_machine_name}-distributed-map",
+            **dict_props
+        )
+        distributed_map.item_processor(process_items)
+
+        state_machine_props = {
+            "state_machine_name": f"{config[env]['appName']}-{state_machine_name}",
+            "definition_body": sfn.DefinitionBody.from_chainable(distributed_map)
+        }
+        if time_out is not None:
+            state_machine_props['timeout'] = time_out
+        return sfn.StateMachine(
+            scope=stack,
+            id=f"{config[env]['appName']}-state-machine-{state_machine_name}",
+            **state_machine_props
+        )
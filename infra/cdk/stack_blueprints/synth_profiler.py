@@ -0,0 +1,167 @@
+"""
+# Synth Profiler
+
+Times the factory methods of `MainProjectStack` and of the `*Construct` classes while the app is synthesized, so a slow
+synth can be traced back to the blueprint responsible without attaching a profiler to the jsii bridge.
+
+Enable it with the `profileSynth` context: `cdk synth -c env=stag -c profileSynth=true`. The profile is written to
+* `cdk.out/synth-profile.folded`: folded stacks in microseconds of self time, for `flamegraph.pl` or speedscope.
+* `cdk.out/synth-profile.json`: calls, total and self time and resources created by each method.
+
+The top `profileTopN` (Default: 15) methods by self time are printed when synth ends.
+"""
+import contextlib
+import functools
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List
+
+from aws_cdk import CfnResource
+
+DEFAULT_TOP_N = 15
+
+
+class SynthProfiler():
+    """
+    # Synth Profiler
+    Records wall time, calls and created resources of the methods it instruments.
+    * `enable`
+    * `instrument`
+    * `frame`
+    * `summary`
+    * `write`
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self.folded: Dict[str, float] = defaultdict(float)
+        self.methods: Dict[str, dict] = {}
+        self._frames: List[dict] = []
+        # Time spent counting resources, subtracted from the frames it happened in.
+        self._overhead = 0.0
+
+    @staticmethod
+    def enable() -> "SynthProfiler":
+        """
+        ## Enable Profiling
+        Use this method to instrument `MainProjectStack` and every `*Construct` class of the stack blueprints.
+        All construct modules are imported, which the profile of the first factory calls does not include.
+
+        * returns `SynthProfiler`
+        """
+        package = __name__.rsplit(".", 1)[0]
+        classes = []
+        for module_info in pkgutil.iter_modules(importlib.import_module(package).__path__):
+            module = importlib.import_module(f"{package}.{module_info.name}")
+            classes += [
+                value for name, value in vars(module).items()
+                if isinstance(value, type) and value.__module__ == module.__name__
+                and (name.endswith("Construct") or name == "MainProjectStack")
+            ]
+        profiler = SynthProfiler()
+        profiler.instrument(classes)
+        return profiler
+
+    def instrument(self, classes: Iterable[type]) -> None:
+        """Wrap the public methods and static methods of `classes` in a profiling frame."""
+        for cls in classes:
+            for name, attribute in list(vars(cls).items()):
+                if name.startswith("_"):
+                    continue
+                if isinstance(attribute, staticmethod):
+                    setattr(cls, name, staticmethod(self.wrap(f"{cls.__name__}.{name}", attribute.__func__)))
+                elif inspect.isfunction(attribute):
+                    setattr(cls, name, self.wrap(f"{cls.__name__}.{name}", attribute))
+
+    def wrap(self, name: str, function: Callable) -> Callable:
+        """Return `function` timed under `name`. Resources are counted in the `stack` argument when it has one."""
+        signature = inspect.signature(function)
+        if "stack" not in signature.parameters:
+            signature = None
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stack = None
+            if signature is not None:
+                try:
+                    stack = signature.bind_partial(*args, **kwargs).arguments.get("stack")
+                except TypeError:
+                    pass
+            with self.frame(name, stack):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def count_resources(self, stack) -> int:
+        """The number of CloudFormation resources in `stack`. Its own time is left out of the profile."""
+        start = self.clock()
+        count = sum(1 for child in stack.node.find_all() if isinstance(child, CfnResource))
+        self._overhead += self.clock() - start
+        return count
+
+    @contextlib.contextmanager
+    def frame(self, name: str, stack=None):
+        """Time the block under `name`, nested in the frame that is currently open."""
+        before = self.count_resources(stack) if stack is not None else 0
+        frame = {"name": name, "children": 0.0, "overhead": self._overhead}
+        self._frames.append(frame)
+        start = self.clock()
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - start - (self._overhead - frame["overhead"])
+            path = ";".join(open_frame["name"] for open_frame in self._frames)
+            self._frames.pop()
+            if self._frames:
+                self._frames[-1]["children"] += elapsed
+            self_time = elapsed - frame["children"]
+            self.folded[path] += self_time
+            method = self.methods.setdefault(name, {"calls": 0, "totalSeconds": 0.0, "selfSeconds": 0.0, "resources": 0})
+            method["calls"] += 1
+            method["selfSeconds"] += self_time
+            # A recursive call is already part of the total of the outer call.
+            if not any(open_frame["name"] == name for open_frame in self._frames):
+                method["totalSeconds"] += elapsed
+            if stack is not None:
+                method["resources"] += self.count_resources(stack) - before
+
+    def summary(self, top_n: int = DEFAULT_TOP_N) -> List[dict]:
+        """The `top_n` methods with the most self time. Resources include those of nested factory calls."""
+        methods = [dict(method, method=name) for name, method in self.methods.items()]
+        methods.sort(key=lambda method: method["selfSeconds"], reverse=True)
+        return [
+            {
+                "method": method["method"],
+                "calls": method["calls"],
+                "totalSeconds": round(method["totalSeconds"], 4),
+                "selfSeconds": round(method["selfSeconds"], 4),
+                "resources": method["resources"]
+            }
+            for method in methods[:top_n]
+        ]
+
+    def write(self, outdir: str, top_n: int = None) -> None:
+        """Write the folded stacks and the summary to `outdir` and print the top `top_n` methods to stderr."""
+        top_n = int(top_n or DEFAULT_TOP_N)
+        os.makedirs(outdir, exist_ok=True)
+        with open(os.path.join(outdir, "synth-profile.folded"), "w", encoding="utf-8") as folded_file:
+            for path, seconds in sorted(self.folded.items()):
+                microseconds = int(seconds * 1_000_000)
+                if microseconds > 0:
+                    folded_file.write(f"{path} {microseconds}\n")
+        summary = self.summary(top_n=len(self.methods))
+        with open(os.path.join(outdir, "synth-profile.json"), "w", encoding="utf-8") as summary_file:
+            json.dump(summary, summary_file, indent=2)
+
+        lines = [f"  {'method':<60} {'calls':>6} {'total':>9} {'self':>9} {'resources':>9}"]
+        for method in summary[:top_n]:
+            lines.append(f"  {method['method']:<60} {method['calls']:>6} {method['totalSeconds']:>8.3f}s "
+                         f"{method['selfSeconds']:>8.3f}s {method['resources']:>9}")
+        print(f"synth profile, top {top_n} by self time:", *lines,
+              f"  folded stacks: {os.path.join(outdir, 'synth-profile.folded')}", sep="\n", file=sys.stderr)
@@ -0,0 +1,107 @@
+"""
+# Synth Benchmark Runner
+
+Synthesizes one benchmark case and prints its measurements as JSON on the last line of stdout.
+Every case runs in its own interpreter, started by `test_synth_benchmark`, so the peak memory of the case,
+including the jsii node process, is measured on its own.
+
+    python -m tests.synth_runner <case> <outdir>
+
+* `env:<env>`: `MainProjectStack` for an environment of `config.ini`.
+* `generated:<count>`: a stack with `<count>` functions, queues and tables.
+"""
+import json
+import os
+import sys
+import time
+from configparser import ConfigParser, ExtendedInterpolation
+
+CONFIG_PATH_ENV = "SYNTH_BENCHMARK_CONFIG"
+GENERATED_ENV = "stag"
+INLINE_HANDLER = "def lambda_handler(event, context):\n    return event\n"
+
+
+def build_env_case(app, config: ConfigParser, env: str) -> None:
+    """The stack that `app.py` synthesizes for an environment."""
+    from stack_blueprints.stack import MainProjectStack
+
+    MainProjectStack(
+        env_var=env,
+        app_id=config["global"]["appId"],
+        scope=app,
+        config=config,
+        env={
+            "region": config[env]['awsRegion'],
+            "account": config[env]['awsAccount']
+        }
+    )
+
+
+def build_generated_case(app, config: ConfigParser, count: int) -> None:
+    """A stack with `count` functions, queues and tables, built with the stack blueprints."""
+    from aws_cdk import Duration, Stack, aws_dynamodb as dynamodb, aws_lambda as _lambda
+    from stack_blueprints.dynamodb_construct import DynamodbConstruct
+    from stack_blueprints.lambda_construct import LambdaConstruct
+    from stack_blueprints.sqs_construct import SqsConstruct
+
+    stack = Stack(
+        app,
+        f"{config['global']['appId']}-benchmark-{count}",
+        env={
+            "region": config[GENERATED_ENV]['awsRegion'],
+            "account": config[GENERATED_ENV]['awsAccount']
+        }
+    )
+    for index in range(count):
+        LambdaConstruct.create_lambda_function(
+            stack=stack,
+            config=config,
+            env=GENERATED_ENV,
+            lambda_name=f"benchmark_{index}",
+            handler="index.lambda_handler",
+            code_location=_lambda.Code.from_inline(INLINE_HANDLER)
+        )
+        SqsConstruct.create_sqs_queue(
+            stack=stack,
+            config=config,
+            env=GENERATED_ENV,
+            queue_name=f"benchmark-queue-{index}",
+            retention_period=Duration.days(14)
+        )
+        DynamodbConstruct.create_dynamodb_table(
+            stack=stack,
+            config=config,
+            env=GENERATED_ENV,
+            table_name=f"benchmark-{index}",
+            partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING)
+        )
+
+
+def run_case(case: str, outdir: str) -> dict:
+    """Synthesize a case into `outdir` and return its synth time, template size and template paths."""
+    config = ConfigParser(interpolation=ExtendedInterpolation())
+    config.read(os.environ[CONFIG_PATH_ENV])
+    kind, value = case.split(":", 1)
+
+    started = time.perf_counter()
+    import aws_cdk as cdk
+
+    # The generated stacks are over the CloudFormation resource limit on purpose, they are only synthesized.
+    app = cdk.App(outdir=outdir, context={"@aws-cdk/core:stackResourceLimit": 0})
+    if kind == "env":
+        build_env_case(app, config, value)
+    else:
+        build_generated_case(app, config, int(value))
+    assembly = app.synth()
+    synth_seconds = time.perf_counter() - started
+
+    templates = [os.path.join(outdir, stack.template_file) for stack in assembly.stacks]
+    return {
+        "synth_seconds": synth_seconds,
+        "template_bytes": sum(os.path.getsize(template) for template in templates),
+        "templates": templates
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_case(sys.argv[1], sys.argv[2])))
@@ -0,0 +1,148 @@
+"""
+# Synth Benchmark and Regression Tests
+
+Synthesizes `MainProjectStack` for every environment of `config.ini`, and generated stacks with 10, 100 and 500
+functions, queues and tables. Each case records its synth time, its peak memory and the size of its templates, and fails
+when one of them regresses beyond `synth_baseline.json`. Peak memory is the `ru_maxrss` of the case, i.e. the peak
+resident set of its largest single process, the python runner or the jsii node process, not their sum.
+
+    cd infra/cdk && python -m pytest tests
+
+* `SYNTH_BENCHMARK_TOLERANCE`: allowed regression of synth time and peak memory, as a fraction. Default: 0.25
+* `SYNTH_BENCHMARK_SIZE_TOLERANCE`: allowed regression of template size, as a fraction. Default: 0.05
+* `SYNTH_BENCHMARK_UPDATE`: set to 1 to store the measurements as the new baseline instead of comparing.
+
+A case without a baseline fails, the baseline file is only written with `SYNTH_BENCHMARK_UPDATE=1`. Commit
+`synth_baseline.json` after updating it, from the machine the pipeline runs on, as synth time and memory depend on it.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import zipfile
+from configparser import ConfigParser, ExtendedInterpolation
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("aws_cdk")
+
+from aws_cdk.assertions import Template  # pylint: disable=wrong-import-position
+
+CDK_DIR = Path(__file__).resolve().parent.parent
+ROOT_DIR = CDK_DIR.parent.parent
+CONFIG_PATH = ROOT_DIR / ".configrc" / "config.ini"
+BASELINE_PATH = Path(__file__).resolve().parent / "synth_baseline.json"
+GENERATED_COUNTS = (10, 100, 500)
+TOLERANCE = float(os.environ.get("SYNTH_BENCHMARK_TOLERANCE", "0.25"))
+SIZE_TOLERANCE = float(os.environ.get("SYNTH_BENCHMARK_SIZE_TOLERANCE", "0.05"))
+UPDATE = os.environ.get("SYNTH_BENCHMARK_UPDATE") == "1"
+
+
+def load_config() -> ConfigParser:
+    config = ConfigParser(interpolation=ExtendedInterpolation())
+    config.read(CONFIG_PATH)
+    return config
+
+
+CONFIG = load_config()
+ENVS = [section for section in CONFIG.sections() if CONFIG.has_option(section, "awsAccount")]
+CASES = [f"env:{env}" for env in ENVS] + [f"generated:{count}" for count in GENERATED_COUNTS]
+
+
+@pytest.fixture(scope="session")
+def workdir(tmp_path_factory):
+    """
+    A copy of the source tree that the stack reads its assets from, with the layer zipped as `install_layer_reqs`
+    leaves it. Synth runs in `<workdir>/infra/cdk`, so the bundled functions do not touch the repository.
+    """
+    root = tmp_path_factory.mktemp("synth")
+    (root / "src" / "layer").mkdir(parents=True)
+    shutil.copytree(ROOT_DIR / "src" / "lambda", root / "src" / "lambda",
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    for layer_dir in (ROOT_DIR / "src" / "layer").iterdir():
+        if layer_dir.is_dir() and not layer_dir.name.startswith("__"):
+            with zipfile.ZipFile(root / "src" / "layer" / f"{layer_dir.name}.zip", "w") as archive:
+                for path in layer_dir.rglob("*"):
+                    if path.is_file() and "__pycache__" not in path.parts:
+                        archive.write(path, path.relative_to(layer_dir))
+        elif layer_dir.suffix == ".zip":
+            shutil.copy2(layer_dir, root / "src" / "layer" / layer_dir.name)
+    cdk_dir = root / "infra" / "cdk"
+    cdk_dir.mkdir(parents=True)
+    return cdk_dir
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    """The stored baseline. With `SYNTH_BENCHMARK_UPDATE=1` it is written back at the end of the session."""
+    stored = json.loads(BASELINE_PATH.read_text(encoding="utf-8")) if BASELINE_PATH.exists() else {}
+    measured = dict(stored)
+    yield measured
+    if UPDATE and measured != stored:
+        BASELINE_PATH.write_text(json.dumps(measured, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def run_case(case: str, cdk_dir: Path) -> dict:
+    """Synthesize a case in a fresh interpreter and add its peak memory, that of its largest process, to its measurements."""
+    outdir = cdk_dir / f"cdk.out.{case.replace(':', '-')}"
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([str(CDK_DIR), os.environ.get("PYTHONPATH", "")]),
+        SYNTH_BENCHMARK_CONFIG=str(CONFIG_PATH)
+    )
+    stdout_path, stderr_path = cdk_dir / f"{outdir.name}.stdout", cdk_dir / f"{outdir.name}.stderr"
+    with open(stdout_path, "w", encoding="utf-8") as stdout, open(stderr_path, "w", encoding="utf-8") as stderr:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "tests.synth_runner", case, str(outdir)],
+            cwd=cdk_dir, env=env, stdout=stdout, stderr=stderr
+        )
+        # wait4 returns the resource usage of this case only: ru_maxrss is the largest peak of the runner and the jsii
+        # node process it waited for.
+        _pid, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    assert process.returncode == 0, f"synth of {case} failed:\n{stderr_path.read_text(encoding='utf-8')}"
+    measurements = json.loads(stdout_path.read_text(encoding="utf-8").strip().splitlines()[-1])
+    measurements["peak_rss_kb"] = usage.ru_maxrss
+    return measurements
+
+
+def check_regression(case: str, measured: dict, expected: dict) -> list:
+    """Return a message for every measurement beyond its baseline and tolerance."""
+    regressions = []
+    for key, tolerance in (("synth_seconds", TOLERANCE), ("peak_rss_kb", TOLERANCE), ("template_bytes", SIZE_TOLERANCE)):
+        if key in expected and measured[key] > expected[key] * (1 + tolerance):
+            regressions.append(
+                f"{case}: {key} {measured[key]:.2f} is over the baseline {expected[key]:.2f} by more than {tolerance:.0%}"
+            )
+    return regressions
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_synth_benchmark(case, workdir, baseline):
+    measured = run_case(case, workdir)
+    print(f"{case}: synth {measured['synth_seconds']:.2f}s, peak {measured['peak_rss_kb'] / 1024:.0f} MB, "
+          f"templates {measured['template_bytes'] / 1024:.0f} KB")
+
+    templates = [Template.from_json(json.loads(Path(path).read_text(encoding="utf-8"))) for path in measured.pop("templates")]
+    if case.startswith("env:"):
+        env = case.split(":", 1)[1]
+        template = templates[0]
+        template.resource_count_is("AWS::Lambda::LayerVersion", 1)
+        template.has_resource_properties("AWS::Lambda::Function", {
+            "FunctionName": f"{CONFIG[env]['appName']}-sample_lambda",
+            "Environment": {"Variables": {"REGION": CONFIG[env]['awsRegion']}}
+        })
+    else:
+        count = int(case.split(":", 1)[1])
+        templates[0].resource_count_is("AWS::Lambda::Function", count)
+        templates[0].resource_count_is("AWS::SQS::Queue", count)
+        templates[0].resource_count_is("AWS::DynamoDB::Table", count)
+
+    if UPDATE:
+        baseline[case] = {key: measured[key] for key in ("synth_seconds", "peak_rss_kb", "template_bytes")}
+        pytest.skip(f"{case}: baseline stored in {BASELINE_PATH.name}")
+    assert case in baseline, f"{case}: no baseline in {BASELINE_PATH.name}, run with SYNTH_BENCHMARK_UPDATE=1 and commit it"
+    regressions = check_regression(case, measured, baseline[case])
+    assert not regressions, "\n".join(regressions)
@@ -0,0 +1,260 @@
+"""Checks layer and function assets against their size and import time budgets.
+
+Budgets are read from `.configrc/config.ini`. `[budget:default]` applies to every asset and is overridden per asset by
+`[budget:layer:<layer_name>]` or `[budget:function:<lambda_name>]`:
+
+    zippedSizeMb : size of the deployment package
+    unzippedSizeMb : size of the extracted asset
+    importTimeMs : time to import `importModules`, measured with `python -X importtime`
+    importModules : comma separated modules to import. Default: the top level packages of a layer, `lambda_function` for a function
+
+A budget that is not set is not checked. Every check is appended to `.build/budgets/history.json` in the cdk folder,
+so size and import time trends can be followed across builds.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from configparser import ConfigParser, ExtendedInterpolation
+from typing import Dict, List, Tuple
+
+from pipeline_paths import get_cdk_dir, get_config_path, get_src_dir
+
+BUDGET_KEYS = {"zippedSizeMb": "zipped_bytes", "unzippedSizeMb": "unzipped_bytes", "importTimeMs": "import_us"}
+HISTORY_LIMIT = 500
+IMPORT_RUNS = 3
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+IGNORED_ENTRIES = {"bin", "__pycache__", "requirements.txt"}
+
+
+def get_budget(config: ConfigParser, kind: str, name: str) -> Dict[str, str]:
+    """Return the budget of an asset, the defaults overridden by its own section."""
+    budget = {}
+    for section in ("budget:default", f"budget:{kind}:{name}"):
+        if config.has_section(section):
+            budget.update(config[section])
+    return budget
+
+
+def get_package_sizes(asset_dir: str) -> Dict[str, int]:
+    """Return the unzipped size of every top level package or module of an asset."""
+    sizes = {}
+    for entry in os.scandir(asset_dir):
+        package = re.sub(r"(-[^-]+)?\.(dist-info|py|so)$", "", entry.name).split(".")[0]
+        if entry.is_dir():
+            size = sum(
+                os.path.getsize(os.path.join(dirname, filename))
+                for dirname, _dirnames, filenames in os.walk(entry.path)
+                for filename in filenames
+            )
+        else:
+            size = entry.stat().st_size
+        sizes[package] = sizes.get(package, 0) + size
+    return sizes
+
+
+def get_zipped_size(asset_dir: str) -> int:
+    """Return the size of the asset once zipped, as it is uploaded."""
+    with tempfile.TemporaryDirectory() as build_dir:
+        zip_path = os.path.join(build_dir, "asset.zip")
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for dirname, _dirnames, filenames in os.walk(asset_dir):
+                for filename in filenames:
+                    path = os.path.join(dirname, filename)
+                    archive.write(path, os.path.relpath(path, asset_dir))
+        return os.path.getsize(zip_path)
+
+
+def get_default_modules(asset_dir: str) -> List[str]:
+    """Top level importable packages and modules of a layer."""
+    modules = []
+    for entry in sorted(os.scandir(asset_dir), key=lambda entry: entry.name):
+        if entry.name in IGNORED_ENTRIES or entry.name.startswith((".", "_")):
+            continue
+        if entry.is_dir() and "." not in entry.name:
+            modules.append(entry.name)
+        elif entry.name.endswith(".py"):
+            modules.append(entry.name[:-3])
+    return modules
+
+
+def run_importtime(python_path: List[str], modules: List[str]) -> List[Tuple[str, int]]:
+    """Import the modules in a fresh interpreter and return the self time in microseconds of every import."""
+    script = (
+        "import importlib\n"
+        f"for module in {modules!r}:\n"
+        "    try:\n"
+        "        importlib.import_module(module)\n"
+        "    except Exception as error:\n"
+        "        print(f'{module}: {error!r}')\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(python_path), PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True, text=True, env=env, check=False
+    )
+    for line in result.stdout.splitlines():
+        print(f"budgets: import failed, {line}")
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            imports.append((match.group(4), int(match.group(1))))
+    return imports
+
+
+def measure_import_time(python_path: List[str], modules: List[str]) -> Tuple[int, Dict[str, int]]:
+    """
+    Return the import time in microseconds of the modules and its breakdown per top level package. Modules imported by
+    the interpreter itself are left out, and the fastest of `IMPORT_RUNS` runs is kept to reduce noise.
+    """
+    startup = {module for module, _self_us in run_importtime([], [])}
+    best = None
+    for _run in range(IMPORT_RUNS):
+        breakdown = {}
+        for module, self_us in run_importtime(python_path, modules):
+            if module not in startup:
+                package = module.split(".")[0]
+                breakdown[package] = breakdown.get(package, 0) + self_us
+        total = sum(breakdown.values())
+        if best is None or total < best[0]:
+            best = (total, breakdown)
+    return best
+
+
+def check_asset(
+    config: ConfigParser,
+    kind: str,
+    name: str,
+    asset_dir: str,
+    zip_path: str = None,
+    python_path: List[str] = None
+) -> dict:
+    """
+    Measure an asset and compare it with its budget.
+
+    * param `kind`: `layer` or `function`.
+    * param `asset_dir`: Folder whose content is shipped, the `python` folder of a layer or the bundle of a function.
+    * param `zip_path`: Zip of the asset when it is already built. Default: the asset is zipped to measure it.
+    * param `python_path`: Extra folders to import from, e.g. the layers of a function.
+    * returns the result that is written to the history, with a `violations` list.
+    """
+    budget = get_budget(config, kind, name)
+    sizes = get_package_sizes(asset_dir)
+    result = {
+        "kind": kind,
+        "name": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "zipped_bytes": os.path.getsize(zip_path) if zip_path else get_zipped_size(asset_dir),
+        "unzipped_bytes": sum(sizes.values()),
+        "packages": sizes,
+        "violations": []
+    }
+    if "importTimeMs" in budget:
+        if "importModules" in budget:
+            modules = [module.strip() for module in budget["importModules"].split(",") if module.strip()]
+        else:
+            modules = get_default_modules(asset_dir) if kind == "layer" else ["lambda_function"]
+        result["import_us"], result["import_packages"] = measure_import_time(
+            [asset_dir] + (python_path or []), modules
+        )
+
+    for key, measured in BUDGET_KEYS.items():
+        if key in budget and measured in result:
+            limit = float(budget[key]) * (1000 if key == "importTimeMs" else 1024 * 1024)
+            if result[measured] > limit:
+                result["violations"].append({"budget": key, "limit": float(budget[key]), "measured": result[measured]})
+    return result
+
+
+def print_result(result: dict) -> None:
+    """Print the measurements of an asset, with a per package breakdown when a budget is exceeded."""
+    import_time = f", import {result['import_us'] / 1000:.1f} ms" if "import_us" in result else ""
+    print(f"budgets: {result['kind']} {result['name']}: zipped {result['zipped_bytes'] / 1024 / 1024:.2f} MB, "
+          f"unzipped {result['unzipped_bytes'] / 1024 / 1024:.2f} MB{import_time}")
+    for violation in result["violations"]:
+        unit = "ms" if violation["budget"] == "importTimeMs" else "MB"
+        measured = violation["measured"] / (1000 if unit == "ms" else 1024 * 1024)
+        print(f"  EXCEEDED {violation['budget']}: {measured:.2f} {unit} > {violation['limit']:g} {unit}")
+        if unit == "ms":
+            breakdown = {package: us / 1000 for package, us in result["import_packages"].items()}
+        else:
+            breakdown = {package: size / 1024 / 1024 for package, size in result["packages"].items()}
+        for package, value in sorted(breakdown.items(), key=lambda item: -item[1])[:15]:
+            print(f"    {package:<40}{value:10.2f} {unit}")
+
+
+def record_history(results: List[dict]) -> str:
+    """Append the results to the budget history and return its path."""
+    history_path = os.path.join(get_cdk_dir(), ".build", "budgets", "history.json")
+    os.makedirs(os.path.dirname(history_path), exist_ok=True)
+    history = []
+    if os.path.exists(history_path):
+        with open(history_path, encoding="utf-8") as history_file:
+            history = json.load(history_file)
+    history = (history + results)[-HISTORY_LIMIT:]
+    with open(f"{history_path}.tmp", "w", encoding="utf-8") as history_file:
+        json.dump(history, history_file, indent=2)
+    os.replace(f"{history_path}.tmp", history_path)
+    return history_path
+
+
+def load_config() -> ConfigParser:
+    config = ConfigParser(interpolation=ExtendedInterpolation())
+    config.optionxform = str
+    config.read(get_config_path())
+    return config
+
+
+def report(results: List[dict]) -> int:
+    """Print and record the results. Returns the number of assets over budget."""
+    for result in results:
+        print_result(result)
+    history_path = record_history(results)
+    failed = sum(1 for result in results if result["violations"])
+    print(f"budgets: {failed} of {len(results)} asset(s) over budget, history: {history_path}")
+    return failed
+
+
+def get_layer_python_dirs(extract_dir: str) -> List[str]:
+    """Return the `python` folder of every layer, extracting the layers that are already zipped."""
+    layer_dir = os.path.join(get_src_dir(), "layer")
+    python_dirs = []
+    for entry in sorted(os.scandir(layer_dir), key=lambda entry: entry.name):
+        if entry.is_dir():
+            python_dirs.append(os.path.join(entry.path, "python"))
+        elif entry.name.endswith(".zip"):
+            with zipfile.ZipFile(entry.path) as archive:
+                archive.extractall(os.path.join(extract_dir, entry.name[:-4]))
+            python_dirs.append(os.path.join(extract_dir, entry.name[:-4], "python"))
+    return python_dirs
+
+
+def check_functions() -> int:
+    """Check every bundled function in `.build/lambda`. Returns the number of functions over budget."""
+    config = load_config()
+    build_dir = os.path.join(get_cdk_dir(), ".build", "lambda")
+    if not os.path.isdir(build_dir):
+        print(f"budgets: no bundled functions in {build_dir}")
+        return 0
+    with tempfile.TemporaryDirectory() as extract_dir:
+        layer_dirs = get_layer_python_dirs(extract_dir)
+        results = [
+            check_asset(config, "function", entry.name, entry.path, python_path=layer_dirs)
+            for entry in sorted(os.scandir(build_dir), key=lambda entry: entry.name) if entry.is_dir()
+        ]
+    return report(results)
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser()
+    PARSER.add_argument('--functions', action='store_true', help="Check the bundled functions in .build/lambda.")
+    ARGS = PARSER.parse_args()
+
+    if ARGS.functions and check_functions() > 0:
+        sys.exit(1)
@@ -2,34 +2,35 @@
 """Script for installing the packages for lambda layers."""
 import os
 import shutil
+import subprocess
+import sys
+import tempfile
 from typing import AnyStr, List
-from pathlib import Path
 
+from check_budgets import check_asset, load_config, report
+from pipeline_paths import get_src_dir
 
-ROOT_DIR = Path(__file__).parent.parent
-print(ROOT_DIR)
-
-def get_path_for_src(top_directory):
-    for dirname, dirnames, filenames in os.walk(top_directory):
-        for source_dir in dirnames:
-            if source_dir == "src":
-                return os.path.join(dirname, source_dir)
 
 def get_layer_directories(top_level_dir: bytes) -> List[AnyStr]:
     """Get a list of all layers in layer folder."""
     dir_paths = []
     for subdir in os.scandir(top_level_dir):
-        dir_paths.append(os.path.abspath(subdir))
+        if subdir.is_dir():
+            dir_paths.append(os.path.abspath(subdir))
     return dir_paths
 
-def create_zip_for_layers(layer_dir: bytes) -> None:
-    """Creates zip for layers."""
+def create_zip_for_layers(layer_dir: bytes, config=None) -> dict:
+    """Creates zip for layers and returns its budget check."""
     filename = str(layer_dir)
-    filename.rsplit("/", 1)[-1]
     install_requirements(layer_dir)
     # subprocess.run(f"zip --quiet -r9 ../{filename}.zip ./*", shell=True, check=True)
-    shutil.make_archive(filename, 'zip')
+    # Only the python folder is shipped, a layer's tests are left out and do not count towards its budget.
+    zip_path = shutil.make_archive(filename, 'zip', root_dir=layer_dir, base_dir="python")
+    result = check_asset(
+        config or load_config(), "layer", filename.rsplit("/", 1)[-1], os.path.join(layer_dir, "python"), zip_path
+    )
     shutil.rmtree(layer_dir)
+    return result
 
 
 def install_requirements(path: bytes) -> None:
@@ -46,10 +47,38 @@ def remove_unnecessary_folders(path: bytes) -> None:
     folders = os.listdir(path)
     for folder in folders:
         if folder.endswith(".dist-info"):
-            shutil.rmtree(folder)
+            shutil.rmtree(os.path.join(path, folder))
+
+
+def build_layer_archive(layer_dir: str, archive_base_name: str) -> str:
+    """Builds the zip of a layer in a temporary copy, leaving the layer directory untouched. Returns the zip path."""
+    with tempfile.TemporaryDirectory() as build_dir:
+        shutil.copytree(layer_dir, build_dir, dirs_exist_ok=True, ignore=shutil.ignore_patterns("__pycache__", "tests"))
+        python_dir = os.path.join(build_dir, "python")
+        requirements = os.path.join(python_dir, "requirements.txt")
+        if os.path.exists(requirements):
+            subprocess.run(
+                ["pip3", "install", "--quiet", "-r", requirements, "-t", python_dir],
+                check=True, stderr=subprocess.STDOUT
+            )
+            os.remove(requirements)
+        remove_unnecessary_folders(python_dir)
+        return shutil.make_archive(archive_base_name, 'zip', root_dir=build_dir)
+
+
+def main():
+    """Installs the requirements of every layer, replaces each layer folder with its zip and checks the layer budgets."""
+    src_directory = get_src_dir()
+    print(src_directory)
+    layer_directories = get_layer_directories(src_directory + '/layer')
+    config = load_config()
+    results = []
+    for layer in layer_directories:
+        print("creating zip for:", layer)
+        results.append(create_zip_for_layers(layer, config))
+    if report(results) > 0:
+        sys.exit(1)
+
 
-src_directory = get_path_for_src(ROOT_DIR)
-layer_directories = get_layer_directories(src_directory + '/layer')
-for layer in layer_directories:
-    print("creating zip for:", layer)
-    create_zip_for_layers(layer)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Resolves the paths used by the pipeline scripts.
+
+The repository is walked once and the result is cached. `run_pipeline` exports the resolved paths
+as environment variables, so the scripts it starts do not walk the repository again.
+"""
+import functools
+import os
+from pathlib import Path
+from typing import Dict
+
+ROOT_DIR = Path(__file__).parent.parent
+ENV_VARS = {
+    "config": "PIPELINE_CONFIG_PATH",
+    "cdk": "PIPELINE_CDK_DIR",
+    "cdk_out": "PIPELINE_CDK_OUT_DIR",
+    "src": "PIPELINE_SRC_DIR"
+}
+SKIPPED_DIRS = {".git", "node_modules", ".venv", "venv", "__pycache__", "cdk.out", ".build"}
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_paths(top_directory: str = None) -> Dict[str, str]:
+    """Return the config file, cdk app, cdk.out and src paths, walking the repository at most once."""
+    if all(os.environ.get(variable) for variable in ENV_VARS.values()):
+        return {key: os.environ[variable] for key, variable in ENV_VARS.items()}
+
+    paths = {}
+    for dirname, dirnames, filenames in os.walk(top_directory or ROOT_DIR):
+        if "config" not in paths and "config.ini" in filenames:
+            paths["config"] = os.path.join(dirname, "config.ini")
+        if "cdk" not in paths and "cdk" in dirnames:
+            paths["cdk"] = os.path.join(dirname, "cdk")
+        if "src" not in paths and "src" in dirnames:
+            paths["src"] = os.path.join(dirname, "src")
+        if len(paths) == 3:
+            break
+        dirnames[:] = [name for name in dirnames if name not in SKIPPED_DIRS]
+    if "cdk" in paths:
+        paths["cdk_out"] = os.path.join(paths["cdk"], "cdk.out")
+    return paths
+
+
+def export_paths() -> Dict[str, str]:
+    """Return the resolved paths as environment variables for child processes."""
+    return {ENV_VARS[key]: os.path.abspath(value) for key, value in resolve_paths().items()}
+
+
+def get_config_path() -> str:
+    """Path of `.configrc/config.ini`."""
+    return resolve_paths()["config"]
+
+
+def get_cdk_dir() -> str:
+    """Path of the cdk app, `infra/cdk`."""
+    return resolve_paths()["cdk"]
+
+
+def get_cdk_out_dir() -> str:
+    """Path of the synthesized cloud assembly, `infra/cdk/cdk.out`."""
+    return resolve_paths()["cdk_out"]
+
+
+def get_src_dir() -> str:
+    """Path of the lambda and layer sources, `src`."""
+    return resolve_paths()["src"]
@@ -0,0 +1,336 @@
+"""Script to plan how dependencies are shared between lambda layers and functions.
+
+Resolves the package set of every layer (`src/layer/<layer_name>/python/requirements.txt`) and every function
+(`src/lambda/<lambda_name>/requirements.txt`), reports packages that are shipped more than once, and proposes an
+assignment of shared packages to layers that minimises the total size while keeping every function within the
+lambda limits on layers and unzipped size.
+
+Resolution installs each requirements file once into `.build/layer-plan/<hash>` and reads the installed
+`.dist-info` records, so repeated runs do not touch the network. With `--wheelhouse <dir>` packages are only
+installed from a local folder of wheels, e.g. one restored from the pipeline cache, and the index is never used. Packages are
+installed with wheels for the lambda platform, a requirements file without them fails unless `--allow-local-platform` is set.
+Which layers a function uses is read from the synthesized templates when `cdk.out` exists, otherwise every function is
+assumed to use every layer.
+
+A package needed in different versions by different functions is reported as a conflict and is not shared through a layer.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Tuple
+
+from pipeline_paths import get_cdk_dir, get_cdk_out_dir, get_src_dir
+
+MAX_LAYERS_PER_FUNCTION = 5
+MAX_UNZIPPED_BYTES = 250 * 1024 * 1024
+PIP_PLATFORM = ["--platform", "manylinux2014_x86_64", "--implementation", "cp", "--only-binary=:all:"]
+
+Package = Tuple[str, str]
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a distribution name as pip does."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def install_requirements(
+    requirements_file: str,
+    python_version: str,
+    wheelhouse: str = None,
+    allow_local_platform: bool = False
+) -> str:
+    """
+    Install a requirements file into a directory keyed by its content and return that directory.
+    Raises RuntimeError when there are no wheels for the lambda platform, unless `allow_local_platform` is set.
+    """
+    with open(requirements_file, "rb") as requirements:
+        key = hashlib.sha256(requirements.read() + python_version.encode("utf-8")).hexdigest()[:16]
+    target = os.path.join(get_cdk_dir(), ".build", "layer-plan", key)
+    if os.path.exists(os.path.join(target, ".complete")):
+        return target
+    command = [sys.executable, "-m", "pip", "install", "--quiet", "-r", requirements_file, "-t", target]
+    if wheelhouse is not None:
+        command += ["--no-index", "--find-links", wheelhouse]
+    if subprocess.run(command + PIP_PLATFORM + ["--python-version", python_version], check=False).returncode != 0:
+        if not allow_local_platform:
+            raise RuntimeError(
+                f"plan: no manylinux2014_x86_64 wheels for {requirements_file}, sizes of the local platform can differ "
+                "from the lambda ones. Use --allow-local-platform to plan with them anyway."
+            )
+        print(f"plan: no manylinux2014_x86_64 wheels for {requirements_file}, installing for the local platform")
+        subprocess.run(command, check=True)
+    with open(os.path.join(target, ".complete"), "w", encoding="utf-8"):
+        pass
+    return target
+
+
+def read_installed_packages(target: str) -> Dict[Package, int]:
+    """
+    Return every installed distribution of a target directory with its size in bytes.
+    The name and version are read from METADATA, or from the `<name>-<version>.dist-info` folder name when it lacks them.
+    """
+    packages = {}
+    for dist_info in glob.glob(os.path.join(target, "*.dist-info")):
+        name, version = None, None
+        with open(os.path.join(dist_info, "METADATA"), encoding="utf-8", errors="replace") as metadata:
+            for line in metadata:
+                if line.startswith("Name:"):
+                    name = line.split(":", 1)[1].strip()
+                elif line.startswith("Version:"):
+                    version = line.split(":", 1)[1].strip()
+                if name and version:
+                    break
+        folder_name, _separator, folder_version = os.path.basename(dist_info)[:-len(".dist-info")].partition("-")
+        name, version = name or folder_name, version or folder_version
+        size = 0
+        record = os.path.join(dist_info, "RECORD")
+        if os.path.exists(record):
+            with open(record, encoding="utf-8") as record_file:
+                for line in record_file:
+                    path = line.rsplit(",", 2)[0]
+                    full_path = os.path.normpath(os.path.join(target, path))
+                    if os.path.isfile(full_path):
+                        size += os.path.getsize(full_path)
+        packages[(normalize_name(name), version)] = size
+    return packages
+
+
+def resolve_assets(
+    python_version: str,
+    wheelhouse: str = None,
+    allow_local_platform: bool = False
+) -> Tuple[Dict[str, Dict[Package, int]], Dict[str, Dict[Package, int]]]:
+    """Return the resolved packages of every layer and every function."""
+    layers, functions = {}, {}
+    for requirements_file in sorted(glob.glob(os.path.join(get_src_dir(), "layer", "*", "python", "requirements.txt"))):
+        layer_name = requirements_file.split(os.sep)[-3]
+        layers[layer_name] = read_installed_packages(install_requirements(requirements_file, python_version, wheelhouse, allow_local_platform))
+    for function_dir in sorted(glob.glob(os.path.join(get_src_dir(), "lambda", "*", ""))):
+        lambda_name = os.path.basename(os.path.dirname(function_dir))
+        if lambda_name.startswith("__"):
+            continue
+        requirements_file = os.path.join(function_dir, "requirements.txt")
+        functions[lambda_name] = (
+            read_installed_packages(install_requirements(requirements_file, python_version, wheelhouse, allow_local_platform))
+            if os.path.exists(requirements_file) else {}
+        )
+    return layers, functions
+
+
+def read_function_layers(functions: List[str], layers: List[str]) -> Dict[str, List[str]]:
+    """Map every function to the layers it uses, from the synthesized templates when they exist."""
+    templates = glob.glob(os.path.join(get_cdk_out_dir(), "*template.json"))
+    if not templates:
+        print("plan: no synthesized templates found, assuming every function uses every layer")
+        return {function: list(layers) for function in functions}
+    function_layers = {function: [] for function in functions}
+    for template_path in templates:
+        with open(template_path, encoding="utf-8") as template_file:
+            resources = json.load(template_file).get("Resources", {})
+        layer_names = {
+            logical_id: resource["Properties"].get("LayerName")
+            for logical_id, resource in resources.items() if resource["Type"] == "AWS::Lambda::LayerVersion"
+        }
+        for resource in resources.values():
+            if resource["Type"] != "AWS::Lambda::Function":
+                continue
+            function_name = str(resource["Properties"].get("FunctionName", ""))
+            function = next((name for name in functions if function_name.endswith(f"-{name}")), None)
+            if function is None:
+                continue
+            for layer in resource["Properties"].get("Layers", []):
+                if isinstance(layer, dict) and layer_names.get(layer.get("Ref")) in layers:
+                    function_layers[function].append(layer_names[layer["Ref"]])
+    return function_layers
+
+
+def find_duplicates(assets: Dict[str, Dict[Package, int]]) -> List[dict]:
+    """Return the packages shipped by more than one asset, largest waste first."""
+    shipped = {}
+    for asset, packages in assets.items():
+        for (name, version), size in packages.items():
+            shipped.setdefault(name, []).append({"asset": asset, "version": version, "size": size})
+    duplicates = []
+    for name, copies in shipped.items():
+        if len(copies) < 2:
+            continue
+        duplicates.append({
+            "package": name,
+            "copies": copies,
+            "versions": sorted({copy["version"] for copy in copies}),
+            "wasted_bytes": sum(copy["size"] for copy in copies) - max(copy["size"] for copy in copies)
+        })
+    return sorted(duplicates, key=lambda duplicate: -duplicate["wasted_bytes"])
+
+
+def find_conflicts(requirements: Dict[str, Dict[Package, int]]) -> List[dict]:
+    """Return the packages that functions need in more than one version, with the functions needing each version."""
+    versions = {}
+    for function, packages in requirements.items():
+        for name, version in packages:
+            versions.setdefault(name, {}).setdefault(version, []).append(function)
+    return [
+        {"package": name, "versions": {version: sorted(functions) for version, functions in sorted(by_version.items())}}
+        for name, by_version in sorted(versions.items()) if len(by_version) > 1
+    ]
+
+
+def propose_layers(
+    requirements: Dict[str, Dict[Package, int]],
+    max_layers: int
+) -> Tuple[List[dict], Dict[str, Dict[Package, int]]]:
+    """
+    Group shared packages by the exact set of functions that need them, one layer per group. Groups are then
+    merged, cheapest first, until no function needs more than `max_layers` layers. Packages needed by a single
+    function, and packages needed in conflicting versions, stay in the asset of each function, so that a merged layer
+    never ships two versions of the same package.
+    """
+    conflicting = {conflict["package"] for conflict in find_conflicts(requirements)}
+    consumers = {}
+    sizes = {}
+    local = {function: {} for function in requirements}
+    for function, packages in requirements.items():
+        for package, size in packages.items():
+            sizes[package] = size
+            if package[0] in conflicting:
+                local[function][package] = size
+            else:
+                consumers.setdefault(package, set()).add(function)
+
+    groups: Dict[FrozenSet[str], set] = {}
+    for package, functions in consumers.items():
+        if len(functions) == 1:
+            function = next(iter(functions))
+            local[function][package] = sizes[package]
+        else:
+            groups.setdefault(frozenset(functions), set()).add(package)
+
+    def group_size(packages):
+        return sum(sizes[package] for package in packages)
+
+    while True:
+        over = [
+            function for function in requirements
+            if sum(1 for group in groups if function in group) > max_layers
+        ]
+        if not over:
+            break
+        candidates = [group for group in groups if over[0] in group]
+        best = None
+        for first, second in combinations(candidates, 2):
+            extra = group_size(groups[first]) * len(second - first) + group_size(groups[second]) * len(first - second)
+            if best is None or extra < best[0]:
+                best = (extra, first, second)
+        _extra, first, second = best
+        merged = groups.pop(first) | groups.pop(second)
+        groups.setdefault(first | second, set()).update(merged)
+
+    layers = [
+        {
+            "layer": f"shared_layer_{index}",
+            "functions": sorted(functions),
+            "packages": sorted(f"{name}=={version}" for name, version in packages),
+            "size": group_size(packages)
+        }
+        for index, (functions, packages) in enumerate(
+            sorted(groups.items(), key=lambda item: -group_size(item[1])), start=1
+        )
+    ]
+    return layers, local
+
+
+def format_size(size: int) -> str:
+    return f"{size / 1024 / 1024:8.2f} MB"
+
+
+def main():
+    """Resolve, report and propose."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--python-version', type=str, default="3.8", help="Python version of the lambda runtime.")
+    parser.add_argument('--max-layers', type=int, default=MAX_LAYERS_PER_FUNCTION, help="Maximum layers per function.")
+    parser.add_argument('--wheelhouse', type=str, default=None, help="Install only from this folder of wheels.")
+    parser.add_argument('--allow-local-platform', action='store_true',
+                        help="Install for the local platform when there are no wheels for the lambda platform.")
+    parser.add_argument('--output', type=str, default=None, help="Path of the JSON report. Default: .build/layer-plan.json")
+    args = parser.parse_args()
+
+    layers, functions = resolve_assets(args.python_version, args.wheelhouse, args.allow_local_platform)
+    function_layers = read_function_layers(list(functions), list(layers))
+    assets = dict({f"layer:{name}": packages for name, packages in layers.items()},
+                  **{f"function:{name}": packages for name, packages in functions.items()})
+
+    print("\nresolved assets")
+    for asset, packages in assets.items():
+        print(f"  {asset:<40}{len(packages):4d} packages {format_size(sum(packages.values()))}")
+
+    duplicates = find_duplicates(assets)
+    print("\nduplicated packages")
+    for duplicate in duplicates:
+        where = ", ".join(f"{copy['asset']} ({copy['version']})" for copy in duplicate["copies"])
+        print(f"  {duplicate['package']:<30}{format_size(duplicate['wasted_bytes'])} wasted in {where}")
+    if not duplicates:
+        print("  none")
+
+    requirements = {}
+    for function, packages in functions.items():
+        required = dict(packages)
+        for layer in function_layers.get(function, []):
+            required.update(layers[layer])
+        requirements[function] = required
+    conflicts = find_conflicts(requirements)
+    print("\nversion conflicts")
+    for conflict in conflicts:
+        where = "; ".join(f"{version} in {', '.join(needed_by)}" for version, needed_by in conflict["versions"].items())
+        print(f"  {conflict['package']:<30}{where}, not shared")
+    if not conflicts:
+        print("  none")
+    proposed, local = propose_layers(requirements, args.max_layers)
+
+    current_total = sum(sum(packages.values()) for packages in assets.values())
+    proposed_total = sum(layer["size"] for layer in proposed) + sum(sum(packages.values()) for packages in local.values())
+    print("\nproposed layers")
+    for layer in proposed:
+        print(f"  {layer['layer']:<20}{format_size(layer['size'])} for {', '.join(layer['functions'])}")
+        print(f"    {' '.join(layer['packages'])}")
+    print("\nper function")
+    per_function = {}
+    for function in functions:
+        function_proposed = [layer for layer in proposed if function in layer["functions"]]
+        unzipped = sum(layer["size"] for layer in function_proposed) + sum(local[function].values())
+        per_function[function] = {
+            "layers": [layer["layer"] for layer in function_proposed],
+            "function_packages": sorted(f"{name}=={version}" for name, version in local[function]),
+            "unzipped_bytes": unzipped,
+            "within_limits": unzipped <= MAX_UNZIPPED_BYTES and len(function_proposed) <= args.max_layers
+        }
+        print(f"  {function:<30}{len(function_proposed)} layer(s) {format_size(unzipped)} unzipped"
+              f"{'' if per_function[function]['within_limits'] else '  EXCEEDS LAMBDA LIMITS'}")
+    print(f"\ntotal shipped: {format_size(current_total)} today, {format_size(proposed_total)} proposed")
+
+    output = args.output or os.path.join(get_cdk_dir(), ".build", "layer-plan.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as report_file:
+        json.dump({
+            "assets": {asset: {f"{name}=={version}": size for (name, version), size in packages.items()}
+                       for asset, packages in assets.items()},
+            "function_layers": function_layers,
+            "duplicates": duplicates,
+            "conflicts": conflicts,
+            "proposed_layers": proposed,
+            "functions": per_function,
+            "current_total_bytes": current_total,
+            "proposed_total_bytes": proposed_total
+        }, report_file, indent=2)
+    print(f"report: {output}")
+    if not all(function["within_limits"] for function in per_function.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
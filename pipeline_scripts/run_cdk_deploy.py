@@ -1,38 +1,197 @@
-"""Script to deploy CDK."""
+"""Script to deploy CDK.
+
+Deploys the cloud assembly that `run_cdk_synth` wrote to `cdk.out`, without synthesizing again.
+* `cdk bootstrap` only runs for environments whose bootstrap stack is older than the assembly requires.
+* stacks whose template matches the deployed template are skipped, use `--force` to deploy them anyway.
+* independent stacks are deployed concurrently, stacks wait for the stacks they depend on.
+"""
 import argparse
+import hashlib
+import json
 import os
-from configparser import ConfigParser, ExtendedInterpolation
-from pathlib import Path
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+from pipeline_paths import get_cdk_dir
+
+STACK_ARTIFACT = "aws:cloudformation:stack"
+DEFAULT_BOOTSTRAP_PARAMETER = "/cdk-bootstrap/hnb659fds/version"
+REDEPLOY_STATUSES = ("ROLLBACK_COMPLETE", "ROLLBACK_FAILED", "REVIEW_IN_PROGRESS", "DELETE_COMPLETE")
+
+
+def load_stacks(cdk_out: str) -> Dict[str, dict]:
+    """Read the stacks of the cloud assembly from `manifest.json`."""
+    with open(os.path.join(cdk_out, "manifest.json"), encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    artifacts = manifest.get("artifacts", {})
+    stacks = {}
+    for artifact_id, artifact in artifacts.items():
+        if artifact.get("type") != STACK_ARTIFACT:
+            continue
+        properties = artifact.get("properties", {})
+        account, region = artifact.get("environment", "aws://unknown-account/unknown-region")[len("aws://"):].split("/")
+        stacks[artifact_id] = {
+            "id": artifact_id,
+            "display_name": artifact.get("displayName", artifact_id),
+            "stack_name": properties.get("stackName", artifact_id),
+            "template": os.path.join(cdk_out, properties["templateFile"]),
+            "account": account,
+            "region": region,
+            "bootstrap_version": properties.get("requiresBootstrapStackVersion", 0),
+            "bootstrap_parameter": properties.get("bootstrapStackVersionSsmParameter", DEFAULT_BOOTSTRAP_PARAMETER),
+            "dependencies": []
+        }
+    for artifact_id, stack in stacks.items():
+        stack["dependencies"] = [
+            dependency for dependency in artifacts[artifact_id].get("dependencies", []) if dependency in stacks
+        ]
+    return stacks
+
+
+def get_bootstrap_version(region: str, parameter: str) -> Optional[int]:
+    """Return the deployed bootstrap version of a region, or None when the region is not bootstrapped."""
+    try:
+        response = boto3.client("ssm", region_name=region).get_parameter(Name=parameter)
+    except ClientError as error:
+        if error.response["Error"]["Code"] == "ParameterNotFound":
+            return None
+        raise
+    return int(response["Parameter"]["Value"])
+
+
+def bootstrap_if_needed(stacks: Dict[str, dict], env: str) -> None:
+    """Run `cdk bootstrap` only for the environments that are missing or below the required version."""
+    required = {}
+    for stack in stacks.values():
+        key = (stack["account"], stack["region"], stack["bootstrap_parameter"])
+        required[key] = max(required.get(key, 0), stack["bootstrap_version"])
+
+    for (account, region, parameter), version in required.items():
+        if account.startswith("unknown") or region.startswith("unknown"):
+            print("bootstrap: environment of the assembly is not resolved, bootstrapping")
+            subprocess.run(f"npx cdk bootstrap --context env={env}", check=True, shell=True, stderr=subprocess.STDOUT)
+            continue
+        deployed = get_bootstrap_version(region, parameter)
+        if deployed is not None and deployed >= version:
+            print(f"bootstrap: aws://{account}/{region} is at version {deployed} (requires {version}), skipping")
+            continue
+        print(f"bootstrap: aws://{account}/{region} is at version {deployed} (requires {version}), bootstrapping")
+        subprocess.run(
+            f"npx cdk bootstrap aws://{account}/{region} --context env={env}",
+            check=True, shell=True, stderr=subprocess.STDOUT
+        )
+
+
+def template_hash(template: dict) -> str:
+    """Hash a template independently of key order and whitespace."""
+    return hashlib.sha256(json.dumps(template, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def get_deployed_template_hash(stack: dict) -> Optional[str]:
+    """Return the hash of the deployed template, or None when the stack has to be deployed regardless."""
+    client = boto3.client("cloudformation", region_name=stack["region"])
+    try:
+        status = client.describe_stacks(StackName=stack["stack_name"])["Stacks"][0]["StackStatus"]
+    except ClientError as error:
+        if "does not exist" in error.response["Error"]["Message"]:
+            return None
+        raise
+    if status in REDEPLOY_STATUSES or status.endswith("_IN_PROGRESS"):
+        return None
+    body = client.get_template(StackName=stack["stack_name"], TemplateStage="Original")["TemplateBody"]
+    if isinstance(body, str):
+        body = json.loads(body)
+    return template_hash(body)
+
+
+def find_changed_stacks(stacks: Dict[str, dict]) -> List[str]:
+    """Compare every local template with the deployed one. Lookups run concurrently."""
+    def is_changed(stack):
+        with open(stack["template"], encoding="utf-8") as template_file:
+            local = template_hash(json.load(template_file))
+        return local != get_deployed_template_hash(stack)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(stacks)))) as pool:
+        changed = dict(zip(stacks, pool.map(is_changed, stacks.values())))
+    return [stack_id for stack_id, is_stack_changed in changed.items() if is_stack_changed]
+
+
+def deploy_stack(stack: dict, env: str) -> float:
+    """Deploy a single stack from the existing assembly and return the elapsed seconds."""
+    started = time.monotonic()
+    subprocess.run(
+        f"npx cdk deploy '{stack['display_name']}' --app cdk.out --exclusively --context env={env} "
+        f"-v --require-approval never",
+        check=True, shell=True, stderr=subprocess.STDOUT
+    )
+    return time.monotonic() - started
 
-def get_config(top_directory):
-    for path, dirs, files in os.walk(top_directory):
-        for name in files:
-            if name == "config.ini":
-                return os.path.join(path, name)
 
+def deploy_stacks(stacks: Dict[str, dict], changed: List[str], env: str, concurrency: int) -> Dict[str, tuple]:
+    """Deploy the changed stacks in dependency order, running stacks of the same wave concurrently."""
+    results = {stack_id: ("unchanged", 0.0) for stack_id in stacks if stack_id not in changed}
+    done = set(results)
+    pending = [stack_id for stack_id in stacks if stack_id in changed]
+    while pending:
+        wave = [
+            stack_id for stack_id in pending
+            if all(dependency in done for dependency in stacks[stack_id]["dependencies"])
+        ]
+        if not wave:
+            raise RuntimeError(f"Circular stack dependencies between: {', '.join(pending)}")
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(wave)))) as pool:
+            futures = {stack_id: pool.submit(deploy_stack, stacks[stack_id], env) for stack_id in wave}
+        failed = []
+        for stack_id, future in futures.items():
+            try:
+                results[stack_id] = ("deployed", future.result())
+            except subprocess.CalledProcessError:
+                results[stack_id] = ("failed", 0.0)
+                failed.append(stack_id)
+        if failed:
+            print_timings(stacks, results)
+            raise RuntimeError(f"Deployment failed for: {', '.join(failed)}")
+        done.update(wave)
+        pending = [stack_id for stack_id in pending if stack_id not in done]
+    return results
 
-def get_cdk_path(top_directory):
-    for dirname, dirnames, filenames in os.walk(top_directory):
-        for source_dir in dirnames:
-            if source_dir == "cdk":
-                return os.path.join(dirname, source_dir)
 
+def print_timings(stacks: Dict[str, dict], results: Dict[str, tuple]) -> None:
+    """Print the outcome and duration of every stack."""
+    if not results:
+        return
+    width = max(len(stacks[stack_id]["stack_name"]) for stack_id in results)
+    print(f"\n{'stack'.ljust(width)}  {'status':<10}  seconds")
+    for stack_id, (status, elapsed) in results.items():
+        print(f"{stacks[stack_id]['stack_name'].ljust(width)}  {status:<10}  {elapsed:7.1f}")
 
-ROOT_DIR = Path(__file__).parent.parent.parent.parent
 
+def main():
+    """Deploy all changed stacks of the synthesized assembly."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--env', type=str, default='stag')
+    parser.add_argument('--concurrency', type=int, default=4, help="Maximum number of stacks deployed at once.")
+    parser.add_argument('--force', action='store_true', help="Deploy stacks even when their template is unchanged.")
+    args = parser.parse_args()
 
-CONFIG = ConfigParser(interpolation=ExtendedInterpolation())
-CONFIG.read(f"{get_config(ROOT_DIR)}")
+    os.chdir(get_cdk_dir())
+    if not os.path.exists(os.path.join("cdk.out", "manifest.json")):
+        subprocess.run(f"npx cdk synth --context env={args.env}", check=True, shell=True, stderr=subprocess.STDOUT)
+    stacks = load_stacks("cdk.out")
 
-PARSER = argparse.ArgumentParser()
-PARSER.add_argument(
-    '--env', type=str, default='stag'
-)
+    bootstrap_if_needed(stacks, args.env)
+    changed = list(stacks) if args.force else find_changed_stacks(stacks)
+    for stack_id in stacks:
+        if stack_id not in changed:
+            print(f"deploy: {stacks[stack_id]['stack_name']} template is unchanged, skipping")
+    results = deploy_stacks(stacks, changed, args.env, args.concurrency)
+    print_timings(stacks, results)
 
-ARGS = PARSER.parse_args()
-ENV = ARGS.env
 
-os.chdir(get_cdk_path(ROOT_DIR))
-os.system(f"npx cdk bootstrap --context env={ENV}")
-subprocess.run(f"npx cdk deploy '*' --context env={ENV} -v --require-approval never", check=True, shell=True, stderr=subprocess.STDOUT)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,26 @@
-"""Script to run cdk synth ."""
+"""Script to run cdk synth and check the budgets of the bundled functions."""
 import argparse
 import os
 import subprocess
-from pathlib import PurePath
+import sys
 
-
-def get_cdk_dir(top_dir):
-    for _dir, _dirnames, _file in os.walk(top_dir):
-        for _dirname in _dirnames:
-            if _dirname == "cdk":
-                return os.path.join(_dir, _dirname)
+from check_budgets import check_functions
+from pipeline_paths import get_cdk_dir
 
 
 def run_synth(env):
-    cdk_dir_path = get_cdk_dir(PurePath("../../.."))
-    os.chdir(cdk_dir_path)
+    os.chdir(get_cdk_dir())
     subprocess.run(f"npx cdk synth --context env={env}", check=True, shell=True, stderr=subprocess.STDOUT)
 
 
-PARSER = argparse.ArgumentParser()
-PARSER.add_argument(
-    '--env', type=str, default='stag'
-)
-ARGS = PARSER.parse_args()
-ENV = ARGS.env
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser()
+    PARSER.add_argument(
+        '--env', type=str, default='stag'
+    )
+    ARGS = PARSER.parse_args()
+    ENV = ARGS.env
 
-run_synth(ENV)
+    run_synth(ENV)
+    if check_functions() > 0:
+        sys.exit(1)
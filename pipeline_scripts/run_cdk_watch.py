@@ -0,0 +1,212 @@
+"""Script to hotswap lambda code changes into a development environment.
+
+Watches `src/lambda/` and `src/layer/` and pushes changes straight to the deployed functions:
+* a change in `src/lambda/<lambda_name>` bundles that function like a synth does, with its requirements and bytecode, and
+  uploads the bundle.
+* a change in `src/layer/<layer_name>` rebuilds that layer only, publishes a new version and points the functions using it to the new version.
+* a change in `infra/` or `.configrc/` falls back to a full synth and deploy.
+
+Hotswapping bypasses CloudFormation, so the deployed stack drifts from its template until the next deploy.
+It refuses to run against production environments.
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from configparser import ConfigParser, ExtendedInterpolation
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+from install_layer_reqs import build_layer_archive
+from pipeline_paths import ROOT_DIR, get_cdk_dir, get_config_path
+
+sys.path.append(get_cdk_dir())
+from stack_blueprints.asset_bundling import BUILD_DIR, bundle_function  # noqa: E402 pylint: disable=wrong-import-position
+
+PROTECTED_ENVS = ("prod", "prod-dr")
+EXCLUDED_NAMES = {"__pycache__", ".pytest_cache", "tests", "sample_events", "cdk.out", ".build"}
+EXCLUDED_FILES = {"cdk.context.json"}
+MAX_DIRECT_UPLOAD_BYTES = 50 * 1024 * 1024
+
+
+def snapshot(directories) -> Dict[str, Tuple[int, int]]:
+    """Return the modification time and size of every watched file."""
+    files = {}
+    for directory in directories:
+        for dirname, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [name for name in dirnames if name not in EXCLUDED_NAMES]
+            for filename in filenames:
+                if filename.endswith((".pyc", ".zip")) or filename in EXCLUDED_FILES:
+                    continue
+                path = os.path.join(dirname, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def changed_files(before: Dict[str, tuple], after: Dict[str, tuple]) -> Set[str]:
+    """Return the files that were added, removed or modified between two snapshots."""
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+
+def classify_changes(paths: Set[str]) -> Tuple[Set[str], Set[str], bool]:
+    """Split changed files into changed functions, changed layers and whether infrastructure changed."""
+    functions, layers, infra = set(), set(), False
+    for path in paths:
+        parts = Path(path).relative_to(ROOT_DIR).parts
+        if parts[0] != "src":
+            infra = True
+        elif parts[1:2] == ("lambda",) and len(parts) > 3:
+            functions.add(parts[2])
+        elif parts[1:2] == ("layer",) and len(parts) > 3:
+            layers.add(parts[2])
+    return functions, layers, infra
+
+
+def zip_function_code(bundle_dir: str) -> bytes:
+    """Zip a function bundle in memory."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for dirname, _dirnames, filenames in os.walk(bundle_dir):
+            for filename in filenames:
+                path = os.path.join(dirname, filename)
+                archive.write(path, os.path.relpath(path, bundle_dir))
+    return buffer.getvalue()
+
+
+def hotswap_function(lambda_client, function_name: str, function_dir: str, allow_local_platform: bool = False) -> None:
+    """
+    Bundle a function for the runtime and architecture it is deployed with, upload it and wait until it is active.
+    The bundle is the one a synth builds in `.build/lambda`, with the default include and exclude patterns.
+    """
+    started = time.monotonic()
+    configuration = lambda_client.get_function_configuration(FunctionName=function_name)
+    bundle_dir, _asset_hash = bundle_function(
+        source_dir=function_dir,
+        lambda_name=os.path.basename(function_dir),
+        runtime_name=configuration["Runtime"],
+        architecture=configuration.get("Architectures", ["x86_64"])[0],
+        allow_local_platform=allow_local_platform,
+        build_dir=os.path.join(get_cdk_dir(), BUILD_DIR)
+    )
+    lambda_client.update_function_code(FunctionName=function_name, ZipFile=zip_function_code(bundle_dir))
+    lambda_client.get_waiter("function_updated_v2").wait(FunctionName=function_name)
+    print(f"hotswap: {function_name} code updated in {time.monotonic() - started:.1f}s")
+
+
+def hotswap_layer(lambda_client, app_name: str, layer_name: str, layer_dir: str) -> None:
+    """Publish a new version of one layer and move the functions of the app that use it to that version."""
+    started = time.monotonic()
+    with tempfile.TemporaryDirectory() as build_dir:
+        archive = build_layer_archive(layer_dir, os.path.join(build_dir, layer_name))
+        if os.path.getsize(archive) > MAX_DIRECT_UPLOAD_BYTES:
+            raise RuntimeError(f"{layer_name} is too large to hotswap, run a full deploy instead.")
+        with open(archive, "rb") as archive_file:
+            content = archive_file.read()
+
+    previous = lambda_client.list_layer_versions(LayerName=layer_name).get("LayerVersions", [])
+    runtimes = previous[0].get("CompatibleRuntimes", ["python3.8"]) if previous else ["python3.8"]
+    new_version_arn = lambda_client.publish_layer_version(
+        LayerName=layer_name,
+        Content={"ZipFile": content},
+        CompatibleRuntimes=runtimes
+    )["LayerVersionArn"]
+    layer_arn = new_version_arn.rsplit(":", 1)[0]
+
+    paginator = lambda_client.get_paginator("list_functions")
+    for page in paginator.paginate():
+        for function in page["Functions"]:
+            if not function["FunctionName"].startswith(f"{app_name}-"):
+                continue
+            current_layers = [layer["Arn"] for layer in function.get("Layers", [])]
+            if not any(arn.rsplit(":", 1)[0] == layer_arn for arn in current_layers):
+                continue
+            new_layers = [new_version_arn if arn.rsplit(":", 1)[0] == layer_arn else arn for arn in current_layers]
+            lambda_client.update_function_configuration(FunctionName=function["FunctionName"], Layers=new_layers)
+            lambda_client.get_waiter("function_updated_v2").wait(FunctionName=function["FunctionName"])
+            print(f"hotswap: {function['FunctionName']} now uses {new_version_arn}")
+    print(f"hotswap: {layer_name} rebuilt and published in {time.monotonic() - started:.1f}s")
+
+
+def full_deploy(env: str, layers_dir: str) -> None:
+    """Rebuild the layer zips, synthesize and deploy the whole app."""
+    started = time.monotonic()
+    for layer_dir in [entry.path for entry in os.scandir(layers_dir) if entry.is_dir()]:
+        build_layer_archive(layer_dir, layer_dir)
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, "-m", "run_cdk_synth", "--env", env], check=True, cwd=scripts_dir)
+    subprocess.run([sys.executable, "-m", "run_cdk_deploy", "--env", env], check=True, cwd=scripts_dir)
+    print(f"deploy: infrastructure change deployed in {time.monotonic() - started:.1f}s")
+
+
+def apply_changes(paths: Set[str], lambda_client, config: ConfigParser, env: str) -> None:
+    """Hotswap the changed functions and layers, or deploy everything when infrastructure changed."""
+    functions, layers, infra = classify_changes(paths)
+    src_dir = os.path.join(ROOT_DIR, "src")
+    if infra:
+        full_deploy(env, os.path.join(src_dir, "layer"))
+        return
+    for layer_name in sorted(layers):
+        hotswap_layer(lambda_client, config[env]["appName"], layer_name, os.path.join(src_dir, "layer", layer_name))
+    for lambda_name in sorted(functions):
+        hotswap_function(
+            lambda_client, f"{config[env]['appName']}-{lambda_name}", os.path.join(src_dir, "lambda", lambda_name),
+            allow_local_platform=config[env].getboolean('bundlingAllowLocalPlatform', fallback=False)
+        )
+
+
+def main():
+    """Watch the source tree and hotswap changes until interrupted."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--env', type=str, default='stag')
+    parser.add_argument('--interval', type=float, default=1.0, help="Seconds between two scans of the source tree.")
+    args = parser.parse_args()
+
+    if args.env in PROTECTED_ENVS:
+        sys.exit(f"Refusing to hotswap into {args.env}. Watch mode is for development environments only.")
+
+    config = ConfigParser(interpolation=ExtendedInterpolation())
+    config.read(get_config_path())
+    if not config.has_section(args.env):
+        sys.exit(f"Unknown environment {args.env}, add it to config.ini first.")
+    lambda_client = boto3.client("lambda", region_name=config[args.env]["awsRegion"])
+
+    watched = [
+        os.path.join(ROOT_DIR, "src", "lambda"),
+        os.path.join(ROOT_DIR, "src", "layer"),
+        os.path.join(ROOT_DIR, "infra"),
+        os.path.join(ROOT_DIR, ".configrc")
+    ]
+    print(f"watch: watching {', '.join(watched)} for {args.env}, press Ctrl+C to stop")
+    previous = snapshot(watched)
+    while True:
+        time.sleep(args.interval)
+        current = snapshot(watched)
+        paths = changed_files(previous, current)
+        if not paths:
+            continue
+        # Wait for editors and formatters to finish writing before deploying.
+        settled = snapshot(watched)
+        while settled != current:
+            time.sleep(args.interval)
+            current, settled = settled, snapshot(watched)
+        paths = changed_files(previous, settled)
+        previous = settled
+        try:
+            apply_changes(paths, lambda_client, config, args.env)
+        except (RuntimeError, subprocess.CalledProcessError, BotoCoreError, ClientError) as error:
+            print(f"watch: {error}")
+
+
+if __name__ == "__main__":
+    main()
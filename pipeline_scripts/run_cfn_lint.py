@@ -1,21 +1,57 @@
-"""Script to run CFN Lint."""
-import os
-from pathlib import Path
+"""Script to run CFN Lint.
+
+Lints every template on its own, in parallel, and skips templates that were linted before with the same content.
+"""
+import argparse
+import json
 import subprocess
-ROOT_DIR = Path(__file__).parent.parent.parent.parent
+import sys
+from typing import List
+
+from template_scan import get_tool_version, scan_templates, write_report
+
+LINT_ARGS = ["-i", "W"]
+LEVELS = {"Error": "error", "Warning": "warning", "Informational": "info"}
+
+
+def lint_template(template: str) -> List[dict]:
+    """Lint a single template and return its findings."""
+    result = subprocess.run(
+        ["cfn-lint", "--format", "json"] + LINT_ARGS + ["--", template],
+        capture_output=True,
+        text=True,
+        check=False
+    )
+    try:
+        matches = json.loads(result.stdout or "[]")
+    except ValueError as error:
+        raise RuntimeError(f"cfn-lint failed on {template}: {result.stdout}{result.stderr}") from error
+    return [
+        {
+            "level": LEVELS.get(match["Level"], "info"),
+            "rule": match["Rule"]["Id"],
+            "resource": "/".join(str(part) for part in match["Location"].get("Path", [])[:2]),
+            "message": match["Message"]
+        }
+        for match in matches
+    ]
+
 
-def get_cfts(top_directory):
-    for dirname, dirnames, filenames in os.walk(top_directory):
-        for source_dir in dirnames:
-            if source_dir == "cdk.out":
-                return os.path.join(dirname, source_dir)
+def run_cfn_lint(workers: int = None) -> int:
+    results = scan_templates(
+        tool="cfn-lint",
+        tool_version=get_tool_version(["cfn-lint", "--version"]),
+        args=LINT_ARGS,
+        scan_one=lint_template,
+        workers=workers
+    )
+    return write_report("cfn-lint", results)
 
 
-PATH_TO_CFT = get_cfts(ROOT_DIR)
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser()
+    PARSER.add_argument('--workers', type=int, default=None, help="Templates linted at once. Default: number of CPUs.")
+    ARGS = PARSER.parse_args()
 
-subprocess.run(
-    f"cfn-lint --verbose {PATH_TO_CFT}/*template.json -i W",
-    shell=True,
-    check=True,
-    stderr=subprocess.STDOUT
-)
\ No newline at end of file
+    if run_cfn_lint(ARGS.workers) > 0:
+        sys.exit(1)
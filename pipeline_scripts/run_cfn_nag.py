@@ -1,22 +1,58 @@
-"""Script to run CFN Nag scan."""
-import os
+"""Script to run CFN Nag scan.
+
+Scans every template on its own, in parallel, and skips templates that were scanned before with the same content.
+"""
+import argparse
+import json
 import subprocess
-from pathlib import Path
+import sys
+from typing import List
+
+from template_scan import get_tool_version, scan_templates, write_report
+
+NAG_ARGS = ["--output-format", "json"]
+LEVELS = {"FAILING_VIOLATION": "error", "WARNING": "warning"}
+
+
+def nag_template(template: str) -> List[dict]:
+    """Scan a single template and return its violations."""
+    result = subprocess.run(
+        ["cfn_nag_scan", "--input-path", template] + NAG_ARGS,
+        capture_output=True,
+        text=True,
+        check=False
+    )
+    try:
+        scanned = json.loads(result.stdout)
+    except ValueError as error:
+        raise RuntimeError(f"cfn_nag_scan failed on {template}: {result.stdout}{result.stderr}") from error
+    return [
+        {
+            "level": LEVELS.get(violation["type"], "info"),
+            "rule": violation["id"],
+            "resource": ",".join(violation.get("logical_resource_ids", [])),
+            "message": violation["message"]
+        }
+        for file_result in scanned
+        for violation in file_result["file_results"]["violations"]
+    ]
 
-ROOT_DIR = Path(__file__).parent.parent.parent.parent
 
-def get_cfts(top_directory):
-    for _dirname, _dirnames, _filenames in os.walk(top_directory):
-        for source_dir in _dirnames:
-            if source_dir == "cdk.out":
-                return os.path.join(_dirname, source_dir)
+def run_cfn_nag(workers: int = None) -> int:
+    results = scan_templates(
+        tool="cfn-nag",
+        tool_version=get_tool_version(["cfn_nag_scan", "--version"]),
+        args=NAG_ARGS,
+        scan_one=nag_template,
+        workers=workers
+    )
+    return write_report("cfn-nag", results)
 
 
-PATH_TO_STACKS = get_cfts(ROOT_DIR)
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser()
+    PARSER.add_argument('--workers', type=int, default=None, help="Templates scanned at once. Default: number of CPUs.")
+    ARGS = PARSER.parse_args()
 
-os.system(f"cfn_nag_scan --input-path {PATH_TO_STACKS}/*template.json")
-subprocess.check_output(
-    f"cfn_nag_scan --input-path {PATH_TO_STACKS}/*template.json",
-    shell=True,
-    stderr=subprocess.STDOUT
-)
\ No newline at end of file
+    if run_cfn_nag(ARGS.workers) > 0:
+        sys.exit(1)
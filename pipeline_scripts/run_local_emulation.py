@@ -0,0 +1,568 @@
+"""Script to run the synthesized stack offline and measure its end-to-end latency and throughput.
+
+Reads a stack template from `cdk.out`, creates its queues, buckets, topics and tables in moto, and runs the real
+handlers from `src/lambda/` in process for the event sources of the template:
+* `AWS::Lambda::EventSourceMapping` on SQS queues, polled in batches.
+* S3 notifications (`Custom::S3BucketNotifications`) to functions, emulated by listing the bucket.
+* SNS subscriptions of functions, delivered through a hidden queue per subscription. Subscriptions of queues are made in moto.
+
+A synthetic load is then sent to an entry point (a queue, bucket or topic of the template) and the run lasts until every
+source is drained. The report has the latency from sending a message to the end of the invocation that received it,
+the invocation count, duration and errors of every function, the metrics the handlers emitted with `layer_utils.metrics`,
+and the overall throughput.
+
+Every function runs in its own environment as on lambda: its environment variables, its folder on `sys.path` and the
+modules it imported from its folder or its layers, with their state, are only in place while it is loaded or invoked.
+Invocations of the same function run concurrently, a different function waits until they are done.
+
+    python3 -m run_local_emulation --target <queue, bucket or topic> --messages 1000 --rate 200
+
+Requires the packages of `requirements-dev.txt`.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import boto3
+from moto import mock_aws
+
+from check_budgets import get_layer_python_dirs
+from pipeline_paths import get_cdk_out_dir, get_src_dir
+from run_cdk_deploy import load_stacks
+
+REGION = "us-east-1"
+POLL_INTERVAL = 0.05
+IDLE_POLLS = 20
+MAX_RECEIVES = 3
+
+
+def resolve_name(value, logical_id: str) -> str:
+    """Return a physical name from the template, or the logical id when the name is computed at deploy time."""
+    return value if isinstance(value, str) else logical_id
+
+
+def referenced_id(value) -> Optional[str]:
+    """Return the logical id a `Ref` or `Fn::GetAtt` points to."""
+    if isinstance(value, dict):
+        if "Ref" in value:
+            return value["Ref"]
+        if "Fn::GetAtt" in value:
+            return value["Fn::GetAtt"][0]
+    return None
+
+
+class Context():
+    """The parts of the lambda context object handlers usually read."""
+
+    def __init__(self, function_name: str, memory_size: int, timeout: float) -> None:
+        self.function_name = function_name
+        self.function_version = "$LATEST"
+        self.memory_limit_in_mb = memory_size
+        self.aws_request_id = str(uuid.uuid4())
+        self.invoked_function_arn = f"arn:aws:lambda:{REGION}:123456789012:function:{function_name}"
+        self.log_group_name = f"/aws/lambda/{function_name}"
+        self.log_stream_name = "emulation"
+        self._deadline = time.monotonic() + timeout
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+class Isolation():
+    """
+    # Isolation
+    Swaps the environment variables, `sys.path` and `sys.modules` of the process to those of one function at a time.
+    Functions enter with `enter` and leave with `leave`, entries of the active function are counted, and a waiting
+    function is let in before new invocations of the active one.
+    Modules loaded from the folder of a function or from `layer_dirs` belong to that function, other modules, e.g. boto3,
+    are shared.
+    """
+
+    def __init__(self, layer_dirs: List[str]) -> None:
+        self.base_environ = dict(os.environ)
+        self.base_path = list(sys.path)
+        self.layer_dirs = [os.path.abspath(path) for path in layer_dirs]
+        self.active = None
+        self.entered = 0
+        self.waiting = 0
+        self.condition = threading.Condition()
+
+    def enter(self, function: "Function") -> None:
+        with self.condition:
+            if self.active is not function or self.waiting:
+                self.waiting += 1
+                self.condition.wait_for(lambda: self.active is None)
+                self.waiting -= 1
+                self.active = function
+                self._swap_in(function)
+            self.entered += 1
+
+    def leave(self, function: "Function") -> None:
+        with self.condition:
+            self.entered -= 1
+            if self.entered == 0:
+                self._swap_out(function)
+                self.active = None
+                self.condition.notify_all()
+
+    def _swap_in(self, function: "Function") -> None:
+        os.environ.clear()
+        os.environ.update(self.base_environ, **function.environment)
+        sys.path[:] = [function.source_dir] + self.base_path
+        sys.modules.update(function.modules)
+
+    def _is_private(self, module, function: "Function") -> bool:
+        spec = getattr(module, "__spec__", None)
+        locations = list(getattr(spec, "submodule_search_locations", None) or []) + [getattr(module, "__file__", None)]
+        roots = [os.path.abspath(function.source_dir)] + self.layer_dirs
+        return any(
+            location and os.path.commonpath([os.path.abspath(location), root]) == root
+            for location in locations for root in roots
+        )
+
+    def _swap_out(self, function: "Function") -> None:
+        """Keep the modules of the function, including lazy imports of its invocations, and restore the rest."""
+        for name, module in list(sys.modules.items()):
+            if self._is_private(module, function):
+                function.modules[name] = sys.modules.pop(name)
+        sys.path[:] = self.base_path
+        os.environ.clear()
+        os.environ.update(self.base_environ)
+
+
+class Function():
+    """A function of the template, loaded from `src/lambda/<lambda_name>` and invoked in process."""
+
+    def __init__(self, logical_id: str, properties: dict, names: Dict[str, str], isolation: Isolation) -> None:
+        self.logical_id = logical_id
+        self.name = resolve_name(properties.get("FunctionName"), logical_id)
+        self.memory_size = properties.get("MemorySize", 128)
+        self.timeout = properties.get("Timeout", 3)
+        self.environment = {
+            key: value if isinstance(value, str) else names.get(referenced_id(value), "")
+            for key, value in properties.get("Environment", {}).get("Variables", {}).items()
+        }
+        module_name, self.handler_name = properties["Handler"].rsplit(".", 1)
+        self.source_dir = self._find_source_dir()
+        self.module_path = os.path.join(self.source_dir, *module_name.split(".")) + ".py"
+        self.isolation = isolation
+        self.modules = {}
+        self.handler = None
+        self.durations: List[float] = []
+        self.errors = 0
+
+    def _find_source_dir(self) -> str:
+        lambda_dir = os.path.join(get_src_dir(), "lambda")
+        for entry in sorted(os.scandir(lambda_dir), key=lambda entry: -len(entry.name)):
+            if entry.is_dir() and self.name.endswith(f"-{entry.name}"):
+                return entry.path
+        raise RuntimeError(f"emulation: no folder in {lambda_dir} for function {self.name}")
+
+    def load(self) -> None:
+        """Import the handler module in the environment of the function, its variables are set first as on lambda."""
+        self.isolation.enter(self)
+        try:
+            spec = importlib.util.spec_from_file_location(f"emulated_{self.logical_id}", self.module_path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[spec.name] = module
+            spec.loader.exec_module(module)
+            self.handler = getattr(module, self.handler_name)
+        finally:
+            self.isolation.leave(self)
+
+    def invoke(self, event: dict) -> bool:
+        """Invoke the handler in the environment of the function and return whether it succeeded."""
+        self.isolation.enter(self)
+        started = time.perf_counter()
+        try:
+            self.handler(event, Context(self.name, self.memory_size, self.timeout))
+            return True
+        except Exception as error:  # pylint: disable=broad-except
+            self.errors += 1
+            print(f"emulation: {self.name} failed: {error!r}")
+            return False
+        finally:
+            self.durations.append(time.perf_counter() - started)
+            self.isolation.leave(self)
+
+
+class Emulator():
+    """
+    # Emulator
+    Creates the resources of a template in moto, wires its event sources and dispatches events to the functions.
+    * `create_resources`
+    * `wire_event_sources`
+    * `resolve_target`
+    * `send`
+    * `run_until_drained`
+    """
+
+    def __init__(self, template: dict, concurrency: int, layer_dirs: List[str]) -> None:
+        self.resources = template.get("Resources", {})
+        self.names: Dict[str, str] = {}
+        # Physical names of the queues, buckets and topics, as `--target` takes them, to their logical id.
+        self.logical_ids: Dict[str, str] = {}
+        self.arns: Dict[str, str] = {}
+        self.functions: Dict[str, Function] = {}
+        self.isolation = Isolation(layer_dirs)
+        self.pollers: List[Callable[[], int]] = []
+        self.sent_at: Dict[str, float] = {}
+        self.latencies: List[float] = []
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.sqs = boto3.client("sqs", region_name=REGION)
+        self.s3 = boto3.client("s3", region_name=REGION)
+        self.sns = boto3.client("sns", region_name=REGION)
+        self.dynamodb = boto3.client("dynamodb", region_name=REGION)
+
+    def of_type(self, resource_type: str):
+        return [(logical_id, resource.get("Properties", {})) for logical_id, resource in self.resources.items()
+                if resource["Type"] == resource_type]
+
+    def create_resources(self) -> None:
+        """Create the queues, buckets, topics and tables of the template."""
+        for logical_id, properties in self.of_type("AWS::SQS::Queue"):
+            name = resolve_name(properties.get("QueueName"), logical_id)
+            attributes = {"FifoQueue": "true"} if properties.get("FifoQueue") else {}
+            url = self.sqs.create_queue(QueueName=name, Attributes=attributes)["QueueUrl"]
+            self.names[logical_id] = url
+            self.logical_ids[name] = logical_id
+            self.arns[logical_id] = self.sqs.get_queue_attributes(
+                QueueUrl=url, AttributeNames=["QueueArn"])["Attributes"]["QueueArn"]
+        for logical_id, properties in self.of_type("AWS::S3::Bucket"):
+            name = resolve_name(properties.get("BucketName"), logical_id.lower())
+            self.s3.create_bucket(Bucket=name)
+            self.names[logical_id] = name
+            self.logical_ids[name] = logical_id
+            self.arns[logical_id] = f"arn:aws:s3:::{name}"
+        for logical_id, properties in self.of_type("AWS::SNS::Topic"):
+            name = resolve_name(properties.get("TopicName"), logical_id)
+            arn = self.sns.create_topic(Name=name)["TopicArn"]
+            self.names[logical_id] = arn
+            self.logical_ids[name] = logical_id
+            self.arns[logical_id] = arn
+        for resource_type in ("AWS::DynamoDB::Table", "AWS::DynamoDB::GlobalTable"):
+            for logical_id, properties in self.of_type(resource_type):
+                name = resolve_name(properties.get("TableName"), logical_id)
+                self.dynamodb.create_table(
+                    TableName=name,
+                    KeySchema=properties["KeySchema"],
+                    AttributeDefinitions=properties["AttributeDefinitions"],
+                    BillingMode="PAY_PER_REQUEST"
+                )
+                self.names[logical_id] = name
+        for logical_id, properties in self.of_type("AWS::Lambda::Function"):
+            self.functions[logical_id] = Function(logical_id, properties, self.names, self.isolation)
+            self.names[logical_id] = self.functions[logical_id].name
+        print(f"emulation: created {len(self.names) - len(self.functions)} resource(s), {len(self.functions)} function(s)")
+
+    def wire_event_sources(self) -> None:
+        """Create a poller for every event source of a function."""
+        for _logical_id, properties in self.of_type("AWS::Lambda::EventSourceMapping"):
+            source_id = referenced_id(properties.get("EventSourceArn"))
+            function = self.functions.get(referenced_id(properties.get("FunctionName")))
+            if function is None or self.resources.get(source_id, {}).get("Type") != "AWS::SQS::Queue":
+                print(f"emulation: skipping event source {source_id}, only SQS mappings are emulated")
+                continue
+            self.pollers.append(self.sqs_poller(self.names[source_id], self.arns[source_id], function,
+                                                properties.get("BatchSize", 10), self.sqs_event))
+
+        for _logical_id, properties in self.of_type("Custom::S3BucketNotifications"):
+            bucket = self.names[referenced_id(properties["BucketName"])]
+            for configuration in properties.get("NotificationConfiguration", {}).get("LambdaFunctionConfigurations", []):
+                function = self.functions[referenced_id(configuration["LambdaFunctionArn"])]
+                self.pollers.append(self.s3_poller(bucket, function))
+
+        for _logical_id, properties in self.of_type("AWS::SNS::Subscription"):
+            topic_arn = self.names[referenced_id(properties["TopicArn"])]
+            endpoint_id = referenced_id(properties["Endpoint"])
+            if properties["Protocol"] == "sqs":
+                self.sns.subscribe(TopicArn=topic_arn, Protocol="sqs", Endpoint=self.arns[endpoint_id], Attributes={
+                    "RawMessageDelivery": str(properties.get("RawMessageDelivery", False)).lower()
+                })
+            elif properties["Protocol"] == "lambda":
+                # A hidden queue receives the notifications of the topic, the function is invoked with SNS events.
+                url = self.sqs.create_queue(QueueName=f"emulation-{endpoint_id}-{uuid.uuid4().hex[:8]}")["QueueUrl"]
+                arn = self.sqs.get_queue_attributes(QueueUrl=url, AttributeNames=["QueueArn"])["Attributes"]["QueueArn"]
+                self.sns.subscribe(TopicArn=topic_arn, Protocol="sqs", Endpoint=arn)
+                self.pollers.append(self.sqs_poller(url, arn, self.functions[endpoint_id], 1, self.sns_event))
+        print(f"emulation: wired {len(self.pollers)} event source(s)")
+
+    @staticmethod
+    def sqs_event(messages: List[dict], queue_arn: str) -> dict:
+        return {"Records": [{
+            "messageId": message["MessageId"],
+            "receiptHandle": message["ReceiptHandle"],
+            "body": message["Body"],
+            "attributes": message.get("Attributes", {}),
+            "messageAttributes": message.get("MessageAttributes", {}),
+            "eventSource": "aws:sqs",
+            "eventSourceARN": queue_arn,
+            "awsRegion": REGION
+        } for message in messages]}
+
+    @staticmethod
+    def sns_event(messages: List[dict], _queue_arn: str) -> dict:
+        records = []
+        for message in messages:
+            notification = json.loads(message["Body"])
+            records.append({"EventSource": "aws:sns", "EventVersion": "1.0", "Sns": notification})
+        return {"Records": records}
+
+    def event_ids(self, event: dict) -> List[str]:
+        """The ids the load generator knows the messages of an event by."""
+        ids = []
+        for record in event["Records"]:
+            if "Sns" in record:
+                ids.append(record["Sns"]["MessageId"])
+            elif "s3" in record:
+                ids.append(f"{record['s3']['bucket']['name']}/{record['s3']['object']['key']}")
+            else:
+                body = record["body"]
+                try:
+                    # A queue subscribed to a topic receives the SNS envelope.
+                    ids.append(json.loads(body).get("MessageId", record["messageId"]))
+                except (ValueError, AttributeError):
+                    ids.append(record["messageId"])
+                ids.append(record["messageId"])
+        return ids
+
+    def dispatch(self, function: Function, event: dict, on_success: Callable[[], None], on_failure: Callable[[], None]):
+        """Invoke a function on the pool and record the latency of the messages it received."""
+        with self.lock:
+            self.in_flight += 1
+
+        def run():
+            succeeded = function.invoke(event)
+            finished = time.time()
+            with self.lock:
+                for message_id in self.event_ids(event):
+                    sent_at = self.sent_at.pop(message_id, None)
+                    if sent_at is not None:
+                        self.latencies.append(finished - sent_at)
+                self.in_flight -= 1
+            (on_success if succeeded else on_failure)()
+
+        self.pool.submit(run)
+
+    def sqs_poller(self, url: str, arn: str, function: Function, batch_size: int, build_event) -> Callable[[], int]:
+        receives: Dict[str, int] = {}
+
+        def poll() -> int:
+            messages = self.sqs.receive_message(
+                QueueUrl=url, MaxNumberOfMessages=min(batch_size, 10), VisibilityTimeout=int(function.timeout) + 1,
+                AttributeNames=["All"], MessageAttributeNames=["All"]
+            ).get("Messages", [])
+            if not messages:
+                return 0
+
+            def delete():
+                self.sqs.delete_message_batch(QueueUrl=url, Entries=[
+                    {"Id": str(index), "ReceiptHandle": message["ReceiptHandle"]} for index, message in enumerate(messages)
+                ])
+
+            def retry():
+                for message in messages:
+                    receives[message["MessageId"]] = receives.get(message["MessageId"], 0) + 1
+                    if receives[message["MessageId"]] >= MAX_RECEIVES:
+                        self.sqs.delete_message(QueueUrl=url, ReceiptHandle=message["ReceiptHandle"])
+                    else:
+                        self.sqs.change_message_visibility(
+                            QueueUrl=url, ReceiptHandle=message["ReceiptHandle"], VisibilityTimeout=0)
+
+            self.dispatch(function, build_event(messages, arn), delete, retry)
+            return len(messages)
+
+        return poll
+
+    def s3_poller(self, bucket: str, function: Function) -> Callable[[], int]:
+        seen: Dict[str, str] = {}
+
+        def poll() -> int:
+            found = 0
+            for page in self.s3.get_paginator("list_objects_v2").paginate(Bucket=bucket):
+                for item in page.get("Contents", []):
+                    if seen.get(item["Key"]) == item["ETag"]:
+                        continue
+                    seen[item["Key"]] = item["ETag"]
+                    found += 1
+                    event = {"Records": [{
+                        "eventSource": "aws:s3",
+                        "eventName": "ObjectCreated:Put",
+                        "awsRegion": REGION,
+                        "s3": {
+                            "bucket": {"name": bucket, "arn": f"arn:aws:s3:::{bucket}"},
+                            "object": {"key": item["Key"], "size": item["Size"], "eTag": item["ETag"].strip('"')}
+                        }
+                    }]}
+                    self.dispatch(function, event, lambda: None, lambda: None)
+            return found
+
+        return poll
+
+    def resolve_target(self, target: str) -> str:
+        """The logical id of a queue, bucket or topic, named by its logical id, physical name, queue URL or topic ARN."""
+        logical_id = target if target in self.resources else self.logical_ids.get(target)
+        if logical_id is None:
+            logical_id = next((key for key, name in self.names.items() if name == target), target)
+        if self.resources.get(logical_id, {}).get("Type") not in ("AWS::SQS::Queue", "AWS::SNS::Topic", "AWS::S3::Bucket"):
+            raise ValueError(f"emulation: {target} is not a queue, bucket or topic of the template")
+        return logical_id
+
+    def send(self, target: str, index: int, payload: dict) -> None:
+        """Send one message of the load to a queue, bucket or topic, named as in `resolve_target`."""
+        logical_id = self.resolve_target(target)
+        resource_type = self.resources[logical_id]["Type"]
+        body = json.dumps(dict(payload, emulation_index=index))
+        now = time.time()
+        if resource_type == "AWS::SQS::Queue":
+            message_id = self.sqs.send_message(QueueUrl=self.names[logical_id], MessageBody=body)["MessageId"]
+        elif resource_type == "AWS::SNS::Topic":
+            message_id = self.sns.publish(TopicArn=self.names[logical_id], Message=body)["MessageId"]
+        elif resource_type == "AWS::S3::Bucket":
+            key = f"emulation/{index}.json"
+            self.s3.put_object(Bucket=self.names[logical_id], Key=key, Body=body.encode("utf-8"))
+            message_id = f"{self.names[logical_id]}/{key}"
+        with self.lock:
+            self.sent_at[message_id] = now
+
+    def run_until_drained(self, stop: threading.Event, abort: threading.Event = None) -> None:
+        """
+        Poll every source until the load is sent, nothing is in flight and the sources stayed empty for a while,
+        or at once when `abort` is set. The invocations already dispatched are waited for in both cases.
+        """
+        idle = 0
+        while idle < IDLE_POLLS and not (abort is not None and abort.is_set()):
+            found = sum(poll() for poll in self.pollers)
+            with self.lock:
+                busy = self.in_flight > 0
+            idle = 0 if found or busy or not stop.is_set() else idle + 1
+            if not found:
+                time.sleep(POLL_INTERVAL)
+        self.pool.shutdown(wait=True)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def print_report(emulator: Emulator, messages: int, elapsed: float) -> dict:
+    """Print the latency, throughput and per function results, and return them."""
+    latencies = emulator.latencies
+    report = {
+        "messages": messages,
+        "elapsed_seconds": elapsed,
+        "throughput_per_second": messages / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            name: percentile(latencies, fraction) * 1000
+            for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+        },
+        "received": len(latencies),
+        "functions": {
+            function.name: {
+                "invocations": len(function.durations),
+                "errors": function.errors,
+                "mean_duration_ms": statistics.mean(function.durations) * 1000 if function.durations else 0.0,
+                "p99_duration_ms": percentile(function.durations, 0.99) * 1000
+            }
+            for function in emulator.functions.values()
+        },
+        "metrics": {}
+    }
+    # Every function has its own copy of `layer_utils.metrics`, and of its `LOCAL_SINK`.
+    sinks = [function.modules["layer_utils.metrics"].LOCAL_SINK
+             for function in emulator.functions.values() if "layer_utils.metrics" in function.modules]
+    names = {metric["Name"] for sink in sinks for record in sink.records
+             for directive in record["_aws"]["CloudWatchMetrics"] for metric in directive["Metrics"]}
+    for name in sorted(names):
+        values = [value for sink in sinks for value in sink.metric_values(name)]
+        report["metrics"][name] = {"count": len(values), "mean": statistics.mean(values)}
+
+    print(f"\nemulation: {messages} message(s) in {elapsed:.2f}s, {report['throughput_per_second']:.1f} msg/s")
+    print(f"latency: p50 {report['latency_ms']['p50']:.1f} ms, p90 {report['latency_ms']['p90']:.1f} ms, "
+          f"p99 {report['latency_ms']['p99']:.1f} ms, max {report['latency_ms']['max']:.1f} ms "
+          f"({report['received']} of {messages} received)")
+    for name, function in report["functions"].items():
+        print(f"  {name:<50}{function['invocations']:6d} invocation(s) {function['errors']:4d} error(s) "
+              f"mean {function['mean_duration_ms']:.1f} ms p99 {function['p99_duration_ms']:.1f} ms")
+    for name, metric in report["metrics"].items():
+        print(f"  metric {name:<43}{metric['count']:6d} value(s) mean {metric['mean']:.2f}")
+    return report
+
+
+def main():
+    """Emulate the stack and push the load through it."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stack', type=str, default=None, help="Stack of cdk.out to emulate. Default: the first stack.")
+    parser.add_argument('--target', type=str, required=True, help="Logical id or name of the queue, bucket or topic the load is sent to.")
+    parser.add_argument('--messages', type=int, default=100, help="Number of messages sent.")
+    parser.add_argument('--rate', type=float, default=50.0, help="Messages sent per second.")
+    parser.add_argument('--payload', type=str, default=None, help="JSON file with the body of every message. Default: {}")
+    parser.add_argument('--concurrency', type=int, default=10, help="Invocations running at once.")
+    parser.add_argument('--output', type=str, default=None, help="Path of the JSON report. Default: cdk.out/emulation-report.json")
+    args = parser.parse_args()
+
+    stacks = load_stacks(get_cdk_out_dir())
+    stack = stacks[args.stack] if args.stack else next(iter(stacks.values()))
+    with open(stack["template"], encoding="utf-8") as template_file:
+        template = json.load(template_file)
+    payload = {}
+    if args.payload:
+        with open(args.payload, encoding="utf-8") as payload_file:
+            payload = json.load(payload_file)
+
+    os.environ.update({
+        "AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing", "AWS_DEFAULT_REGION": REGION,
+        "AWS_REGION": REGION, "METRICS_SINK": "local", "TRACE_EXPORTER": "memory"
+    })
+    layer_dirs = get_layer_python_dirs(os.path.join(get_cdk_out_dir(), ".emulation-layers"))
+    sys.path[:0] = layer_dirs
+
+    with mock_aws():
+        emulator = Emulator(template, args.concurrency, layer_dirs)
+        emulator.create_resources()
+        emulator.wire_event_sources()
+        for function in emulator.functions.values():
+            function.load()
+
+        target = emulator.resolve_target(args.target)
+
+        sent = threading.Event()
+        aborted = threading.Event()
+        started = time.perf_counter()
+        drain = threading.Thread(target=emulator.run_until_drained, args=(sent, aborted))
+        drain.start()
+        # The drain thread is joined inside mock_aws, once the load failed it would poll the real endpoints.
+        try:
+            for index in range(args.messages):
+                delay = started + index / args.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                emulator.send(target, index, payload)
+        except BaseException:
+            aborted.set()
+            raise
+        finally:
+            sent.set()
+            drain.join()
+        elapsed = time.perf_counter() - started
+        report = print_report(emulator, args.messages, elapsed)
+
+    output = args.output or os.path.join(get_cdk_out_dir(), "emulation-report.json")
+    with open(output, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"report: {output}")
+
+
+if __name__ == "__main__":
+    main()
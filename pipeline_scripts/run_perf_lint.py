@@ -0,0 +1,261 @@
+"""Script to lint the synthesized templates for configurations that make functions slow or expensive.
+
+Rules are set in `.configrc/config.ini`. `[perflint:default]` applies to every environment and is overridden by
+`[perflint:<env>]`. Each rule is set to the level of its findings, `error | warning | info | off`, and errors fail the step:
+
+    lambdaDefaultMemory : functions left at `defaultMemoryMb` with a timeout of `longTimeoutSeconds` or more
+    lambdaX86Architecture : x86_64 functions without native code in their package or layers, which run on arm64 as they are
+    sqsMaxReceiveCount : queues that redrive to a DLQ only after more than `maxReceiveCount` receives
+    eventSourceNoBatchingWindow : event source mappings that invoke the function without a batching window
+    s3KmsWithoutBucketKey : buckets encrypted with KMS without an S3 bucket key, one KMS request per object operation
+    vpcFunctionWithoutEndpoints : VPC functions in a template without S3 and DynamoDB gateway endpoints
+    logGroupNoRetention : log groups, and functions writing to their implicit log group, that keep logs forever
+
+Templates are scanned in parallel and cached like cfn-lint, see `template_scan.py`.
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import zipfile
+from typing import Dict, Iterable, List
+
+from check_budgets import load_config
+from template_scan import scan_templates, write_report
+
+RULES = (
+    "lambdaDefaultMemory",
+    "lambdaX86Architecture",
+    "sqsMaxReceiveCount",
+    "eventSourceNoBatchingWindow",
+    "s3KmsWithoutBucketKey",
+    "vpcFunctionWithoutEndpoints",
+    "logGroupNoRetention"
+)
+DEFAULT_SETTINGS = {
+    "defaultMemoryMb": "256",
+    "longTimeoutSeconds": "60",
+    "maxReceiveCount": "10"
+}
+LEVELS = ("error", "warning", "info", "off")
+ELF_MAGIC = b"\x7fELF"
+ELF_MACHINE_X86_64 = 0x3E
+# Lambda uses 128 MB and 3 seconds when a function does not set them.
+LAMBDA_DEFAULT_MEMORY_MB = 128
+LAMBDA_DEFAULT_TIMEOUT_SECONDS = 3
+
+
+def get_rules(env: str) -> Dict[str, str]:
+    """Return the rule levels and settings of an environment, the defaults overridden by its own section."""
+    config = load_config()
+    rules = dict({rule: "warning" for rule in RULES}, **DEFAULT_SETTINGS)
+    for section in ("perflint:default", f"perflint:{env}"):
+        if config.has_section(section):
+            rules.update(config[section])
+    for rule in RULES:
+        if rules[rule].lower() not in LEVELS:
+            raise ValueError(f"perf-lint: {rule} must be one of {', '.join(LEVELS)}, not {rules[rule]}")
+        rules[rule] = rules[rule].lower()
+    return rules
+
+
+def is_x86_64_header(header: bytes) -> bool:
+    """Whether the first 20 bytes of a file are the header of an ELF shared object built for x86_64."""
+    return len(header) == 20 and header[:4] == ELF_MAGIC and struct.unpack("<H", header[18:20])[0] == ELF_MACHINE_X86_64
+
+
+def is_x86_64_binary(path: str) -> bool:
+    """Whether a file is an ELF shared object built for x86_64."""
+    try:
+        with open(path, "rb") as binary:
+            return is_x86_64_header(binary.read(20))
+    except OSError:
+        return False
+
+
+def is_shared_object(name: str) -> bool:
+    """Whether a file name is the name of a shared object, e.g. `_speedups.so` or `libz.so.1`."""
+    name = os.path.basename(name)
+    return name.endswith(".so") or ".so." in name
+
+
+def has_x86_64_code(path: str) -> bool:
+    """Whether an asset, a folder or a `.zip` file, contains native extensions built for x86_64."""
+    if os.path.isfile(path):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                for member in archive.infolist():
+                    if not member.is_dir() and is_shared_object(member.filename):
+                        with archive.open(member) as binary:
+                            if is_x86_64_header(binary.read(20)):
+                                return True
+        except (OSError, zipfile.BadZipFile):
+            return False
+        return False
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            if is_shared_object(name) and is_x86_64_binary(os.path.join(root, name)):
+                return True
+    return False
+
+
+def asset_path(resource: dict, template: str) -> str:
+    """The asset of a resource in `cdk.out`, a folder or a `.zip` file, from its `aws:asset:path` metadata."""
+    path = resource.get("Metadata", {}).get("aws:asset:path")
+    if path is None:
+        return None
+    path = os.path.join(os.path.dirname(template), path)
+    if os.path.isdir(path) or (os.path.isfile(path) and path.endswith(".zip")):
+        return path
+    return None
+
+
+def referenced_ids(value) -> Iterable[str]:
+    """The logical ids referenced by `Ref` and `Fn::GetAtt` in a property value."""
+    if isinstance(value, dict):
+        if "Ref" in value:
+            yield value["Ref"]
+        elif "Fn::GetAtt" in value:
+            attribute = value["Fn::GetAtt"]
+            yield attribute[0] if isinstance(attribute, list) else attribute.split(".")[0]
+        else:
+            for item in value.values():
+                yield from referenced_ids(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from referenced_ids(item)
+
+
+def finding(rules: Dict[str, str], rule: str, logical_id: str, message: str) -> List[dict]:
+    """A finding of `rule`, or none when the rule is off."""
+    if rules[rule] == "off":
+        return []
+    return [{"level": rules[rule], "rule": rule, "resource": f"Resources/{logical_id}", "message": message}]
+
+
+def check_functions(rules: Dict[str, str], template: str, resources: Dict[str, dict]) -> List[dict]:
+    """Memory, architecture, VPC endpoint and log retention rules of the functions of a template."""
+    findings = []
+    endpoints = " ".join(
+        json.dumps(resource.get("Properties", {}).get("ServiceName"))
+        for resource in resources.values() if resource["Type"] == "AWS::EC2::VPCEndpoint"
+    )
+    retained = {
+        logical_id
+        for resource in resources.values() if resource["Type"] == "Custom::LogRetention"
+        for logical_id in referenced_ids(resource.get("Properties", {}).get("LogGroupName"))
+    }
+    for logical_id, resource in resources.items():
+        if resource["Type"] != "AWS::Lambda::Function":
+            continue
+        properties = resource.get("Properties", {})
+
+        memory = properties.get("MemorySize", LAMBDA_DEFAULT_MEMORY_MB)
+        timeout = properties.get("Timeout", LAMBDA_DEFAULT_TIMEOUT_SECONDS)
+        if (isinstance(memory, int) and isinstance(timeout, int) and memory == int(rules["defaultMemoryMb"])
+                and timeout >= int(rules["longTimeoutSeconds"])):
+            findings += finding(
+                rules, "lambdaDefaultMemory", logical_id,
+                f"runs up to {timeout}s with the default {memory} MB. CPU scales with memory, so a long running function "
+                "often finishes sooner and costs less with more memory. Set memory_size from a power tuning run."
+            )
+
+        if properties.get("PackageType") != "Image" and "arm64" not in properties.get("Architectures", ["x86_64"]):
+            assets = [asset_path(resource, template)] + [
+                asset_path(resources[layer_id], template)
+                for layer_id in referenced_ids(properties.get("Layers", [])) if layer_id in resources
+            ]
+            if not any(has_x86_64_code(path) for path in assets if path is not None):
+                findings += finding(
+                    rules, "lambdaX86Architecture", logical_id,
+                    "runs on x86_64 but has no native code in its package or layers, so it runs on arm64 as it is. "
+                    "arm64 is about 20% cheaper per GB-second."
+                )
+
+        if "VpcConfig" in properties:
+            missing = [service for service in ("s3", "dynamodb") if f".{service}" not in endpoints]
+            if missing:
+                findings += finding(
+                    rules, "vpcFunctionWithoutEndpoints", logical_id,
+                    f"runs in a VPC without {' and '.join(missing)} gateway endpoint(s) in this template, so its "
+                    "calls go through a NAT gateway, slower and billed per GB."
+                )
+
+        if "LogGroup" not in properties.get("LoggingConfig", {}) and logical_id not in retained:
+            findings += finding(
+                rules, "logGroupNoRetention", logical_id,
+                "writes to the log group lambda creates, which keeps logs forever. Set log_retention or logRetention in config.ini."
+            )
+    return findings
+
+
+def check_resources(rules: Dict[str, str], resources: Dict[str, dict]) -> List[dict]:
+    """Queue, event source mapping, bucket and log group rules of a template."""
+    findings = []
+    for logical_id, resource in resources.items():
+        properties = resource.get("Properties", {})
+        if resource["Type"] == "AWS::SQS::Queue":
+            max_receive_count = properties.get("RedrivePolicy", {}).get("maxReceiveCount")
+            if isinstance(max_receive_count, int) and max_receive_count > int(rules["maxReceiveCount"]):
+                findings += finding(
+                    rules, "sqsMaxReceiveCount", logical_id,
+                    f"moves a message to its DLQ after {max_receive_count} receives. A poison message is retried, "
+                    f"and billed, that many times. Use {rules['maxReceiveCount']} or less."
+                )
+        elif resource["Type"] == "AWS::Lambda::EventSourceMapping":
+            if not properties.get("MaximumBatchingWindowInSeconds"):
+                findings += finding(
+                    rules, "eventSourceNoBatchingWindow", logical_id,
+                    "invokes the function as soon as a record arrives, with batches of one under low traffic. "
+                    "Set max_batching_window to trade a little latency for fewer, fuller invocations."
+                )
+        elif resource["Type"] == "AWS::S3::Bucket":
+            configurations = properties.get("BucketEncryption", {}).get("ServerSideEncryptionConfiguration", [])
+            for configuration in configurations:
+                algorithm = configuration.get("ServerSideEncryptionByDefault", {}).get("SSEAlgorithm", "")
+                if str(algorithm).startswith("aws:kms") and configuration.get("BucketKeyEnabled") is not True:
+                    findings += finding(
+                        rules, "s3KmsWithoutBucketKey", logical_id,
+                        "is encrypted with KMS without a bucket key, so every object read and write is a KMS request. "
+                        "Set bucket_key_enabled=True."
+                    )
+        elif resource["Type"] == "AWS::Logs::LogGroup" and "RetentionInDays" not in properties:
+            findings += finding(rules, "logGroupNoRetention", logical_id, "keeps logs forever. Set a retention.")
+    return findings
+
+
+def lint_template(template: str, rules: Dict[str, str]) -> List[dict]:
+    """Lint a single template and return its findings."""
+    with open(template, encoding="utf-8") as template_file:
+        resources = json.load(template_file).get("Resources", {})
+    return check_functions(rules, template, resources) + check_resources(rules, resources)
+
+
+def get_rules_version() -> str:
+    """Hash of this script, part of the cache key so that changed rules scan every template again."""
+    with open(os.path.abspath(__file__), "rb") as script:
+        return hashlib.sha256(script.read()).hexdigest()[:16]
+
+
+def run_perf_lint(env: str, workers: int = None) -> int:
+    rules = get_rules(env)
+    results = scan_templates(
+        tool="perf-lint",
+        tool_version=get_rules_version(),
+        args=[f"{key}={value}" for key, value in sorted(rules.items())],
+        scan_one=lambda template: lint_template(template, rules),
+        workers=workers
+    )
+    return write_report("perf-lint", results)
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser()
+    PARSER.add_argument('--env', type=str, default='stag')
+    PARSER.add_argument('--workers', type=int, default=None, help="Templates linted at once. Default: number of CPUs.")
+    ARGS = PARSER.parse_args()
+
+    if run_perf_lint(ARGS.env, ARGS.workers) > 0:
+        sys.exit(1)
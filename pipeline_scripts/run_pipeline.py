@@ -0,0 +1,140 @@
+"""Script to run the whole pipeline as one orchestrated run.
+
+The pipeline steps form a dependency graph:
+
+    build-layers -> synth -> lint ------> deploy
+                          -> nag  ------>
+                          -> perf-lint ->
+
+Steps start as soon as the steps they depend on succeed, so independent steps such as lint, nag and perf-lint run in
+parallel.
+Paths are resolved once and handed to every step, and each output line is prefixed with the name of its step.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List
+
+from pipeline_paths import export_paths
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PRINT_LOCK = threading.Lock()
+
+
+class Step():
+    """A pipeline step: a pipeline script module and the steps that must succeed before it."""
+
+    def __init__(self, name: str, module: str, args: List[str] = None, depends_on: List[str] = None) -> None:
+        self.name = name
+        self.module = module
+        self.args = [] if args is None else args
+        self.depends_on = [] if depends_on is None else depends_on
+
+    def run(self, env: Dict[str, str]) -> float:
+        """Run the step, stream its output line by line and return the elapsed seconds."""
+        started = time.monotonic()
+        emit(self.name, f"started: python3 -m {self.module} {' '.join(self.args)}".rstrip())
+        with subprocess.Popen(
+            [sys.executable, "-u", "-m", self.module] + self.args,
+            cwd=SCRIPTS_DIR,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        ) as process:
+            for line in process.stdout:
+                emit(self.name, line.rstrip("\n"))
+            return_code = process.wait()
+        elapsed = time.monotonic() - started
+        if return_code != 0:
+            emit(self.name, f"failed with exit code {return_code} after {elapsed:.1f}s")
+            raise subprocess.CalledProcessError(return_code, self.module)
+        emit(self.name, f"finished in {elapsed:.1f}s")
+        return elapsed
+
+
+def emit(step_name: str, line: str) -> None:
+    """Print a line of step output without interleaving with other steps."""
+    with PRINT_LOCK:
+        print(f"[{step_name}] {line}", flush=True)
+
+
+def get_steps(env: str) -> Dict[str, Step]:
+    """Return the pipeline steps for an environment."""
+    steps = [
+        Step("build-layers", "install_layer_reqs"),
+        Step("synth", "run_cdk_synth", ["--env", env], depends_on=["build-layers"]),
+        Step("lint", "run_cfn_lint", depends_on=["synth"]),
+        Step("nag", "run_cfn_nag", depends_on=["synth"]),
+        Step("perf-lint", "run_perf_lint", ["--env", env], depends_on=["synth"]),
+        Step("deploy", "run_cdk_deploy", ["--env", env], depends_on=["lint", "nag", "perf-lint"])
+    ]
+    return {step.name: step for step in steps}
+
+
+def run_steps(steps: Dict[str, Step], skipped: List[str], max_parallel: int) -> Dict[str, tuple]:
+    """Run the steps in dependency order. Skipped steps count as succeeded. Stops scheduling on the first failure."""
+    env = dict(os.environ, **export_paths())
+    results = {name: ("skipped", 0.0) for name in skipped if name in steps}
+    pending = [name for name in steps if name not in results]
+    running = {}
+    failed = False
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        while pending or running:
+            if not failed:
+                for name in list(pending):
+                    if all(results.get(dependency, ("",))[0] in ("succeeded", "skipped")
+                           for dependency in steps[name].depends_on):
+                        running[pool.submit(steps[name].run, env)] = name
+                        pending.remove(name)
+            if not running:
+                break
+            done, _not_done = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = ("succeeded", future.result())
+                except subprocess.CalledProcessError:
+                    results[name] = ("failed", 0.0)
+                    failed = True
+    for name in pending:
+        results[name] = ("not run", 0.0)
+    return results
+
+
+def print_summary(steps: Dict[str, Step], results: Dict[str, tuple], elapsed: float) -> None:
+    """Print the outcome and duration of every step."""
+    print(f"\n{'step':<14}{'status':<11}seconds")
+    for name in steps:
+        status, seconds = results[name]
+        print(f"{name:<14}{status:<11}{seconds:7.1f}")
+    print(f"{'total':<25}{elapsed:7.1f}")
+
+
+def main():
+    """Run the pipeline."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--env', type=str, default='stag')
+    parser.add_argument('--skip', action='append', default=[], help="Name of a step to skip. Can be repeated.")
+    parser.add_argument('--max-parallel', type=int, default=4, help="Maximum number of steps running at once.")
+    args = parser.parse_args()
+
+    steps = get_steps(args.env)
+    unknown = [name for name in args.skip if name not in steps]
+    if unknown:
+        parser.error(f"unknown step(s) {', '.join(unknown)}, choose from {', '.join(steps)}")
+
+    started = time.monotonic()
+    results = run_steps(steps, args.skip, args.max_parallel)
+    print_summary(steps, results, time.monotonic() - started)
+    if any(status in ("failed", "not run") for status, _seconds in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
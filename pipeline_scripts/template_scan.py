@@ -0,0 +1,88 @@
+"""Runs a template scanner over every synthesized template, in parallel and cached.
+
+Each template is scanned on its own, by a pool of workers. Findings are cached by the hash of the
+template content, the scanner version and its arguments, so templates that did not change since a
+previous run are not scanned again. The findings of all templates are merged into one report.
+"""
+import glob
+import hashlib
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from pipeline_paths import get_cdk_dir, get_cdk_out_dir
+
+CACHE_DIR_NAME = ".scan-cache"
+LEVELS = ("error", "warning", "info")
+
+
+def find_templates() -> List[str]:
+    """Return the synthesized templates in `cdk.out`."""
+    return sorted(glob.glob(os.path.join(get_cdk_out_dir(), "*template.json")))
+
+
+def get_tool_version(command: List[str]) -> str:
+    """Return the version output of a scanner, part of the cache key."""
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+    return (result.stdout or result.stderr).strip()
+
+
+def cache_key(template: str, tool: str, tool_version: str, args: List[str]) -> str:
+    """Hash of the template content and everything that changes the scanner output."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([tool, tool_version, args]).encode("utf-8"))
+    with open(template, "rb") as template_file:
+        digest.update(template_file.read())
+    return digest.hexdigest()
+
+
+def scan_templates(
+    tool: str,
+    tool_version: str,
+    args: List[str],
+    scan_one: Callable[[str], List[dict]],
+    templates: List[str] = None,
+    workers: int = None
+) -> Dict[str, List[dict]]:
+    """Scan every template with `scan_one`, reusing cached findings. Returns the findings of each template."""
+    templates = find_templates() if templates is None else templates
+    cache_dir = os.path.join(get_cdk_dir(), CACHE_DIR_NAME, tool)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    def scan(template):
+        cache_file = os.path.join(cache_dir, f"{cache_key(template, tool, tool_version, args)}.json")
+        if os.path.exists(cache_file):
+            with open(cache_file, encoding="utf-8") as cached:
+                return json.load(cached), True
+        findings = scan_one(template)
+        with open(f"{cache_file}.tmp", "w", encoding="utf-8") as cached:
+            json.dump(findings, cached)
+        os.replace(f"{cache_file}.tmp", cache_file)
+        return findings, False
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for template, (findings, cached) in zip(templates, pool.map(scan, templates)):
+            print(f"{tool}: {os.path.basename(template)} {'cached' if cached else 'scanned'}, {len(findings)} finding(s)")
+            results[template] = findings
+    return results
+
+
+def write_report(tool: str, results: Dict[str, List[dict]]) -> int:
+    """Merge the findings of all templates into `cdk.out/<tool>-report.json`, print them and return the error count."""
+    findings = [
+        dict(finding, template=os.path.basename(template))
+        for template, template_findings in results.items()
+        for finding in template_findings
+    ]
+    counts = {level: sum(1 for finding in findings if finding["level"] == level) for level in LEVELS}
+    report_path = os.path.join(get_cdk_out_dir(), f"{tool}-report.json")
+    with open(report_path, "w", encoding="utf-8") as report_file:
+        json.dump({"tool": tool, "templates": len(results), "counts": counts, "findings": findings}, report_file, indent=2)
+
+    for finding in findings:
+        print(f"{finding['template']}: {finding['level'].upper()} {finding['rule']} {finding['resource']} {finding['message']}")
+    print(f"{tool}: {counts['error']} error(s), {counts['warning']} warning(s) in {len(results)} template(s), report: {report_path}")
+    return counts["error"]
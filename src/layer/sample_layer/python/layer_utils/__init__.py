@@ -0,0 +1,11 @@
+"""
+# Lambda Layer Utilities
+
+Helpers shared by lambda functions through the sample layer.
+* `metrics`: CloudWatch Embedded Metric Format instrumentation for handlers.
+* `tracing`: Span helpers that time downstream calls and export them to X-Ray.
+* `config_cache`: Warm-invocation cache for SSM parameters and Secrets Manager secrets.
+* `logger`: Buffered structured logging that filters by level before formatting and writes once per invocation.
+* `disk_cache`: LRU cache of S3 objects in /tmp for warm invocations, revalidated with conditional GETs.
+* `efs_loader`: Imports and memory-mapped model files from an EFS file system mounted by the function.
+"""
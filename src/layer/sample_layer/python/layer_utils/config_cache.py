@@ -0,0 +1,299 @@
+"""
+# Configuration and Secret Cache
+
+Caches SSM parameters and Secrets Manager secrets for the lifetime of the execution environment,
+so warm invocations do not call SSM or Secrets Manager again.
+* every key has a TTL, the cache is bounded in size and evicts the least recently used key.
+* once a key expires, the stale value is still served for `stale_ttl` seconds while it is refreshed in the background.
+* `prefetch_declared` loads the paths declared with `SsmConstruct` in bulk, call it at module level.
+
+```python
+from layer_utils import config_cache
+
+config_cache.prefetch_declared()
+
+def lambda_handler(event, context):
+    db_url = config_cache.get_parameter("/my-app/stag/db-url")
+    api_key = config_cache.get_secret("my-app/stag/api-key")
+```
+
+* `CONFIG_CACHE_TTL`: default TTL in seconds. Default: 300
+* `CONFIG_CACHE_MAX_ENTRIES`: maximum number of cached keys. Default: 512
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List
+
+PARAMETER_PATHS_ENV = "CONFIG_PARAMETER_PATHS"
+SECRET_NAMES_ENV = "CONFIG_SECRET_NAMES"
+SSM_BATCH_SIZE = 10
+SECRETS_BATCH_SIZE = 20
+
+
+class _Entry():
+    """A cached value and its freshness."""
+
+    __slots__ = ("value", "fetched_at", "ttl", "refreshing")
+
+    def __init__(self, value: Any, fetched_at: float, ttl: float) -> None:
+        self.value = value
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+        self.refreshing = False
+
+
+class ConfigCache():
+    """
+    # Config Cache
+    A bounded LRU cache with per-key TTL and stale-while-revalidate refreshes.
+    * `get`
+    * `get_many`
+    * `prefetch`
+    * `put`
+    * `invalidate`
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[List[str]], Dict[str, Any]],
+        default_ttl: float = None,
+        stale_ttl: float = None,
+        max_entries: int = None,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        * param `loader`: Callable that takes a list of keys and returns a dictionary of the values it found.
+        * param `default_ttl`: Seconds a value stays fresh. Default: `CONFIG_CACHE_TTL` env var or 300.
+        * param `stale_ttl`: Seconds an expired value may still be served while it is refreshed. Default: same as `default_ttl`.
+        * param `max_entries`: Maximum number of keys kept. Default: `CONFIG_CACHE_MAX_ENTRIES` env var or 512.
+        * param `clock`: Time source, replaceable in tests.
+        """
+        self.loader = loader
+        self.default_ttl = float(os.environ.get("CONFIG_CACHE_TTL", "300")) if default_ttl is None else default_ttl
+        self.stale_ttl = self.default_ttl if stale_ttl is None else stale_ttl
+        self.max_entries = int(os.environ.get("CONFIG_CACHE_MAX_ENTRIES", "512")) if max_entries is None else max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str, ttl: float = None) -> Any:
+        """Return the value of `key`, loading it on a miss. Raises KeyError if the loader does not know the key."""
+        return self.get_many([key], ttl=ttl)[key]
+
+    def get_many(self, keys: Iterable[str], ttl: float = None) -> Dict[str, Any]:
+        """Return the values of `keys`. All misses are loaded with a single loader call."""
+        now = self.clock()
+        result = {}
+        missing = []
+        to_refresh = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    missing.append(key)
+                    continue
+                age = now - entry.fetched_at
+                if age < entry.ttl:
+                    result[key] = entry.value
+                elif age < entry.ttl + self.stale_ttl:
+                    result[key] = entry.value
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        to_refresh.append(key)
+                else:
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end(key)
+        if to_refresh:
+            threading.Thread(target=self._refresh, args=(to_refresh, ttl), daemon=True).start()
+        if missing:
+            loaded = self._load(missing, ttl)
+            for key in missing:
+                if key not in loaded:
+                    raise KeyError(key)
+                result[key] = loaded[key]
+        return result
+
+    def prefetch(self, keys: Iterable[str], ttl: float = None) -> Dict[str, Any]:
+        """Load `keys` in bulk, whether they are cached or not. Meant to be called at init time."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        return self._load(keys, ttl)
+
+    def put(self, key: str, value: Any, ttl: float = None) -> None:
+        """Store a value, evicting the least recently used keys beyond `max_entries`."""
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def invalidate(self, key: str = None) -> None:
+        """Drop `key`, or every key when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _load(self, keys: List[str], ttl: float) -> Dict[str, Any]:
+        """Call the loader and store what it returned."""
+        loaded = self.loader(keys)
+        with self._lock:
+            for key, value in loaded.items():
+                self._store(key, value, ttl)
+        return loaded
+
+    def _refresh(self, keys: List[str], ttl: float) -> None:
+        """Background refresh of expired keys. On failure the stale values are kept until they run out."""
+        try:
+            self._load(keys, ttl)
+        except Exception:  # pylint: disable=broad-except
+            pass
+        finally:
+            with self._lock:
+                for key in keys:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        entry.refreshing = False
+
+    def _store(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value. The caller holds the lock."""
+        self._entries[key] = _Entry(value, self.clock(), self.default_ttl if ttl is None else ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+_CLIENTS = {}
+
+
+def _client(service: str):
+    """Return a boto3 client, created once per execution environment. boto3 is imported lazily so the module is cheap to import."""
+    if service not in _CLIENTS:
+        import boto3  # pylint: disable=import-outside-toplevel
+        _CLIENTS[service] = boto3.client(service)
+    return _CLIENTS[service]
+
+
+def load_parameters(names: List[str], client=None) -> Dict[str, str]:
+    """Load SSM parameters with `GetParameters`, ten per call. SecureString values are decrypted."""
+    client = client or _client("ssm")
+    values = {}
+    for chunk in _chunks(names, SSM_BATCH_SIZE):
+        response = client.get_parameters(Names=chunk, WithDecryption=True)
+        for parameter in response["Parameters"]:
+            values[parameter["Name"]] = parameter["Value"]
+    return values
+
+
+def load_parameters_by_path(path: str, client=None) -> Dict[str, str]:
+    """Load every SSM parameter below `path`, recursively."""
+    client = client or _client("ssm")
+    values = {}
+    paginator = client.get_paginator("get_parameters_by_path")
+    for page in paginator.paginate(Path=path.rstrip("/") or "/", Recursive=True, WithDecryption=True):
+        for parameter in page["Parameters"]:
+            values[parameter["Name"]] = parameter["Value"]
+    return values
+
+
+def _decode_secret(secret: dict) -> Any:
+    value = secret.get("SecretString", secret.get("SecretBinary"))
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _is_secret(secret_id: str, secret: dict) -> bool:
+    """Whether `secret_id`, a name, an ARN or an ARN without its random suffix, identifies the returned `secret`."""
+    arn = secret.get("ARN", "")
+    return secret_id in (secret.get("Name"), arn) or (secret_id.startswith("arn:") and arn.startswith(f"{secret_id}-"))
+
+
+def load_secrets(names: List[str], client=None) -> Dict[str, Any]:
+    """
+    Load secrets with `BatchGetSecretValue`, twenty per call. JSON secrets are decoded.
+    Values are returned under the ids they were requested with, a name or an ARN.
+    Raises KeyError with the error codes of the secrets that could not be read, e.g. not found or access denied.
+    """
+    client = client or _client("secretsmanager")
+    values = {}
+    for chunk in _chunks(names, SECRETS_BATCH_SIZE):
+        if not hasattr(client, "batch_get_secret_value"):
+            for name in chunk:
+                values[name] = _decode_secret(client.get_secret_value(SecretId=name))
+            continue
+        response = client.batch_get_secret_value(SecretIdList=chunk)
+        errors = response.get("Errors", [])
+        if errors:
+            raise KeyError("; ".join(
+                f"{error.get('SecretId')}: {error.get('ErrorCode')} {error.get('Message', '')}".rstrip() for error in errors
+            ))
+        for secret_id in chunk:
+            for secret in response["SecretValues"]:
+                if _is_secret(secret_id, secret):
+                    values[secret_id] = _decode_secret(secret)
+                    break
+    return values
+
+
+_CACHES = {}
+
+
+def parameter_cache() -> ConfigCache:
+    """Return the SSM parameter cache shared by the execution environment."""
+    if "parameters" not in _CACHES:
+        _CACHES["parameters"] = ConfigCache(loader=load_parameters)
+    return _CACHES["parameters"]
+
+
+def secret_cache() -> ConfigCache:
+    """Return the secret cache shared by the execution environment."""
+    if "secrets" not in _CACHES:
+        _CACHES["secrets"] = ConfigCache(loader=load_secrets)
+    return _CACHES["secrets"]
+
+
+def get_parameter(name: str, ttl: float = None) -> str:
+    """Return an SSM parameter value from the cache."""
+    return parameter_cache().get(name, ttl=ttl)
+
+
+def get_secret(name: str, ttl: float = None) -> Any:
+    """Return a secret value from the cache. JSON secrets are returned decoded."""
+    return secret_cache().get(name, ttl=ttl)
+
+
+def prefetch_declared(ttl: float = None) -> None:
+    """
+    ## Prefetch declared configuration
+    Load the parameter paths and secrets declared for this function with `SsmConstruct` in bulk.
+    Paths ending in `/` are loaded recursively.
+    """
+    paths = [path for path in os.environ.get(PARAMETER_PATHS_ENV, "").split(",") if path]
+    names = [path for path in paths if not path.endswith("/")]
+    cache = parameter_cache()
+    cache.prefetch(names, ttl=ttl)
+    for path in paths:
+        if path.endswith("/"):
+            for name, value in load_parameters_by_path(path).items():
+                cache.put(name, value, ttl=ttl)
+
+    secrets = [name for name in os.environ.get(SECRET_NAMES_ENV, "").split(",") if name]
+    secret_cache().prefetch(secrets, ttl=ttl)
@@ -0,0 +1,236 @@
+"""
+# S3 Disk Cache
+
+Keeps S3 objects in `/tmp` for the lifetime of the execution environment, so warm invocations read reference data
+from local disk instead of downloading it again.
+* files are keyed by bucket, key and ETag. A new version of an object gets a new file.
+* the least recently used files are evicted when the cache is over its byte budget.
+* downloads are written to a temporary file and renamed, so a reader never sees a partial file.
+* once `revalidate_after` seconds have passed, a cached object is checked with a conditional GET (`IfNoneMatch`),
+  which does not transfer the object when it did not change.
+
+```python
+from layer_utils import disk_cache
+
+def lambda_handler(event, context):
+    path = disk_cache.get_path("my-reference-bucket", "lookups/countries.json")
+    with open(path, "rb") as lookup_file:
+        ...
+```
+
+Size the budget with the `ephemeral_storage_size` param of `LambdaConstruct.create_lambda_function`.
+* `DISK_CACHE_DIR`: the cache folder. Default: /tmp/s3-cache
+* `DISK_CACHE_MAX_BYTES`: the byte budget. Default: 80% of the size of the file system of the cache folder.
+* `DISK_CACHE_REVALIDATE_AFTER`: seconds before a cached object is revalidated. Default: 300
+"""
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+DEFAULT_DIR = "/tmp/s3-cache"
+DEFAULT_BUDGET_FRACTION = 0.8
+CHUNK_SIZE = 1024 * 1024
+
+
+class _Entry():
+    """A cached file and its freshness."""
+
+    __slots__ = ("path", "etag", "size", "validated_at")
+
+    def __init__(self, path: str, etag: str, size: int, validated_at: float) -> None:
+        self.path = path
+        self.etag = etag
+        self.size = size
+        self.validated_at = validated_at
+
+
+def _name(bucket: str, key: str) -> str:
+    return hashlib.sha256(f"{bucket}\0{key}".encode("utf-8")).hexdigest()
+
+
+def _etag_suffix(etag: str) -> str:
+    """The ETag in a form usable in a file name."""
+    return etag.strip('"').replace("/", "_")
+
+
+def _is_not_modified(error: Exception) -> bool:
+    response = getattr(error, "response", {}) or {}
+    return (response.get("Error", {}).get("Code") in ("304", "NotModified")
+            or response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 304)
+
+
+class DiskCache():
+    """
+    # Disk Cache
+    An LRU cache of S3 objects on local disk, bounded in bytes and revalidated with conditional GETs.
+    * `get_path`
+    * `read_bytes`
+    * `invalidate`
+    * `stats`
+    """
+
+    def __init__(
+        self,
+        directory: str = None,
+        max_bytes: int = None,
+        revalidate_after: float = None,
+        client=None,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        * param `directory`: The cache folder, created if missing. Default: `DISK_CACHE_DIR` env var or /tmp/s3-cache.
+        * param `max_bytes`: The byte budget. Default: `DISK_CACHE_MAX_BYTES` env var or 80% of the file system of `directory`.
+        * param `revalidate_after`: Seconds before a cached object is revalidated. Default: `DISK_CACHE_REVALIDATE_AFTER` env var or 300.
+        * param `client`: A boto3 S3 client. Default: - created on first download.
+        * param `clock`: Time source, replaceable in tests.
+        """
+        self.directory = directory or os.environ.get("DISK_CACHE_DIR", DEFAULT_DIR)
+        os.makedirs(self.directory, exist_ok=True)
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("DISK_CACHE_MAX_BYTES", "0")) or int(
+                shutil.disk_usage(self.directory).total * DEFAULT_BUDGET_FRACTION)
+        self.max_bytes = max_bytes
+        self.revalidate_after = float(os.environ.get("DISK_CACHE_REVALIDATE_AFTER", "300")) \
+            if revalidate_after is None else revalidate_after
+        self.client = client
+        self.clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0}
+        self._load_existing()
+
+    def _load_existing(self) -> None:
+        """Index the files a previous instance left in the folder, oldest first. They are revalidated on first use."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".tmp"):
+                # A download interrupted by a timeout or a crash.
+                self._remove(entry.path)
+            elif entry.is_file() and "." in entry.name:
+                name, etag = entry.name.split(".", 1)
+                stat = entry.stat()
+                files.append((stat.st_mtime, name, etag, entry.path, stat.st_size))
+        for _mtime, name, etag, path, size in sorted(files):
+            self._entries[name] = _Entry(path, etag, size, float("-inf"))
+            self._size += size
+
+    def _s3(self):
+        if self.client is None:
+            import boto3  # pylint: disable=import-outside-toplevel
+            self.client = boto3.client("s3")
+        return self.client
+
+    def get_path(self, bucket: str, key: str) -> str:
+        """Return the path of a local copy of `s3://bucket/key`, downloading or revalidating it when needed."""
+        name = _name(bucket, key)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and self.clock() - entry.validated_at < self.revalidate_after:
+                self._entries.move_to_end(name)
+                self._stats["hits"] += 1
+                return entry.path
+
+        request = {"Bucket": bucket, "Key": key}
+        if entry is not None:
+            request["IfNoneMatch"] = f'"{entry.etag}"'
+        try:
+            response = self._s3().get_object(**request)
+        except Exception as error:  # pylint: disable=broad-except
+            if entry is None or not _is_not_modified(error):
+                raise
+            with self._lock:
+                if self._entries.get(name) is entry:
+                    entry.validated_at = self.clock()
+                    self._entries.move_to_end(name)
+                    self._stats["revalidated"] += 1
+                    return entry.path
+            # The file was evicted while it was revalidated.
+            response = self._s3().get_object(Bucket=bucket, Key=key)
+        return self._store(name, response)
+
+    def read_bytes(self, bucket: str, key: str) -> bytes:
+        """Return the content of `s3://bucket/key` from the cache."""
+        with open(self.get_path(bucket, key), "rb") as cached_file:
+            return cached_file.read()
+
+    def _store(self, name: str, response: dict) -> str:
+        """Write a GetObject response atomically and evict the least recently used files beyond the budget."""
+        etag = _etag_suffix(response["ETag"])
+        path = os.path.join(self.directory, f"{name}.{etag}")
+        temporary_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        size = 0
+        try:
+            with open(temporary_path, "wb") as temporary_file:
+                for chunk in response["Body"].iter_chunks(CHUNK_SIZE):
+                    temporary_file.write(chunk)
+                    size += len(chunk)
+            os.replace(temporary_path, path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+        with self._lock:
+            previous = self._entries.pop(name, None)
+            if previous is not None:
+                self._size -= previous.size
+                if previous.path != path:
+                    self._remove(previous.path)
+            self._entries[name] = _Entry(path, etag, size, self.clock())
+            self._size += size
+            self._stats["misses"] += 1
+            # The new file is kept even when it is larger than the budget on its own.
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _name_evicted, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+                self._stats["evictions"] += 1
+                self._remove(evicted.path)
+        return path
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def invalidate(self, bucket: str = None, key: str = None) -> None:
+        """Remove the copy of `s3://bucket/key`, or every copy when no key is given."""
+        with self._lock:
+            names = list(self._entries) if key is None else [_name(bucket, key)]
+            for name in names:
+                entry = self._entries.pop(name, None)
+                if entry is not None:
+                    self._size -= entry.size
+                    self._remove(entry.path)
+
+    def stats(self) -> Dict[str, int]:
+        """Hits, misses, revalidations and evictions since the cache was created, and the bytes in use."""
+        with self._lock:
+            return dict(self._stats, bytes=self._size, files=len(self._entries))
+
+
+_CACHE: Dict[str, Optional[DiskCache]] = {"default": None}
+
+
+def default_cache() -> DiskCache:
+    """Return the cache shared by the execution environment."""
+    if _CACHE["default"] is None:
+        _CACHE["default"] = DiskCache()
+    return _CACHE["default"]
+
+
+def get_path(bucket: str, key: str) -> str:
+    """Return the path of a local copy of `s3://bucket/key` from the shared cache."""
+    return default_cache().get_path(bucket, key)
+
+
+def read_bytes(bucket: str, key: str) -> bytes:
+    """Return the content of `s3://bucket/key` from the shared cache."""
+    return default_cache().read_bytes(bucket, key)
@@ -0,0 +1,103 @@
+"""
+# EFS Loader
+
+Loads packages, native libraries and model files from the EFS access point mounted with the `efs_access_point`
+param of `LambdaConstruct.create_lambda_function`, instead of downloading them to `/tmp` on every cold start.
+* `add_to_sys_path` makes packages installed on the file system importable, call it at module level.
+* `map_file` memory-maps a file read-only. Pages are read from EFS on first access and the mapping is reused
+  by warm invocations, so a model is never copied and only the parts that are used are read.
+* `load_library` loads a native library from the file system with ctypes.
+
+```python
+from layer_utils import efs_loader
+
+efs_loader.add_to_sys_path()
+import torch  # installed with `pip install -t <mount>/python torch`
+
+weights = efs_loader.map_file("models/classifier.bin")
+
+def lambda_handler(event, context):
+    tensor = torch.frombuffer(weights, dtype=torch.float32)
+```
+
+The file system layout is `<mount>/python` for packages, `<mount>/lib` for native libraries and any other folder for models.
+* `EFS_MOUNT_PATH`: the mount path, set by `LambdaConstruct`. Default: /mnt/efs
+"""
+import ctypes
+import mmap
+import os
+import sys
+import threading
+from typing import Dict, Iterable
+
+MOUNT_PATH_ENV = "EFS_MOUNT_PATH"
+DEFAULT_MOUNT_PATH = "/mnt/efs"
+
+_MAPPED: Dict[str, mmap.mmap] = {}
+_LIBRARIES: Dict[str, ctypes.CDLL] = {}
+_LOCK = threading.Lock()
+
+
+def mount_path() -> str:
+    """The path the access point is mounted at."""
+    return os.environ.get(MOUNT_PATH_ENV, DEFAULT_MOUNT_PATH)
+
+
+def resolve(relative_path: str) -> str:
+    """Return the absolute path of a file on the file system, raising FileNotFoundError with the mount path if it is missing."""
+    path = os.path.join(mount_path(), relative_path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{relative_path} not found in the file system mounted at {mount_path()}")
+    return path
+
+
+def add_to_sys_path(folders: Iterable[str] = ("python",)) -> None:
+    """
+    Put folders of the file system on `sys.path`, ahead of the deployment package and layers.
+    A folder that does not exist is skipped, so a function still starts while the file system is being populated.
+    """
+    for folder in reversed(list(folders)):
+        path = os.path.join(mount_path(), folder)
+        if os.path.isdir(path) and path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def map_file(relative_path: str, will_need: bool = False) -> mmap.mmap:
+    """
+    Memory-map a file of the file system read-only and return the mapping, which supports the buffer protocol
+    (e.g. `numpy.frombuffer`, `torch.frombuffer`, `memoryview`). The mapping is cached for warm invocations.
+
+    * param `will_need`: Ask the kernel to read the whole file ahead, for files that are always read in full. Default: False
+    """
+    with _LOCK:
+        mapped = _MAPPED.get(relative_path)
+        if mapped is None or mapped.closed:
+            with open(resolve(relative_path), "rb") as mapped_file:
+                # The mapping keeps its own reference to the file, the file object can be closed.
+                mapped = mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+            _MAPPED[relative_path] = mapped
+    if will_need and hasattr(mapped, "madvise"):
+        mapped.madvise(mmap.MADV_WILLNEED)
+    return mapped
+
+
+def load_library(name: str, folder: str = "lib") -> ctypes.CDLL:
+    """Load a native library from a folder of the file system, once per execution environment."""
+    with _LOCK:
+        if name not in _LIBRARIES:
+            _LIBRARIES[name] = ctypes.CDLL(resolve(os.path.join(folder, name)), mode=ctypes.RTLD_GLOBAL)
+        return _LIBRARIES[name]
+
+
+def release(relative_path: str = None) -> None:
+    """Close a mapping, or every mapping, e.g. after a model file was replaced on the file system."""
+    with _LOCK:
+        paths = list(_MAPPED) if relative_path is None else [relative_path]
+        for path in paths:
+            mapped = _MAPPED.pop(path, None)
+            try:
+                if mapped is not None:
+                    mapped.close()
+            except BufferError:
+                # Arrays built on the mapping still use it, it is unmapped once they are garbage collected.
+                pass
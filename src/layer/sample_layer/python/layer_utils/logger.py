@@ -0,0 +1,213 @@
+"""
+# Buffered Structured Logging
+
+A structured logger for high-throughput handlers, a cheaper replacement for `print` and `logging`.
+* a call below the log level returns before anything is built or formatted.
+* records are kept as tuples and serialized to JSON lines only when the buffer is flushed.
+* the buffer is written with a single call per invocation, when the handler returns, instead of a write per line.
+  Records at `flush_level` (ERROR) and above are written at once, so they are not lost if the function times out.
+
+```python
+from layer_utils import logger
+
+log = logger.get_logger()
+
+@log.logging_scope
+def lambda_handler(event, context):
+    log.info("received batch", size=len(event["Records"]))
+    if log.is_enabled_for("DEBUG"):
+        log.debug("batch", records=event["Records"])
+```
+
+Records use the fields of the lambda JSON log format (`timestamp`, `level`, `message`, `requestId`), so the system and
+application log levels set with `LambdaConstruct.create_lambda_function` apply to them as well.
+* `AWS_LAMBDA_LOG_LEVEL`: the application log level, set by lambda from the `applicationLogLevel` of the function.
+* `LOG_LEVEL`: the log level when the function has no application log level. Default: INFO
+* `LOG_SINK`: set to `local` to collect lines in `LOCAL_SINK` instead of stdout.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, List
+
+LEVELS = {"TRACE": 5, "DEBUG": 10, "INFO": 20, "WARN": 30, "WARNING": 30, "ERROR": 40, "FATAL": 50, "CRITICAL": 50}
+LEVEL_NAMES = {5: "TRACE", 10: "DEBUG", 20: "INFO", 30: "WARN", 40: "ERROR", 50: "FATAL"}
+DEFAULT_LEVEL = "INFO"
+MAX_BUFFERED_RECORDS = 1000
+
+
+def level_number(level) -> int:
+    """Return the number of a level name, e.g. 20 for INFO. Numbers are returned as they are."""
+    return level if isinstance(level, int) else LEVELS[level.upper()]
+
+
+class StdoutSink():
+    """Writes lines to stdout, where the Lambda runtime forwards them to CloudWatch Logs."""
+
+    def write(self, lines: List[str]) -> None:
+        """Write all lines with a single call."""
+        if not lines:
+            return
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+
+class LocalSink():
+    """Keeps lines in memory. Used by tests."""
+
+    def __init__(self) -> None:
+        self.lines = []
+
+    def write(self, lines: List[str]) -> None:
+        """Store the lines."""
+        self.lines.extend(lines)
+
+    def clear(self) -> None:
+        """Drop all stored lines."""
+        self.lines = []
+
+    def records(self) -> List[dict]:
+        """Return the stored lines as dictionaries."""
+        return [json.loads(line) for line in self.lines]
+
+
+LOCAL_SINK = LocalSink()
+
+
+def get_default_sink():
+    """Return the sink selected by the `LOG_SINK` environment variable. Default: stdout."""
+    if os.environ.get("LOG_SINK", "stdout").lower() == "local":
+        return LOCAL_SINK
+    return StdoutSink()
+
+
+class StructuredLogger():
+    """
+    # Structured Logger
+    Filters, buffers and writes structured log records as JSON lines.
+    * `debug`, `info`, `warning`, `error`, `exception`
+    * `is_enabled_for`
+    * `append_keys`
+    * `flush`
+    * `logging_scope`
+    """
+
+    def __init__(
+        self,
+        service: str = None,
+        level=None,
+        flush_level="ERROR",
+        max_buffered_records: int = MAX_BUFFERED_RECORDS,
+        sink=None
+    ) -> None:
+        self.service = service or os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+        self.level = level_number(
+            level or os.environ.get("AWS_LAMBDA_LOG_LEVEL") or os.environ.get("LOG_LEVEL") or DEFAULT_LEVEL
+        )
+        self.flush_level = level_number(flush_level)
+        self.max_buffered_records = max_buffered_records
+        self.sink = get_default_sink() if sink is None else sink
+        self._keys = {}
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def is_enabled_for(self, level) -> bool:
+        """Whether records of `level` are written. Use it to skip building expensive fields."""
+        return level_number(level) >= self.level
+
+    def append_keys(self, **keys) -> None:
+        """Add fields to every following record, e.g. an order id. Cleared at the end of `logging_scope`."""
+        self._keys.update(keys)
+
+    def log(self, level: int, message: str, args: tuple = (), fields: dict = None, exc_info=None) -> None:
+        """Buffer a record. `message % args` and the JSON line are only built when the buffer is flushed."""
+        if level < self.level:
+            return
+        self._buffer.append((time.time(), level, message, args, fields, self._keys.copy() if self._keys else None, exc_info))
+        if level >= self.flush_level or len(self._buffer) >= self.max_buffered_records:
+            self.flush()
+
+    def debug(self, message: str, *args, **fields) -> None:
+        if self.level <= 10:
+            self.log(10, message, args, fields)
+
+    def info(self, message: str, *args, **fields) -> None:
+        if self.level <= 20:
+            self.log(20, message, args, fields)
+
+    def warning(self, message: str, *args, **fields) -> None:
+        if self.level <= 30:
+            self.log(30, message, args, fields)
+
+    def error(self, message: str, *args, **fields) -> None:
+        self.log(40, message, args, fields)
+
+    def exception(self, message: str, *args, **fields) -> None:
+        """Log at ERROR with the traceback of the exception being handled."""
+        self.log(40, message, args, fields, exc_info=sys.exc_info())
+
+    def _format(self, record: tuple) -> str:
+        created, level, message, args, fields, keys, exc_info = record
+        line = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(created)) + f".{int(created % 1 * 1000):03d}Z",
+            "level": LEVEL_NAMES.get(level, str(level)),
+            "message": message % args if args else message
+        }
+        if self.service is not None:
+            line["service"] = self.service
+        if keys:
+            line.update(keys)
+        if fields:
+            line.update(fields)
+        if exc_info is not None and exc_info[0] is not None:
+            line["errorType"] = exc_info[0].__name__
+            line["stackTrace"] = traceback.format_exception(*exc_info)
+        return json.dumps(line, default=str, separators=(",", ":"))
+
+    def flush(self) -> None:
+        """Format and write the buffered records with a single write."""
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        if records:
+            self.sink.write([self._format(record) for record in records])
+
+    def logging_scope(self, handler: Callable) -> Callable:
+        """
+        ## Scope a Lambda Handler
+        Use this decorator on a `lambda_handler` to add `requestId` and `coldStart` to its records, log unhandled
+        exceptions and flush the buffer once when the invocation ends.
+        """
+        state = {"cold_start": True}
+
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            request_id = getattr(context, "aws_request_id", None)
+            self._keys = {"coldStart": state["cold_start"]}
+            if request_id is not None:
+                self._keys["requestId"] = request_id
+            state["cold_start"] = False
+            try:
+                return handler(event, context)
+            except Exception:
+                self.exception("unhandled exception")
+                raise
+            finally:
+                self._keys = {}
+                self.flush()
+
+        return wrapper
+
+
+_LOGGERS = {}
+
+
+def get_logger(service: str = None, **kwargs) -> StructuredLogger:
+    """Return the logger of `service`, shared by the execution environment. Keyword arguments apply on first use."""
+    if service not in _LOGGERS:
+        _LOGGERS[service] = StructuredLogger(service=service, **kwargs)
+    return _LOGGERS[service]
+
@@ -0,0 +1,273 @@
+"""
+# Embedded Metric Format Instrumentation
+
+Wraps a `lambda_handler` and emits CloudWatch Embedded Metric Format (EMF) records.
+CloudWatch extracts the metrics from the function logs, so no `PutMetricData` call is made in the hot path.
+Metrics are buffered for the whole invocation and written once, when the handler returns.
+
+```python
+from layer_utils import metrics
+
+@metrics.metric_scope(namespace="MyApp")
+def lambda_handler(event, context):
+    with metrics.timer("LoadInput"):
+        ...
+    metrics.increment("RecordsProcessed", 10)
+```
+
+Set the `METRICS_SINK` environment variable to `local` to collect records in `LOCAL_SINK` instead of stdout.
+Import this module first in the handler module, `InitDuration` is measured from its import to the first invocation.
+"""
+import functools
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+DEFAULT_NAMESPACE = "LambdaFunctions"
+MAX_METRICS_PER_RECORD = 100
+MAX_VALUES_PER_METRIC = 100
+
+_MODULE_LOADED_AT = time.monotonic()
+_STATE = {
+    "cold_start": True,
+    "current": None
+}
+
+
+class StdoutSink():
+    """Writes EMF records to stdout, where the Lambda runtime forwards them to CloudWatch Logs."""
+
+    def write(self, records: List[dict]) -> None:
+        """Write all records of an invocation with a single call."""
+        if not records:
+            return
+        sys.stdout.write("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records))
+        sys.stdout.flush()
+
+
+class LocalSink():
+    """Keeps EMF records in memory. Used by tests and by the local benchmark harness."""
+
+    def __init__(self) -> None:
+        self.records = []
+
+    def write(self, records: List[dict]) -> None:
+        """Store the records of an invocation."""
+        self.records.extend(records)
+
+    def clear(self) -> None:
+        """Drop all stored records."""
+        self.records = []
+
+    def metric_values(self, name: str) -> List[float]:
+        """Return every value recorded for the metric `name`, in emission order."""
+        values = []
+        for record in self.records:
+            if name not in record:
+                continue
+            value = record[name]
+            values.extend(value if isinstance(value, list) else [value])
+        return values
+
+
+LOCAL_SINK = LocalSink()
+
+
+def get_default_sink():
+    """Return the sink selected by the `METRICS_SINK` environment variable. Default: stdout."""
+    if os.environ.get("METRICS_SINK", "stdout").lower() == "local":
+        return LOCAL_SINK
+    return StdoutSink()
+
+
+class MetricsLogger():
+    """
+    # Metrics Logger
+    Buffers metrics and properties and flushes them as EMF records.
+    * `put_metric`
+    * `increment`
+    * `timer`
+    * `set_property`
+    * `flush`
+    """
+
+    def __init__(
+        self,
+        namespace: str = None,
+        dimensions: Dict[str, str] = None,
+        sink=None
+    ) -> None:
+        self.namespace = DEFAULT_NAMESPACE if namespace is None else namespace
+        self.dimensions = {} if dimensions is None else dict(dimensions)
+        self.sink = get_default_sink() if sink is None else sink
+        self._metrics = {}
+        self._properties = {}
+
+    def put_metric(self, name: str, value: float, unit: str = "None") -> None:
+        """Record a value for a metric. Repeated values for the same metric are kept as a list."""
+        if name in self._metrics:
+            self._metrics[name]["values"].append(value)
+        else:
+            self._metrics[name] = {"unit": unit, "values": [value]}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add `value` to a counter. Counters are emitted as one summed value per invocation."""
+        if name in self._metrics:
+            self._metrics[name]["values"][0] += value
+        else:
+            self._metrics[name] = {"unit": "Count", "values": [value]}
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Time the enclosed block and record it in milliseconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.put_metric(name, (time.perf_counter() - started) * 1000, "Milliseconds")
+
+    def set_property(self, key: str, value) -> None:
+        """Attach a searchable, non-metric field such as a request id. High cardinality is fine here."""
+        self._properties[key] = value
+
+    def flush(self) -> None:
+        """Write the buffered metrics as EMF records and reset the buffer."""
+        records = self._build_records()
+        self._metrics = {}
+        self._properties = {}
+        self.sink.write(records)
+
+    def _build_records(self) -> List[dict]:
+        """Split the buffer into records that respect the EMF limits on metrics and values."""
+        entries = []
+        for name, metric in self._metrics.items():
+            values = metric["values"]
+            for start in range(0, len(values), MAX_VALUES_PER_METRIC):
+                entries.append((name, metric["unit"], values[start:start + MAX_VALUES_PER_METRIC]))
+
+        grouped = []
+        for name, unit, values in entries:
+            for group in grouped:
+                if name not in group and len(group) < MAX_METRICS_PER_RECORD:
+                    group[name] = (unit, values)
+                    break
+            else:
+                grouped.append({name: (unit, values)})
+
+        timestamp = int(time.time() * 1000)
+        records = []
+        for group in grouped:
+            record = dict(self._properties)
+            record.update(self.dimensions)
+            record["_aws"] = {
+                "Timestamp": timestamp,
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [list(self.dimensions)],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, (unit, _values) in group.items()]
+                }]
+            }
+            for name, (_unit, values) in group.items():
+                record[name] = values[0] if len(values) == 1 else values
+            records.append(record)
+        return records
+
+
+def metric_scope(
+    handler: Callable = None,
+    namespace: str = None,
+    service: str = None,
+    dimensions: Dict[str, str] = None,
+    sink=None
+) -> Callable:
+    """
+    ## Instrument a Lambda Handler
+    Use this decorator on a `lambda_handler` to emit cold start, init duration, handler duration and error metrics.
+
+    * param `handler`: The handler to wrap. Allows the decorator to be used with or without arguments.
+    * param `namespace`: CloudWatch namespace of the metrics. Default: `METRICS_NAMESPACE` env var or `LambdaFunctions`.
+    * param `service`: Value of the `Service` dimension. Default: the function name.
+    * param `dimensions`: Additional dimensions added to every metric.
+    * param `sink`: Where records are written. Default: selected by the `METRICS_SINK` env var.
+    * returns the wrapped handler. The logger is available as `wrapped.metrics`.
+    """
+    def decorator(function: Callable) -> Callable:
+        all_dimensions = {
+            "Service": service or os.environ.get("AWS_LAMBDA_FUNCTION_NAME", function.__module__)
+        }
+        if dimensions is not None:
+            all_dimensions.update(dimensions)
+        logger = MetricsLogger(
+            namespace=namespace or os.environ.get("METRICS_NAMESPACE"),
+            dimensions=all_dimensions,
+            sink=sink
+        )
+
+        @functools.wraps(function)
+        def wrapper(event, context):
+            started = time.monotonic()
+            cold_start = _STATE["cold_start"]
+            _STATE["cold_start"] = False
+            _STATE["current"] = logger
+            if cold_start:
+                logger.increment("ColdStart")
+                logger.put_metric("InitDuration", (started - _MODULE_LOADED_AT) * 1000, "Milliseconds")
+            else:
+                logger.increment("WarmStart")
+            logger.set_property("IsColdStart", cold_start)
+            request_id = getattr(context, "aws_request_id", None)
+            if request_id is not None:
+                logger.set_property("RequestId", request_id)
+            try:
+                return function(event, context)
+            except Exception:
+                logger.increment("Errors")
+                raise
+            finally:
+                logger.put_metric("HandlerDuration", (time.monotonic() - started) * 1000, "Milliseconds")
+                _STATE["current"] = None
+                logger.flush()
+
+        wrapper.metrics = logger
+        return wrapper
+
+    if handler is not None:
+        return decorator(handler)
+    return decorator
+
+
+def current_metrics() -> Optional[MetricsLogger]:
+    """Return the logger of the invocation in progress, or None outside of `metric_scope`."""
+    return _STATE["current"]
+
+
+def put_metric(name: str, value: float, unit: str = "None") -> None:
+    """Record a metric on the current invocation. Ignored outside of `metric_scope`."""
+    if _STATE["current"] is not None:
+        _STATE["current"].put_metric(name, value, unit)
+
+
+def increment(name: str, value: float = 1) -> None:
+    """Increment a counter on the current invocation. Ignored outside of `metric_scope`."""
+    if _STATE["current"] is not None:
+        _STATE["current"].increment(name, value)
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Time a named sub-phase of the current invocation. Ignored outside of `metric_scope`."""
+    logger = _STATE["current"]
+    if logger is None:
+        yield
+        return
+    with logger.timer(name):
+        yield
+
+
+def set_property(key: str, value) -> None:
+    """Attach a property to the current invocation. Ignored outside of `metric_scope`."""
+    if _STATE["current"] is not None:
+        _STATE["current"].set_property(key, value)
@@ -0,0 +1,358 @@
+"""
+# Lightweight Tracing
+
+Span helpers that record the latency of downstream DynamoDB, S3, HTTP, Redis and Postgres calls.
+Spans are buffered for the invocation and exported when the handler returns, as X-Ray subsegments
+of the function segment that Lambda creates when active tracing is enabled.
+
+```python
+from layer_utils import tracing
+
+tracer = tracing.get_tracer()
+
+@tracer.trace_handler
+def lambda_handler(event, context):
+    with tracer.dynamodb("GetItem", table_name="orders"):
+        table.get_item(Key={"id": event["id"]})
+```
+
+* `TRACE_SAMPLE_RATE`: fraction of sampled invocations that record spans. Default: 1.0
+* `TRACE_EXPORTER`: `xray`, `memory` (collects spans in `MEMORY_EXPORTER`) or `none`. Default: xray
+"""
+import binascii
+import functools
+import json
+import os
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+TRACE_HEADER_ENV = "_X_AMZN_TRACE_ID"
+DEFAULT_DAEMON_ADDRESS = "127.0.0.1:2000"
+
+
+def _new_id() -> str:
+    """Return a random 64 bit identifier in the hex format used by X-Ray."""
+    return binascii.hexlify(os.urandom(8)).decode("ascii")
+
+
+def _new_trace_id() -> str:
+    """Return a trace id in the X-Ray format, for invocations that did not receive one."""
+    return f"1-{int(time.time()):08x}-{binascii.hexlify(os.urandom(12)).decode('ascii')}"
+
+
+def parse_trace_header(header: str) -> Dict[str, str]:
+    """Parse a `Root=...;Parent=...;Sampled=...` trace header into a dictionary."""
+    fields = {}
+    for part in (header or "").split(";"):
+        key, _separator, value = part.strip().partition("=")
+        if key:
+            fields[key] = value
+    return fields
+
+
+class Span():
+    """A timed call to a downstream dependency."""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: str,
+        namespace: str = "remote"
+    ) -> None:
+        self.name = name
+        self.id = _new_id()
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.namespace = namespace
+        self.start_time = time.time()
+        self.end_time = None
+        self.aws = {}
+        self.http = {}
+        self.sql = {}
+        self.metadata = {}
+        self.error = False
+        self.fault = False
+        self.throttle = False
+        self.exception = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Span duration in seconds, or None while the span is open."""
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def set_http_status(self, status: int) -> None:
+        """Record the response status of the call and flag client errors, throttles and faults."""
+        self.http.setdefault("response", {})["status"] = status
+        if status == 429:
+            self.throttle = True
+        if 400 <= status < 500:
+            self.error = True
+        elif status >= 500:
+            self.fault = True
+
+    def record_exception(self, exception: BaseException) -> None:
+        """Mark the span as failed by `exception`."""
+        self.fault = True
+        self.exception = exception
+
+    def to_document(self) -> dict:
+        """Return the span as an X-Ray subsegment document."""
+        document = {
+            "name": self.name,
+            "id": self.id,
+            "trace_id": self.trace_id,
+            "parent_id": self.parent_id,
+            "type": "subsegment",
+            "namespace": self.namespace,
+            "start_time": self.start_time,
+            "end_time": self.end_time
+        }
+        for key in ("aws", "http", "sql", "metadata"):
+            value = getattr(self, key)
+            if value:
+                document[key] = value
+        for key in ("error", "fault", "throttle"):
+            if getattr(self, key):
+                document[key] = True
+        if self.exception is not None:
+            document["cause"] = {
+                "exceptions": [{
+                    "id": _new_id(),
+                    "message": str(self.exception),
+                    "type": type(self.exception).__name__
+                }]
+            }
+        return document
+
+
+class _NoopSpan(Span):
+    """Span handed out for unsampled invocations. Records nothing."""
+
+    def __init__(self) -> None:
+        super().__init__(name="noop", trace_id="", parent_id="")
+
+    def set_http_status(self, status: int) -> None:
+        """Ignore the status."""
+
+    def record_exception(self, exception: BaseException) -> None:
+        """Ignore the exception."""
+
+
+class XRayExporter():
+    """Sends spans to the X-Ray daemon over UDP, one subsegment document per datagram."""
+
+    HEADER = json.dumps({"format": "json", "version": 1}) + "\n"
+
+    def __init__(self, daemon_address: str = None) -> None:
+        address = daemon_address or os.environ.get("AWS_XRAY_DAEMON_ADDRESS", DEFAULT_DAEMON_ADDRESS)
+        host, _separator, port = address.rpartition(":")
+        self.address = (host, int(port))
+        self._socket = None
+
+    def export(self, spans: List[Span]) -> None:
+        """Send the spans. Failures are swallowed, tracing must never break a handler."""
+        if not spans:
+            return
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for span in spans:
+            try:
+                payload = self.HEADER + json.dumps(span.to_document(), default=str)
+                self._socket.sendto(payload.encode("utf-8"), self.address)
+            except OSError:
+                pass
+
+
+class InMemoryExporter():
+    """Collects spans in memory. Stands in for a trace collector in tests and local runs."""
+
+    def __init__(self) -> None:
+        self.spans = []
+
+    def export(self, spans: List[Span]) -> None:
+        """Store the spans."""
+        self.spans.extend(spans)
+
+    def clear(self) -> None:
+        """Drop all stored spans."""
+        self.spans = []
+
+    def spans_named(self, name: str) -> List[Span]:
+        """Return the stored spans with the given name."""
+        return [span for span in self.spans if span.name == name]
+
+
+class _NullExporter():
+    """Drops spans."""
+
+    def export(self, spans: List[Span]) -> None:
+        """Drop the spans."""
+
+
+MEMORY_EXPORTER = InMemoryExporter()
+
+
+def get_default_exporter():
+    """Return the exporter selected by the `TRACE_EXPORTER` environment variable. Default: X-Ray."""
+    exporter = os.environ.get("TRACE_EXPORTER", "xray").lower()
+    if exporter == "memory":
+        return MEMORY_EXPORTER
+    if exporter == "none":
+        return _NullExporter()
+    return XRayExporter()
+
+
+class Tracer():
+    """
+    # Tracer
+    Records spans for downstream calls and exports them once per invocation.
+    * `trace_handler`
+    * `span`
+    * `dynamodb`
+    * `s3`
+    * `http`
+    * `redis`
+    * `postgres`
+    * `flush`
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = None,
+        exporter=None
+    ) -> None:
+        if sample_rate is None:
+            sample_rate = float(os.environ.get("TRACE_SAMPLE_RATE", "1.0"))
+        self.sample_rate = sample_rate
+        self.exporter = get_default_exporter() if exporter is None else exporter
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._finished = []
+        self._trace_id = None
+        self._root_parent_id = None
+        self._sampled = False
+
+    def begin_invocation(self, trace_header: str = None) -> None:
+        """Start a new trace context, from the Lambda trace header when one is present."""
+        if trace_header is None:
+            trace_header = os.environ.get(TRACE_HEADER_ENV, "")
+        fields = parse_trace_header(trace_header)
+        self._trace_id = fields.get("Root") or _new_trace_id()
+        self._root_parent_id = fields.get("Parent") or _new_id()
+        self._sampled = fields.get("Sampled") != "0" and random.random() < self.sample_rate
+        self._local.stack = []
+
+    def flush(self) -> None:
+        """Export the spans finished since the last flush."""
+        with self._lock:
+            finished, self._finished = self._finished, []
+        self.exporter.export(finished)
+
+    def trace_handler(self, handler: Callable) -> Callable:
+        """Decorator that opens a trace context per invocation and exports spans when the handler returns."""
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            self.begin_invocation()
+            try:
+                return handler(event, context)
+            finally:
+                self.flush()
+        return wrapper
+
+    @contextmanager
+    def span(self, name: str, namespace: str = "remote", **metadata) -> Iterator[Span]:
+        """
+        ## Time a downstream call
+        Nested spans become children of the enclosing span.
+
+        * param `name`: Name of the downstream service as shown on the service map.
+        * param `namespace`: `aws` for AWS SDK calls, `remote` for other services.
+        * param `metadata`: Additional key value pairs stored with the span.
+        """
+        if self._trace_id is None:
+            self.begin_invocation()
+        if not self._sampled:
+            yield _NoopSpan()
+            return
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        parent_id = stack[-1].id if stack else self._root_parent_id
+        span = Span(name=name, trace_id=self._trace_id, parent_id=parent_id, namespace=namespace)
+        if metadata:
+            span.metadata["default"] = metadata
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as exception:
+            span.record_exception(exception)
+            raise
+        finally:
+            span.end_time = time.time()
+            stack.pop()
+            with self._lock:
+                self._finished.append(span)
+
+    @contextmanager
+    def dynamodb(self, operation: str, table_name: str = None) -> Iterator[Span]:
+        """Time a DynamoDB call such as `GetItem` or `Query`."""
+        with self.span("DynamoDB", namespace="aws") as span:
+            span.aws.update(self._aws_fields(operation, table_name=table_name))
+            yield span
+
+    @contextmanager
+    def s3(self, operation: str, bucket_name: str = None, key: str = None) -> Iterator[Span]:
+        """Time an S3 call such as `GetObject` or `PutObject`."""
+        with self.span("S3", namespace="aws") as span:
+            span.aws.update(self._aws_fields(operation, bucket_name=bucket_name, key=key))
+            yield span
+
+    @contextmanager
+    def http(self, method: str, url: str) -> Iterator[Span]:
+        """Time an HTTP request. Call `set_http_status` on the span with the response status."""
+        with self.span(urlparse(url).hostname or url, namespace="remote") as span:
+            span.http["request"] = {"method": method.upper(), "url": url}
+            yield span
+
+    @contextmanager
+    def redis(self, command: str, host: str = None) -> Iterator[Span]:
+        """Time a Redis command."""
+        with self.span(f"redis@{host}" if host else "redis", namespace="remote") as span:
+            span.metadata["redis"] = {"command": command.upper()}
+            yield span
+
+    @contextmanager
+    def postgres(self, statement: str = None, database: str = None, host: str = None) -> Iterator[Span]:
+        """Time a Postgres query. Pass a parameterised statement, values are never recorded."""
+        with self.span(f"{database}@{host}" if host else (database or "postgres"), namespace="remote") as span:
+            span.sql["database_type"] = "PostgreSQL"
+            if host is not None:
+                span.sql["url"] = f"{host}/{database}" if database else host
+            if statement is not None:
+                span.sql["sanitized_query"] = statement
+            yield span
+
+    @staticmethod
+    def _aws_fields(operation: str, **fields) -> dict:
+        """Build the `aws` section of an AWS SDK span."""
+        result = {"operation": operation, "region": os.environ.get("AWS_REGION")}
+        result.update({key: value for key, value in fields.items() if value is not None})
+        return result
+
+
+_DEFAULT_TRACER = {"tracer": None}
+
+
+def get_tracer() -> Tracer:
+    """Return the tracer shared by the execution environment."""
+    if _DEFAULT_TRACER["tracer"] is None:
+        _DEFAULT_TRACER["tracer"] = Tracer()
+    return _DEFAULT_TRACER["tracer"]
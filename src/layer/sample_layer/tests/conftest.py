@@ -0,0 +1,5 @@
+"""Makes `layer_utils` importable the way the lambda runtime does, from the `python` folder of the layer."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "python"))
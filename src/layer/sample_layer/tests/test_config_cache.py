@@ -0,0 +1,147 @@
+"""Tests of the parameter and secret cache, with a fake clock and stubbed clients."""
+import json
+import threading
+
+import pytest
+
+from layer_utils import config_cache
+
+ARN_PREFIX = "arn:aws:secretsmanager:us-east-1:123456789012:secret"
+
+
+class Clock():
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Loader():
+    """Returns `<key>-<version>` for every key except `missing`, and records its calls."""
+
+    def __init__(self) -> None:
+        self.calls = []
+        self.version = 1
+        self.called = threading.Event()
+
+    def __call__(self, keys):
+        self.calls.append(list(keys))
+        self.called.set()
+        return {key: f"{key}-{self.version}" for key in keys if key != "missing"}
+
+
+class BatchSecretsClient():
+    """A Secrets Manager client with `BatchGetSecretValue`."""
+
+    def __init__(self, secrets, errors=None) -> None:
+        self.secrets = secrets
+        self.errors = errors or []
+
+    def batch_get_secret_value(self, SecretIdList):  # pylint: disable=invalid-name
+        values = [
+            {"Name": name, "ARN": f"{ARN_PREFIX}:{name}-AbCdEf", "SecretString": value}
+            for name, value in self.secrets.items()
+            if any(secret_id in (name, f"{ARN_PREFIX}:{name}-AbCdEf", f"{ARN_PREFIX}:{name}") for secret_id in SecretIdList)
+        ]
+        return {"SecretValues": values, "Errors": self.errors}
+
+
+class SingleSecretsClient():
+    """A Secrets Manager client with `GetSecretValue` only."""
+
+    def __init__(self, secrets) -> None:
+        self.secrets = secrets
+
+    def get_secret_value(self, SecretId):  # pylint: disable=invalid-name
+        name = SecretId.rsplit(":", 1)[-1].rsplit("-", 1)[0] if SecretId.startswith("arn:") else SecretId
+        return {"Name": name, "ARN": f"{ARN_PREFIX}:{name}-AbCdEf", "SecretString": self.secrets[name]}
+
+
+def test_values_are_cached_until_their_ttl():
+    clock, loader = Clock(), Loader()
+    cache = config_cache.ConfigCache(loader=loader, default_ttl=60, stale_ttl=0, clock=clock)
+    assert cache.get("a") == "a-1"
+    clock.now += 59
+    assert cache.get("a") == "a-1"
+    assert loader.calls == [["a"]]
+
+    loader.version = 2
+    clock.now += 1
+    assert cache.get("a") == "a-2"
+    assert cache.get("b", ttl=5) == "b-2"
+    assert loader.calls == [["a"], ["a"], ["b"]]
+
+
+def test_misses_are_loaded_with_one_call():
+    loader = Loader()
+    cache = config_cache.ConfigCache(loader=loader, clock=Clock())
+    cache.get("a")
+    assert cache.get_many(["a", "b", "c"]) == {"a": "a-1", "b": "b-1", "c": "c-1"}
+    assert loader.calls == [["a"], ["b", "c"]]
+    with pytest.raises(KeyError):
+        cache.get("missing")
+
+
+def test_stale_value_is_served_while_it_is_refreshed():
+    clock, loader = Clock(), Loader()
+    cache = config_cache.ConfigCache(loader=loader, default_ttl=60, stale_ttl=30, clock=clock)
+    cache.get("a")
+    loader.called.clear()
+    loader.version = 2
+    clock.now += 70
+
+    assert cache.get("a") == "a-1"
+    assert loader.called.wait(5)
+    for _attempt in range(100):
+        if cache.get("a") == "a-2":
+            break
+        threading.Event().wait(0.01)
+    assert cache.get("a") == "a-2"
+
+    loader.version = 3
+    clock.now += 60 + 30
+    assert cache.get("a") == "a-3", "a value past its stale ttl is loaded again before it is returned"
+
+
+def test_least_recently_used_key_is_evicted():
+    loader = Loader()
+    cache = config_cache.ConfigCache(loader=loader, max_entries=2, clock=Clock())
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert len(cache) == 2
+
+
+def test_batch_secrets_are_returned_under_the_requested_ids():
+    client = BatchSecretsClient({"app/db": json.dumps({"user": "u"}), "app/key": "plain"})
+    values = config_cache.load_secrets(
+        ["app/db", f"{ARN_PREFIX}:app/key-AbCdEf", f"{ARN_PREFIX}:app/db"], client=client
+    )
+    assert values == {
+        "app/db": {"user": "u"},
+        f"{ARN_PREFIX}:app/key-AbCdEf": "plain",
+        f"{ARN_PREFIX}:app/db": {"user": "u"}
+    }
+
+
+def test_batch_secret_errors_are_raised():
+    client = BatchSecretsClient({"app/db": "x"}, errors=[
+        {"SecretId": "app/gone", "ErrorCode": "ResourceNotFoundException", "Message": "not found"}
+    ])
+    with pytest.raises(KeyError, match="app/gone: ResourceNotFoundException"):
+        config_cache.load_secrets(["app/db", "app/gone"], client=client)
+
+
+def test_single_secrets_are_returned_under_the_requested_ids():
+    client = SingleSecretsClient({"app/db": json.dumps({"user": "u"})})
+    values = config_cache.load_secrets(["app/db", f"{ARN_PREFIX}:app/db-AbCdEf"], client=client)
+    assert values == {"app/db": {"user": "u"}, f"{ARN_PREFIX}:app/db-AbCdEf": {"user": "u"}}
+
+
+def test_secret_cache_finds_a_secret_requested_by_arn():
+    client = BatchSecretsClient({"app/db": "secret"})
+    cache = config_cache.ConfigCache(loader=lambda names: config_cache.load_secrets(names, client=client), clock=Clock())
+    assert cache.get(f"{ARN_PREFIX}:app/db-AbCdEf") == "secret"
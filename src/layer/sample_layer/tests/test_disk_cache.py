@@ -0,0 +1,106 @@
+"""Tests of the S3 disk cache, with a fake clock and a stubbed S3 client."""
+import hashlib
+import os
+
+from layer_utils import disk_cache
+
+
+class Clock():
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class NotModified(Exception):
+    """The error botocore raises for a conditional GET of an unchanged object."""
+
+    def __init__(self) -> None:
+        super().__init__("Not Modified")
+        self.response = {"Error": {"Code": "304"}, "ResponseMetadata": {"HTTPStatusCode": 304}}
+
+
+class Body():
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+
+    def iter_chunks(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class S3Client():
+    """Serves `objects` with their sha256 as ETag, and answers a matching `IfNoneMatch` with a 304."""
+
+    def __init__(self, objects) -> None:
+        self.objects = objects
+        self.calls = []
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):  # pylint: disable=invalid-name
+        self.calls.append((Key, IfNoneMatch))
+        content = self.objects[(Bucket, Key)]
+        etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+        if IfNoneMatch == etag:
+            raise NotModified()
+        return {"ETag": etag, "Body": Body(content)}
+
+
+def test_hit_reads_from_disk(tmp_path):
+    clock = Clock()
+    client = S3Client({("bucket", "a"): b"alpha"})
+    cache = disk_cache.DiskCache(str(tmp_path), max_bytes=1000, revalidate_after=60, client=client, clock=clock)
+    assert cache.read_bytes("bucket", "a") == b"alpha"
+    clock.now += 59
+    assert cache.read_bytes("bucket", "a") == b"alpha"
+
+    assert client.calls == [("a", None)]
+    assert cache.stats() == {"hits": 1, "misses": 1, "revalidated": 0, "evictions": 0, "bytes": 5, "files": 1}
+
+
+def test_stale_copy_is_revalidated_with_a_conditional_get(tmp_path):
+    clock = Clock()
+    client = S3Client({("bucket", "a"): b"alpha"})
+    cache = disk_cache.DiskCache(str(tmp_path), max_bytes=1000, revalidate_after=60, client=client, clock=clock)
+    path = cache.get_path("bucket", "a")
+    clock.now += 60
+    assert cache.get_path("bucket", "a") == path
+    assert client.calls[-1][1] is not None, "the cached ETag is sent as IfNoneMatch"
+    assert cache.stats()["revalidated"] == 1
+
+    client.objects[("bucket", "a")] = b"changed"
+    clock.now += 60
+    assert cache.read_bytes("bucket", "a") == b"changed"
+    assert not os.path.exists(path), "the copy of the previous version is removed"
+    assert cache.stats()["bytes"] == len(b"changed")
+
+
+def test_least_recently_used_files_are_evicted_beyond_the_budget(tmp_path):
+    clock = Clock()
+    client = S3Client({("bucket", key): key.encode("utf-8") * 40 for key in ("a", "b", "c")})
+    cache = disk_cache.DiskCache(str(tmp_path), max_bytes=100, revalidate_after=60, client=client, clock=clock)
+    path_a = cache.get_path("bucket", "a")
+    path_b = cache.get_path("bucket", "b")
+    cache.get_path("bucket", "a")
+    cache.get_path("bucket", "c")
+
+    assert os.path.exists(path_a) and not os.path.exists(path_b)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 80
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in (path_a, cache.get_path("bucket", "c")))
+
+
+def test_files_of_a_previous_instance_are_reused_and_revalidated(tmp_path):
+    clock = Clock()
+    client = S3Client({("bucket", "a"): b"alpha"})
+    path = disk_cache.DiskCache(str(tmp_path), max_bytes=1000, client=client, clock=clock).get_path("bucket", "a")
+    interrupted = tmp_path / "partial.download.tmp"
+    interrupted.write_bytes(b"partial")
+
+    cache = disk_cache.DiskCache(str(tmp_path), max_bytes=1000, revalidate_after=60, client=client, clock=clock)
+    assert not interrupted.exists(), "interrupted downloads are removed"
+    assert cache.stats()["bytes"] == 5 and cache.stats()["files"] == 1
+
+    assert cache.get_path("bucket", "a") == path
+    assert client.calls[-1][1] is not None
+    assert cache.stats()["revalidated"] == 1 and cache.stats()["misses"] == 0
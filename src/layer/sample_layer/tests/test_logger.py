@@ -0,0 +1,110 @@
+"""Tests of the buffered structured logger, written to a sink that records every write."""
+import types
+
+import pytest
+
+from layer_utils import logger
+
+
+class CountingSink(logger.LocalSink):
+    """A `LocalSink` that also records how many lines each write had."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes = []
+
+    def write(self, lines):
+        self.writes.append(len(lines))
+        super().write(lines)
+
+
+class Unformattable():
+    """Fails the test if a filtered record is ever formatted."""
+
+    def __str__(self) -> str:
+        raise AssertionError("a record below the log level was formatted")
+
+
+def test_records_below_the_level_are_dropped():
+    sink = CountingSink()
+    log = logger.StructuredLogger(service="svc", level="WARN", sink=sink)
+    log.debug("debug %s", Unformattable())
+    log.info("info %s", Unformattable())
+    log.warning("warning %s", "kept", key="value")
+    log.flush()
+
+    assert not log.is_enabled_for("INFO") and log.is_enabled_for(logger.LEVELS["ERROR"])
+    assert [(record["level"], record["message"], record["key"]) for record in sink.records()] == [
+        ("WARN", "warning kept", "value")
+    ]
+    assert sink.records()[0]["service"] == "svc"
+
+
+def test_records_are_buffered_and_written_at_once():
+    sink = CountingSink()
+    log = logger.StructuredLogger(level="DEBUG", sink=sink)
+    for index in range(5):
+        log.info("record %d", index)
+    assert not sink.lines
+
+    log.flush()
+    log.flush()
+    assert sink.writes == [5], "the buffer is written with a single call, an empty buffer is not written"
+    assert [record["message"] for record in sink.records()] == [f"record {index}" for index in range(5)]
+
+
+def test_full_buffer_is_written():
+    sink = CountingSink()
+    log = logger.StructuredLogger(max_buffered_records=3, sink=sink)
+    for index in range(7):
+        log.info("record", index=index)
+    assert sink.writes == [3, 3]
+
+
+def test_errors_are_written_immediately():
+    sink = CountingSink()
+    log = logger.StructuredLogger(sink=sink)
+    log.info("before")
+    log.error("failed", code=500)
+    assert sink.writes == [2], "an error is written at once with the records buffered before it"
+    assert sink.records()[-1]["level"] == "ERROR"
+
+
+def test_logging_scope_adds_keys_and_flushes_once_per_invocation():
+    sink = CountingSink()
+    log = logger.StructuredLogger(sink=sink)
+
+    @log.logging_scope
+    def handler(event, _context):
+        log.append_keys(orderId=event["order"])
+        log.info("first")
+        log.info("second")
+        return event["order"]
+
+    assert handler({"order": 1}, types.SimpleNamespace(aws_request_id="request-1")) == 1
+    assert handler({"order": 2}, types.SimpleNamespace(aws_request_id="request-2")) == 2
+    log.info("outside")
+    log.flush()
+
+    assert sink.writes == [2, 2, 1]
+    first, _second, third, _fourth, outside = sink.records()
+    assert (first["requestId"], first["coldStart"], first["orderId"]) == ("request-1", True, 1)
+    assert (third["requestId"], third["coldStart"], third["orderId"]) == ("request-2", False, 2)
+    assert "requestId" not in outside and "orderId" not in outside
+
+
+def test_logging_scope_logs_unhandled_exceptions():
+    sink = CountingSink()
+    log = logger.StructuredLogger(sink=sink)
+
+    @log.logging_scope
+    def handler(_event, _context):
+        log.info("working")
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        handler({}, None)
+    records = sink.records()
+    assert [record["message"] for record in records] == ["working", "unhandled exception"]
+    assert records[-1]["errorType"] == "ValueError"
+    assert "ValueError: boom" in records[-1]["stackTrace"][-1]
@@ -0,0 +1,116 @@
+"""Tests of the EMF instrumentation, written to a `LocalSink`."""
+import types
+
+import pytest
+
+from layer_utils import metrics
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    metrics._STATE["cold_start"] = True  # pylint: disable=protected-access
+    metrics._STATE["current"] = None  # pylint: disable=protected-access
+
+
+def test_metrics_are_buffered_until_flush():
+    sink = metrics.LocalSink()
+    logger = metrics.MetricsLogger(namespace="Test", dimensions={"Service": "svc"}, sink=sink)
+    logger.put_metric("Latency", 1.5, "Milliseconds")
+    logger.put_metric("Latency", 2.5, "Milliseconds")
+    logger.increment("Records", 2)
+    logger.increment("Records", 3)
+    logger.set_property("RequestId", "abc")
+    assert not sink.records
+
+    logger.flush()
+    assert len(sink.records) == 1
+    record = sink.records[0]
+    assert record["Latency"] == [1.5, 2.5]
+    assert record["Records"] == 5
+    assert record["RequestId"] == "abc"
+    assert record["Service"] == "svc"
+    directive = record["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == "Test"
+    assert directive["Dimensions"] == [["Service"]]
+    assert {"Name": "Latency", "Unit": "Milliseconds"} in directive["Metrics"]
+
+    logger.flush()
+    assert len(sink.records) == 1, "an empty buffer writes no record"
+    logger.increment("Records")
+    logger.flush()
+    assert sink.records[1]["Records"] == 1
+    assert "Latency" not in sink.records[1] and "RequestId" not in sink.records[1]
+
+
+def test_records_are_split_at_100_metrics():
+    sink = metrics.LocalSink()
+    logger = metrics.MetricsLogger(sink=sink)
+    for index in range(250):
+        logger.put_metric(f"Metric{index}", index)
+    logger.flush()
+
+    assert [len(record["_aws"]["CloudWatchMetrics"][0]["Metrics"]) for record in sink.records] == [100, 100, 50]
+    assert sorted(sink.metric_values(f"Metric{index}")[0] for index in range(250)) == list(range(250))
+
+
+def test_metric_values_are_split_at_100_values():
+    sink = metrics.LocalSink()
+    logger = metrics.MetricsLogger(sink=sink)
+    for value in range(250):
+        logger.put_metric("Latency", value)
+    logger.flush()
+
+    assert len(sink.records) == 3
+    assert [len(record["Latency"]) for record in sink.records[:2]] == [100, 100]
+    assert sink.metric_values("Latency") == list(range(250))
+
+
+def test_metric_scope_emits_once_per_invocation():
+    sink = metrics.LocalSink()
+    written_during_invocation = []
+
+    @metrics.metric_scope(namespace="Test", service="svc", sink=sink)
+    def handler(event, _context):
+        assert metrics.current_metrics() is handler.metrics
+        with metrics.timer("Work"):
+            metrics.increment("Items", event["items"])
+        written_during_invocation.append(len(sink.records))
+        return "done"
+
+    context = types.SimpleNamespace(aws_request_id="request-1")
+    assert handler({"items": 3}, context) == "done"
+    assert handler({"items": 4}, context) == "done"
+
+    assert written_during_invocation == [0, 1]
+    assert len(sink.records) == 2
+    first, second = sink.records
+    assert first["ColdStart"] == 1 and "WarmStart" not in first and first["IsColdStart"] is True
+    assert "InitDuration" in first and "InitDuration" not in second
+    assert second["WarmStart"] == 1 and second["IsColdStart"] is False
+    assert sink.metric_values("Items") == [3, 4]
+    assert len(sink.metric_values("Work")) == 2
+    assert len(sink.metric_values("HandlerDuration")) == 2
+    assert first["RequestId"] == "request-1"
+    assert metrics.current_metrics() is None
+
+
+def test_metric_scope_counts_errors_and_still_flushes():
+    sink = metrics.LocalSink()
+
+    @metrics.metric_scope(sink=sink)
+    def handler(_event, _context):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        handler({}, None)
+    assert sink.metric_values("Errors") == [1]
+    assert len(sink.metric_values("HandlerDuration")) == 1
+
+
+def test_module_helpers_are_ignored_outside_of_a_scope():
+    metrics.increment("Items")
+    metrics.put_metric("Latency", 1)
+    metrics.set_property("Key", "value")
+    with metrics.timer("Work"):
+        pass
+    assert metrics.current_metrics() is None
@@ -0,0 +1,96 @@
+"""Tests of the tracer, with spans collected by an `InMemoryExporter`."""
+import pytest
+
+from layer_utils import tracing
+
+HEADER = "Root=1-5759e988-bd862e3fe1be46a994272793;Parent=53995c3f42cd8ad8;Sampled=1"
+
+
+def test_spans_are_exported_once_when_the_handler_returns(monkeypatch):
+    monkeypatch.setenv(tracing.TRACE_HEADER_ENV, HEADER)
+    exporter = tracing.InMemoryExporter()
+    tracer = tracing.Tracer(sample_rate=1.0, exporter=exporter)
+
+    @tracer.trace_handler
+    def handler(_event, _context):
+        with tracer.dynamodb("GetItem", table_name="orders"):
+            pass
+        with tracer.s3("GetObject", bucket_name="bucket", key="a"):
+            pass
+        assert not exporter.spans, "spans are buffered until the invocation ends"
+        return "done"
+
+    assert handler({}, None) == "done"
+    dynamodb, s3 = exporter.spans
+    assert (dynamodb.trace_id, dynamodb.parent_id) == ("1-5759e988-bd862e3fe1be46a994272793", "53995c3f42cd8ad8")
+    assert dynamodb.aws["operation"] == "GetItem" and dynamodb.aws["table_name"] == "orders"
+    assert s3.aws["bucket_name"] == "bucket" and s3.aws["key"] == "a"
+    assert all(span.duration is not None and span.duration >= 0 for span in exporter.spans)
+
+    tracer.flush()
+    assert len(exporter.spans) == 2, "a span is exported once"
+
+
+def test_nested_spans_are_children_of_the_enclosing_span():
+    exporter = tracing.InMemoryExporter()
+    tracer = tracing.Tracer(sample_rate=1.0, exporter=exporter)
+    tracer.begin_invocation(HEADER)
+    with tracer.http("get", "https://api.example.com/orders/1") as outer:
+        with tracer.redis("get", host="cache") as inner:
+            pass
+    tracer.flush()
+
+    assert inner.parent_id == outer.id
+    assert outer.parent_id == "53995c3f42cd8ad8"
+    assert exporter.spans_named("api.example.com")[0].http["request"] == {
+        "method": "GET", "url": "https://api.example.com/orders/1"
+    }
+    assert exporter.spans_named("redis@cache")[0].metadata["redis"] == {"command": "GET"}
+
+
+def test_unsampled_invocations_record_nothing():
+    exporter = tracing.InMemoryExporter()
+    tracer = tracing.Tracer(sample_rate=1.0, exporter=exporter)
+    tracer.begin_invocation(HEADER.replace("Sampled=1", "Sampled=0"))
+    with tracer.dynamodb("Query") as span:
+        span.set_http_status(500)
+    tracer.flush()
+
+    tracer = tracing.Tracer(sample_rate=0.0, exporter=exporter)
+    tracer.begin_invocation(HEADER)
+    with tracer.postgres("select 1", database="orders"):
+        pass
+    tracer.flush()
+    assert exporter.spans == []
+
+
+def test_failed_calls_are_recorded_and_exported():
+    exporter = tracing.InMemoryExporter()
+    tracer = tracing.Tracer(sample_rate=1.0, exporter=exporter)
+
+    @tracer.trace_handler
+    def handler(_event, _context):
+        with tracer.postgres("select * from orders where id = %s", database="orders", host="db"):
+            raise ValueError("connection reset")
+
+    with pytest.raises(ValueError):
+        handler({}, None)
+    span, = exporter.spans
+    document = span.to_document()
+    assert document["fault"] is True
+    assert document["cause"]["exceptions"][0]["type"] == "ValueError"
+    assert document["sql"] == {
+        "database_type": "PostgreSQL", "url": "db/orders", "sanitized_query": "select * from orders where id = %s"
+    }
+    assert document["name"] == "orders@db" and document["type"] == "subsegment"
+
+
+def test_http_status_flags():
+    span = tracing.Span(name="api", trace_id="trace", parent_id="parent")
+    span.set_http_status(429)
+    assert (span.error, span.throttle, span.fault) == (True, True, False)
+
+    span = tracing.Span(name="api", trace_id="trace", parent_id="parent")
+    span.set_http_status(503)
+    assert (span.error, span.throttle, span.fault) == (False, False, True)
+    assert "error" not in span.to_document() and span.to_document()["http"] == {"response": {"status": 503}}